@@ -0,0 +1,27 @@
+"""Add batch_id to reports
+
+Revision ID: 20251017_add_report_batch
+Revises: 20251017_add_finding_page
+Create Date: 2025-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '20251017_add_report_batch'
+down_revision = '20251017_add_finding_page'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Reports submitted together through the batch upload endpoint
+    op.add_column('reports', sa.Column('batch_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_index('ix_reports_batch_id', 'reports', ['batch_id'])
+
+
+def downgrade():
+    op.drop_index('ix_reports_batch_id', table_name='reports')
+    op.drop_column('reports', 'batch_id')
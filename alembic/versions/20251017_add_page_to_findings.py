@@ -0,0 +1,24 @@
+"""Add page to findings
+
+Revision ID: 20251017_add_finding_page
+Revises: 20250108_add_ai_configurations
+Create Date: 2025-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251017_add_finding_page'
+down_revision = '20250108_add_ai_configurations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Page in the source PDF where the finding's evidence was located
+    op.add_column('findings', sa.Column('page', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('findings', 'page')
@@ -0,0 +1,26 @@
+"""Add source_checksum to reports
+
+Revision ID: 20251017_add_source_checksum
+Revises: 20251017_add_report_batch
+Create Date: 2025-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251017_add_source_checksum'
+down_revision = '20251017_add_report_batch'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SHA-256 of the uploaded file; identical uploads within a tenant reuse the analysis
+    op.add_column('reports', sa.Column('source_checksum', sa.String(length=64), nullable=True))
+    op.create_index('ix_reports_tenant_source_checksum', 'reports', ['tenant_id', 'source_checksum'])
+
+
+def downgrade():
+    op.drop_index('ix_reports_tenant_source_checksum', table_name='reports')
+    op.drop_column('reports', 'source_checksum')
@@ -0,0 +1,24 @@
+"""Add source_size to reports
+
+Revision ID: 20251017_add_source_size
+Revises: 20251017_add_source_checksum
+Create Date: 2025-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251017_add_source_size'
+down_revision = '20251017_add_source_checksum'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Size of the uploaded source file, recorded at upload time (file_size is the conclusion PDF)
+    op.add_column('reports', sa.Column('source_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('reports', 'source_size')
@@ -16,38 +16,33 @@ async def health_check():
 
 @router.get("/healthz/storage")
 async def health_check_storage():
-    """Storage health check endpoint."""
+    """Storage health check endpoint (live head_bucket check with a short timeout)."""
     import datetime
     from app.config import settings
-    from app.services.storage import storage
+    from app.services.storage import async_storage
     
-    try:
-        # Test storage connection
-        bucket_exists = storage.ensure_bucket()
-        
+    # Also refreshes the readiness state the upload endpoints use
+    bucket_exists = await async_storage.refresh_bucket_status()
+    storage_info = {
+        "endpoint": settings.s3_endpoint,
+        "bucket": settings.s3_bucket,
+        "region": "us-east-1",  # DO Spaces uses us-east-1 for boto3
+        "bucket_exists": bucket_exists
+    }
+    
+    if bucket_exists:
         return {
-            "status": "healthy" if bucket_exists else "degraded",
+            "status": "healthy",
             "message": "Storage check completed",
             "timestamp": datetime.datetime.utcnow().isoformat(),
-            "storage": {
-                "endpoint": settings.s3_endpoint,
-                "bucket": settings.s3_bucket,
-                "region": "us-east-1",  # DO Spaces uses us-east-1 for boto3
-                "bucket_exists": bucket_exists
-            }
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "message": f"Storage check failed: {str(e)}",
-            "timestamp": datetime.datetime.utcnow().isoformat(),
-            "storage": {
-                "endpoint": settings.s3_endpoint,
-                "bucket": settings.s3_bucket,
-                "region": "us-east-1",  # DO Spaces uses us-east-1 for boto3
-                "error": str(e)
-            }
+            "storage": storage_info
         }
+    return {
+        "status": "unhealthy",
+        "message": f"Storage check failed: {async_storage.bucket_error}",
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "storage": {**storage_info, "error": async_storage.bucket_error}
+    }
 
 @router.get("/")
 async def root():
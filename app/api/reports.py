@@ -1,11 +1,13 @@
 """
 Reports API endpoints for file uploads.
 """
+import asyncio
+import re
 import uuid
 import logging
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from fastapi.responses import StreamingResponse
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,16 +20,21 @@ from app.models.user import User, UserRole
 from app.models.report import Report, ReportAuditLog, ReportStatus, AuditAction
 from app.models.analysis import Analysis
 from app.models.finding import Finding
-from app.schemas.report import ReportOut, ReportListResponse, ReportDetail
+from app.schemas.report import ReportOut, ReportListResponse, ReportDetail, BatchUploadOut, BatchProgress, BatchReportStatus, QueueDepthOut
 from app.auth.auth import fastapi_users
 from app.auth.dependencies import get_current_admin_or_system_owner
-from app.services.storage import storage
+from app.services.storage import async_storage
+from app.services.dedup import find_analysed_duplicate, clone_analysis
+from app.services.download_urls import cached_presigned_url, claim_download_audit
+from app.services.batch_upload import collect_batch_files, upload_batch_files, enqueue_reports
 from app.exceptions import UnsupportedFileTypeError, FileTooLargeError, StorageError
 from app.config import settings
-from app.redis_queue.conn import reports_queue, redis_conn
+from app.redis_queue.conn import reports_queue, redis_conn, LANE_INTERACTIVE
+from app.redis_queue.fair_share import queue_depths
+from app.services.analysis_progress import get_progress
 from rq import Retry
 from pydantic import BaseModel
-from typing import Dict
+from typing import Any, Dict
 from sqlalchemy import or_
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -41,6 +48,9 @@ ALLOWED_EXTENSIONS = {
 # Maximum file size in bytes
 MAX_FILE_SIZE = settings.max_upload_mb * 1024 * 1024
 
+# Single byte range ("bytes=0-99", "bytes=100-", "bytes=-100"); storage doesn't support multiple ranges
+SINGLE_BYTE_RANGE = re.compile(r"^bytes=(\d+-\d*|-\d+)$")
+
 
 def validate_file_upload(file: UploadFile) -> None:
     """Validate file upload."""
@@ -65,28 +75,51 @@ def validate_file_upload(file: UploadFile) -> None:
         logger.warning(f"File size unknown for {file.filename}, will validate during upload")
 
 
-def validate_file_size_during_upload(file_stream, max_size: int) -> None:
-    """Validate file size during streaming upload."""
-    chunk_size = 8192  # 8KB chunks
-    total_size = 0
-    
-    # Read file in chunks and check size
-    while True:
-        chunk = file_stream.read(chunk_size)
-        if not chunk:
-            break
-        total_size += len(chunk)
-        if total_size > max_size:
-            raise FileTooLargeError(f"File too large. Max size: {settings.max_upload_mb}MB")
+async def stream_object(request: Request, object_key: str, media_type: str, filename: str, not_found_detail: str) -> Response:
+    """
+    Stream a stored object to the client in chunks instead of buffering it.
+    
+    Range and If-None-Match are passed on to storage, so partial and repeat
+    downloads only transfer what the client doesn't have yet.
+    """
+    byte_range = (request.headers.get("range") or "").replace(" ", "")
+    if not SINGLE_BYTE_RANGE.match(byte_range):
+        byte_range = None  # no or multiple ranges: send the whole file
+    
+    obj = await async_storage.get_object(object_key, byte_range, request.headers.get("if-none-match"))
+    if obj is None:
+        raise HTTPException(
+            status_code=404,
+            detail=not_found_detail
+        )
+    if obj.get("NotModified"):
+        return Response(status_code=304, headers={"ETag": obj["ETag"]} if obj.get("ETag") else None)
+    if obj.get("RangeNotSatisfiable"):
+        size = obj.get("ObjectSize")
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"} if size is not None else None)
     
-    # Reset file pointer for actual upload
-    file_stream.seek(0)
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(obj["ContentLength"]),
+    }
+    if obj.get("ETag"):
+        headers["ETag"] = obj["ETag"]
+    if obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+    return StreamingResponse(
+        async_storage.iter_body(obj["Body"], settings.storage_download_chunk_kb * 1024),
+        status_code=206 if obj.get("ContentRange") else 200,
+        media_type=media_type,
+        headers=headers
+    )
 
 
 @router.post("/", response_model=ReportOut, status_code=201)
 async def upload_report(
     file: UploadFile = File(...),
     tenant_id: Optional[str] = Query(None, description="Tenant ID (required for system owner)"),
+    dedupe: bool = Query(True, description="Reuse the analysis of an identical, already analysed upload"),
     current_user: User = Depends(get_current_admin_or_system_owner),
     session: AsyncSession = Depends(get_db)
 ):
@@ -112,9 +145,9 @@ async def upload_report(
         target_tenant_id = current_user.tenant_id
     
     try:
-        # Ensure bucket exists
-        if not storage.ensure_bucket():
-            raise StorageError("Failed to ensure storage bucket exists")
+        # Cached readiness; doesn't call storage while the bucket is available
+        if not await async_storage.bucket_ready():
+            raise StorageError(f"Storage bucket not available: {async_storage.bucket_error}")
         
         # Create report record first to get the ID
         report = Report(
@@ -137,19 +170,32 @@ async def upload_report(
         # Update the report with the correct object key
         report.source_object_key = object_key
         
-        # Upload file to storage with size validation
+        # Single pass over the upload: size limit, checksum and (multipart) upload
         file_ext = file.filename.lower().split('.')[-1]
-        
-        # If file size is unknown, validate during upload
-        if file.size is None:
-            validate_file_size_during_upload(file.file, MAX_FILE_SIZE)
-        
-        if not storage.upload_fileobj(
+        uploaded = await async_storage.upload_stream(
             file.file,
             object_key,
-            ALLOWED_EXTENSIONS[f'.{file_ext}']
-        ):
+            ALLOWED_EXTENSIONS[f'.{file_ext}'],
+            MAX_FILE_SIZE
+        )
+        if uploaded is None:
             raise StorageError("Failed to upload file to storage")
+        report.source_checksum, report.source_size = uploaded
+        
+        duplicate = await find_analysed_duplicate(session, target_tenant_id, report.source_checksum) if dedupe else None
+        if duplicate is not None and await clone_analysis(session, duplicate, report):
+            # Identical file already analysed: keep one stored copy and reuse the analysis
+            report.source_object_key = duplicate.source_object_key
+            session.add(ReportAuditLog(
+                report_id=report.id,
+                actor_user_id=current_user.id,
+                action=AuditAction.UPLOAD,
+                note=f"File uploaded: {file.filename} ({report.source_size} bytes), identical to report {duplicate.id} - analysis reused"
+            ))
+            await session.commit()
+            await async_storage.delete_object(object_key)
+            logger.info(f"Report uploaded as duplicate of {duplicate.id}: {report.id} by user {current_user.id}")
+            return ReportOut.from_orm(report)
         
         session.add(report)
         await session.commit()
@@ -160,7 +206,7 @@ async def upload_report(
             report_id=report.id,
             actor_user_id=current_user.id,
             action=AuditAction.UPLOAD,
-            note=f"File uploaded: {file.filename} ({file.size} bytes)"
+            note=f"File uploaded: {file.filename} ({report.source_size} bytes)"
         )
         
         session.add(audit_log)
@@ -168,13 +214,11 @@ async def upload_report(
         
         # Enqueue processing job
         try:
-            # Check Redis availability before enqueuing
-            redis_conn().ping()
-            reports_queue().enqueue(
+            reports_queue(str(target_tenant_id), LANE_INTERACTIVE).enqueue(
                 "app.redis_queue.jobs.process_report_with_ai",
                 report_id=str(report.id),
                 retry=Retry(max=settings.job_max_retries),
-                job_timeout=settings.job_timeout_seconds
+                job_timeout=settings.ai_job_timeout_seconds
             )
             logger.info(f"Processing job enqueued for report {report.id}")
         except Exception as e:
@@ -189,17 +233,200 @@ async def upload_report(
         
         return ReportOut.from_orm(report)
         
+    except (FileTooLargeError, HTTPException):
+        # Nothing is left in storage for a rejected upload; after a 503 the report is kept
+        raise
     except Exception as e:
         logger.error(f"Error uploading report: {e}")
         # Try to clean up uploaded file if report creation failed
         try:
             if 'object_key' in locals():
-                storage.delete_object(object_key)
+                await async_storage.delete_object(object_key)
         except:
             pass  # Ignore cleanup errors
         raise StorageError(f"Failed to process upload: {str(e)}")
 
 
+@router.post("/batch", response_model=BatchUploadOut, status_code=201)
+async def upload_report_batch(
+    files: List[UploadFile] = File(..., description="Report files and/or ZIP archives of reports"),
+    tenant_id: Optional[str] = Query(None, description="Tenant ID (required for system owner)"),
+    current_user: User = Depends(get_current_admin_or_system_owner),
+    session: AsyncSession = Depends(get_db)
+):
+    """Upload many report files (or ZIP archives) as one batch."""
+    # Determine tenant ID based on user role
+    if current_user.role == UserRole.SYSTEM_OWNER:
+        if not tenant_id:
+            raise HTTPException(
+                status_code=400,
+                detail="tenant_id query parameter is required for system owner"
+            )
+        target_tenant_id = uuid.UUID(tenant_id)
+    else:
+        if tenant_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot specify tenant_id - can only upload to own tenant"
+            )
+        target_tenant_id = current_user.tenant_id
+    
+    batch_files, rejected = collect_batch_files(files, ALLOWED_EXTENSIONS, MAX_FILE_SIZE)
+    if len(batch_files) > settings.batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files in batch. Max: {settings.batch_max_files}"
+        )
+    if not batch_files:
+        raise UnsupportedFileTypeError(f"No supported files in batch. Allowed: {', '.join(ALLOWED_EXTENSIONS.keys())}")
+    
+    if not await async_storage.bucket_ready():
+        raise StorageError(f"Storage bucket not available: {async_storage.bucket_error}")
+    
+    # Report IDs are generated up front so all objects can be uploaded before the insert
+    batch_id = uuid.uuid4()
+    reports = []
+    for batch_file in batch_files:
+        report_id = uuid.uuid4()
+        reports.append(Report(
+            id=report_id,
+            tenant_id=target_tenant_id,
+            uploaded_by=current_user.id,
+            filename=batch_file.filename,
+            status=ReportStatus.PROCESSING,
+            finding_count=0,
+            score=None,
+            source_object_key=f"tenants/{target_tenant_id}/reports/{report_id}/source/{batch_file.filename}",
+            conclusion_object_key=None,
+            batch_id=batch_id
+        ))
+    
+    results = await upload_batch_files(batch_files, [report.source_object_key for report in reports])
+    
+    accepted = []
+    audit_logs = []
+    for batch_file, report, uploaded in zip(batch_files, reports, results):
+        if uploaded is None:
+            rejected.append({"filename": batch_file.filename, "reason": "Failed to upload file to storage"})
+            continue
+        report.source_checksum, report.source_size = uploaded
+        accepted.append(report)
+        audit_logs.append(ReportAuditLog(
+            report_id=report.id,
+            actor_user_id=current_user.id,
+            action=AuditAction.UPLOAD,
+            note=f"File uploaded in batch {batch_id}: {batch_file.filename} ({report.source_size} bytes)"
+        ))
+    if not accepted:
+        raise StorageError("Failed to upload batch files to storage")
+    
+    # All reports and audit logs in one transaction
+    try:
+        session.add_all(accepted)
+        session.add_all(audit_logs)
+        await session.commit()
+    except Exception as e:
+        logger.error(f"Error storing batch {batch_id}: {e}")
+        await session.rollback()
+        for report in accepted:
+            try:
+                await async_storage.delete_object(report.source_object_key)
+            except Exception:
+                pass  # Ignore cleanup errors
+        raise StorageError(f"Failed to process batch upload: {str(e)}")
+    
+    try:
+        enqueue_reports([str(report.id) for report in accepted], str(target_tenant_id))
+        logger.info(f"Processing jobs enqueued for batch {batch_id} ({len(accepted)} reports)")
+    except Exception as e:
+        logger.error(f"Failed to enqueue processing jobs for batch {batch_id}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Queue service unavailable - reports uploaded but processing cannot be scheduled"
+        )
+    
+    logger.info(f"Batch {batch_id} uploaded by user {current_user.id}: {len(accepted)} accepted, {len(rejected)} rejected")
+    
+    return BatchUploadOut(
+        batch_id=str(batch_id),
+        accepted=len(accepted),
+        rejected=rejected,
+        reports=[ReportOut.from_orm(report) for report in accepted]
+    )
+
+
+@router.get("/batch/{batch_id}", response_model=BatchProgress)
+async def get_batch_progress(
+    batch_id: str,
+    current_user: User = Depends(fastapi_users.current_user(active=True)),
+    session: AsyncSession = Depends(get_db)
+):
+    """Get aggregate progress of a batch upload."""
+    try:
+        batch_uuid = uuid.UUID(batch_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail="Invalid batch_id format"
+        )
+    
+    query = select(Report).where(
+        Report.batch_id == batch_uuid,
+        Report.deleted_at.is_(None)
+    ).order_by(Report.filename)
+    if current_user.role != UserRole.SYSTEM_OWNER:
+        query = query.where(Report.tenant_id == current_user.tenant_id)
+    
+    reports = (await session.execute(query)).scalars().all()
+    if not reports:
+        raise HTTPException(
+            status_code=404,
+            detail="Batch not found or access denied"
+        )
+    
+    counts = {status: 0 for status in ReportStatus}
+    for report in reports:
+        counts[report.status] += 1
+    finished = counts[ReportStatus.DONE] + counts[ReportStatus.FAILED]
+    
+    return BatchProgress(
+        batch_id=batch_id,
+        total=len(reports),
+        processing=counts[ReportStatus.PROCESSING],
+        done=counts[ReportStatus.DONE],
+        failed=counts[ReportStatus.FAILED],
+        progress=round(finished / len(reports), 3),
+        reports=[
+            BatchReportStatus(
+                id=str(report.id),
+                filename=report.filename,
+                status=report.status,
+                score=report.score,
+                finding_count=report.finding_count or 0
+            )
+            for report in reports
+        ]
+    )
+
+
+@router.get("/queue", response_model=QueueDepthOut)
+async def get_queue_depth(
+    current_user: User = Depends(get_current_admin_or_system_owner)
+):
+    """Get the number of waiting processing jobs per lane and per tenant."""
+    # Admins only see their own tenant; lane totals cover everyone (their place in line)
+    tenant_id = None if current_user.role == UserRole.SYSTEM_OWNER else str(current_user.tenant_id)
+    try:
+        depths = await asyncio.to_thread(queue_depths, redis_conn(), tenant_id)
+    except Exception as e:
+        logger.error(f"Failed to read queue depth: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Queue service unavailable"
+        )
+    return QueueDepthOut(**depths)
+
+
 @router.get("/", response_model=ReportListResponse)
 async def list_reports(
     page: int = Query(1, ge=1, description="Page number"),
@@ -306,6 +533,7 @@ async def get_report_detail(
 @router.get("/{report_id}/source")
 async def download_source(
     report_id: str,
+    request: Request,
     current_user: User = Depends(fastapi_users.current_user(active=True)),
     session: AsyncSession = Depends(get_db)
 ):
@@ -330,25 +558,22 @@ async def download_source(
             detail="Report not found or access denied"
         )
     
-    # Get file from storage
+    # Stream file from storage
     try:
-        file_stream = storage.download_fileobj(report.source_object_key)
-        if not file_stream:
-            raise HTTPException(
-                status_code=404,
-                detail="Source file not found in storage"
-            )
-        
         # Determine content type based on file extension
         file_ext = report.filename.lower().split('.')[-1] if '.' in report.filename else ''
         content_type = ALLOWED_EXTENSIONS.get(f'.{file_ext}', 'application/octet-stream')
         
-        return StreamingResponse(
-            file_stream,
-            media_type=content_type,
-            headers={"Content-Disposition": f"attachment; filename={report.filename}"}
+        return await stream_object(
+            request,
+            report.source_object_key,
+            content_type,
+            report.filename,
+            "Source file not found in storage"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error downloading source file for report {report_id}: {e}")
         raise HTTPException(
@@ -360,6 +585,7 @@ async def download_source(
 @router.get("/{report_id}/conclusion")
 async def download_conclusion(
     report_id: str,
+    request: Request,
     current_user: User = Depends(fastapi_users.current_user(active=True)),
     session: AsyncSession = Depends(get_db)
 ):
@@ -391,21 +617,18 @@ async def download_conclusion(
             detail="Conclusion not yet available"
         )
     
-    # Get file from storage
+    # Stream file from storage
     try:
-        file_stream = storage.download_fileobj(report.conclusion_object_key)
-        if not file_stream:
-            raise HTTPException(
-                status_code=404,
-                detail="Conclusion file not found in storage"
-            )
-        
-        return StreamingResponse(
-            file_stream,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=conclusie_{report.filename}.pdf"}
+        return await stream_object(
+            request,
+            report.conclusion_object_key,
+            "application/pdf",
+            f"conclusie_{report.filename}.pdf",
+            "Conclusion file not found in storage"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error downloading conclusion file for report {report_id}: {e}")
         raise HTTPException(
@@ -444,10 +667,8 @@ async def reprocess_report(
     
     # Enqueue reprocessing job
     try:
-        # Check Redis availability before enqueuing
-        redis_conn().ping()
-        job = reports_queue().enqueue(
-            "app.queue.jobs.process_report",
+        job = reports_queue(str(report.tenant_id), LANE_INTERACTIVE).enqueue(
+            "app.redis_queue.jobs.process_report",
             report_id=report_id,
             retry=Retry(max=settings.job_max_retries),
             job_timeout=settings.job_timeout_seconds
@@ -532,8 +753,7 @@ async def get_report_findings(
     if severity:
         qry = qry.where(Finding.severity.in_(severity))
     if page is not None:
-        # Note: We don't have page field yet, so this filter is ignored
-        pass
+        qry = qry.where(Finding.page == page)
     if q:
         like = f"%{q}%"
         qry = qry.where(or_(Finding.message.ilike(like), Finding.evidence.ilike(like)))
@@ -548,7 +768,7 @@ async def get_report_findings(
             code=f.rule_id,            # bij jullie: rule_id representeert de code
             severity=f.severity,
             message=f.message,
-            page=None,  # We don't have page field yet
+            page=f.page,
             evidence=(str(f.evidence) if f.evidence else None),
         )
         for f in findings_rows
@@ -568,6 +788,44 @@ async def get_report_findings(
     )
 
 
+class ReportProgress(BaseModel):
+    report_id: str
+    status: str
+    stage: Optional[str] = None  # "ANALYZING" | "DONE" | "FAILED"
+    chunks_total: int = 0
+    chunks_done: int = 0
+    error: Optional[str] = None
+    updated_at: Optional[str] = None
+    findings: List[Dict[str, Any]] = []
+
+@router.get("/{report_id}/progress", response_model=ReportProgress)
+async def get_report_progress(
+    report_id: str,
+    current_user: User = Depends(fastapi_users.current_user(active=True)),
+    session: AsyncSession = Depends(get_db),
+):
+    """Live progress of a running AI analysis, including findings streamed in so far."""
+    from app.services.reports import ReportService
+
+    try:
+        uuid.UUID(report_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    # Same tenant/role access as the other report endpoints
+    report = await ReportService(session).get_report_for_download(report_id, current_user)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    try:
+        progress = await get_progress(report_id)
+    except Exception as e:
+        logger.warning(f"Could not read analysis progress for report {report_id}: {e}")
+        progress = None
+
+    return ReportProgress(report_id=report_id, status=report.status, **(progress or {}))
+
+
 @router.get("/{report_id}/download")
 async def get_download_url(
     report_id: str,
@@ -625,10 +883,11 @@ async def get_download_url(
         )
     
     try:
-        # Generate presigned URL
-        download_url = storage.presigned_get_url(
-            object_key=storage_key,
-            expires=settings.download_ttl
+        # Presigned URL, reused from the cache while it is valid long enough
+        download_url, expires_in = await cached_presigned_url(
+            storage_key,
+            settings.download_ttl,
+            lambda object_key, ttl: async_storage.presigned_get_url(object_key=object_key, expires=ttl)
         )
         
         if not download_url:
@@ -637,21 +896,23 @@ async def get_download_url(
                 detail="Failed to generate download URL"
             )
         
-        # Create audit log for download
-        audit_log = ReportAuditLog(
-            report_id=report.id,
-            actor_user_id=current_user.id,
-            action=AuditAction.REPORT_DOWNLOAD,
-            note=f"Download URL generated (TTL: {settings.download_ttl}s)"
-        )
-        session.add(audit_log)
-        await session.commit()
+        # Create audit log for download (once per user and report per audit window)
+        if await claim_download_audit(report.id, current_user.id):
+            audit_log = ReportAuditLog(
+                report_id=report.id,
+                actor_user_id=current_user.id,
+                action=AuditAction.REPORT_DOWNLOAD,
+                note=f"Download URL generated (TTL: {settings.download_ttl}s, "
+                     f"repeats within {settings.download_audit_window_seconds}s not logged)"
+            )
+            session.add(audit_log)
+            await session.commit()
         
         logger.info(f"Download URL generated for report {report_id} by user {current_user.id}")
         
         return {
             "url": download_url,
-            "expires_in": settings.download_ttl,
+            "expires_in": expires_in,
             "filename": report.filename,
             "file_size": report.file_size,
             "checksum": report.checksum
@@ -973,10 +1234,11 @@ async def reanalyze_report(
         await session.commit()
         
         # Enqueue AI analysis job
-        job = reports_queue.enqueue(
+        job = reports_queue(str(report.tenant_id), LANE_INTERACTIVE).enqueue(
             'app.redis_queue.jobs.process_report_with_ai',
-            report_id,
-            retry=Retry(max=3, interval=60)
+            report_id=report_id,
+            retry=Retry(max=settings.job_max_retries),
+            job_timeout=settings.ai_job_timeout_seconds
         )
         
         logger.info(f"Report {report_id} reanalysis queued with job {job.id}")
@@ -1032,7 +1294,7 @@ async def download_ai_findings(
         
         # Download PDF from storage
         try:
-            pdf_data = storage.download_file(report.conclusion_object_key)
+            pdf_data = await async_storage.download_bytes(report.conclusion_object_key)
             if not pdf_data:
                 raise HTTPException(
                     status_code=404,
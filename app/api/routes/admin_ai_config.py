@@ -9,7 +9,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-# from app.auth.dependencies import get_current_system_owner  # Temporarily disabled due to 401 issue
+from app.auth.dependencies import get_current_system_owner
 from app.models.ai_config import AIConfiguration
 from app.schemas.ai_config import (
     AIConfigCreate, AIConfigUpdate, AIConfigOut, 
@@ -78,6 +78,14 @@ async def create_ai_configuration(
     await session.refresh(config)
     return _to_ai_config_out(config)
 
+@router.get("/cache/stats")
+async def get_llm_cache_stats(
+    _=Depends(get_current_system_owner),
+):
+    """LLM response cache hit/miss counters and size"""
+    from app.services.llm_cache import llm_cache
+    return await llm_cache.stats()
+
 @router.get("/{config_id}", response_model=AIConfigOut)
 async def get_ai_configuration(
     config_id: str,
@@ -151,6 +159,7 @@ async def test_ai_configuration(
         llm_service.provider = config.provider
         llm_service.model = config.model
         llm_service.api_key = config.api_key
+        llm_service.use_cache = False  # A config test must reach the provider
         
         # Test with simple message
         start_time = datetime.utcnow()
@@ -344,6 +344,7 @@ async def test_run_prompt(
 
     # 3) Kies provider/model ad hoc (override ENV indien meegegeven)
     llm = LLMService()
+    llm.use_cache = False  # A test-run must reach the provider
     if payload.provider:
         llm.provider = payload.provider
     if payload.model:
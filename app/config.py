@@ -49,12 +49,20 @@ class Settings(BaseSettings):
     s3_bucket: str = Field(default="asbest-tool", env="S3_BUCKET")
     s3_use_path_style: bool = Field(default=True, env="S3_USE_PATH_STYLE")
     s3_secure: bool = Field(default=True, env="S3_SECURE")
+    storage_multipart_part_mb: int = Field(default=8, env="STORAGE_MULTIPART_PART_MB")  # upload part size (min 5)
+    storage_max_workers: int = Field(default=16, env="STORAGE_MAX_WORKERS")  # threads for storage calls from the API
+    storage_bucket_check_seconds: int = Field(default=30, env="STORAGE_BUCKET_CHECK_SECONDS")  # bucket readiness refresh interval
+    storage_download_chunk_kb: int = Field(default=256, env="STORAGE_DOWNLOAD_CHUNK_KB")  # chunk size for streamed downloads
     
     # Upload limits
     max_upload_mb: int = Field(default=50, env="MAX_UPLOAD_MB")
+    batch_max_files: int = Field(default=200, env="BATCH_MAX_FILES")
+    batch_upload_concurrency: int = Field(default=8, env="BATCH_UPLOAD_CONCURRENCY")
     
     # Slice 6: Download and storage settings
     download_ttl: int = Field(default=3600, env="DOWNLOAD_TTL")  # 1 hour default
+    download_url_min_remaining: int = Field(default=300, env="DOWNLOAD_URL_MIN_REMAINING")  # re-sign cached URLs with less validity left
+    download_audit_window_seconds: int = Field(default=900, env="DOWNLOAD_AUDIT_WINDOW_SECONDS")  # one download audit entry per user/report per window
     purge_delay_days: int = Field(default=7, env="PURGE_DELAY_DAYS")  # 7 days before hard delete
     
     # Email notifications (Slice 6)
@@ -67,9 +75,25 @@ class Settings(BaseSettings):
     
     # Redis Configuration
     redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
-    worker_concurrency: int = 1
+    redis_max_connections: int = Field(default=50, env="REDIS_MAX_CONNECTIONS")  # per process, 0 = unbounded
+    redis_health_check_interval: int = Field(default=30, env="REDIS_HEALTH_CHECK_INTERVAL")  # seconds idle before a PING
+    worker_mode: str = Field(default="rq", env="WORKER_MODE")  # "rq" or "async"
+    worker_concurrency: int = 1  # Reports processed in parallel by the async worker
     job_timeout_seconds: int = 120
     job_max_retries: int = 3
+    worker_fork_jobs: bool = Field(default=False, env="WORKER_FORK_JOBS")  # True = classic forking RQ worker
+    worker_persistent_loop: bool = Field(default=True, env="WORKER_PERSISTENT_LOOP")  # one event loop per worker
+    
+    # Report queue lanes and fair share across tenants
+    queue_fair_share_half_life: int = Field(default=300, env="QUEUE_FAIR_SHARE_HALF_LIFE")  # seconds
+    queue_refresh_seconds: int = Field(default=5, env="QUEUE_REFRESH_SECONDS")  # tenant queue discovery interval
+    queue_tenant_weights: str = Field(default="", env="QUEUE_TENANT_WEIGHTS")  # "tenant_id:weight,..." (default 1)
+    
+    # Worker database pool (shared by all jobs in a worker process)
+    worker_db_pool_size: int = Field(default=5, env="WORKER_DB_POOL_SIZE")
+    worker_db_max_overflow: int = Field(default=5, env="WORKER_DB_MAX_OVERFLOW")
+    worker_db_pool_pre_ping: bool = Field(default=True, env="WORKER_DB_POOL_PRE_PING")
+    worker_db_pool_recycle: int = Field(default=1800, env="WORKER_DB_POOL_RECYCLE")  # seconds
     
     # CORS Configuration
     cors_origins: Optional[str] = "https://v21-asbest-tool-nutv.vercel.app,http://localhost:3000,http://localhost:8080,*"
@@ -80,6 +104,44 @@ class Settings(BaseSettings):
     ai_api_key: str = Field(default="", env="AI_API_KEY")
     ai_timeout: int = Field(default=60, env="AI_TIMEOUT")
     ai_max_tokens: int = Field(default=4000, env="AI_MAX_TOKENS")
+    ai_http_max_connections: int = Field(default=20, env="AI_HTTP_MAX_CONNECTIONS")
+    ai_http_max_keepalive: int = Field(default=10, env="AI_HTTP_MAX_KEEPALIVE")
+    ai_http_keepalive_expiry: float = Field(default=60.0, env="AI_HTTP_KEEPALIVE_EXPIRY")  # seconds
+    ai_http2: bool = Field(default=False, env="AI_HTTP2")  # requires the 'h2' package
+    ai_streaming: bool = Field(default=True, env="AI_STREAMING")  # SSE streaming with incremental findings
+    
+    # LLM response cache (Redis)
+    ai_cache_enabled: bool = Field(default=True, env="AI_CACHE_ENABLED")
+    ai_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, env="AI_CACHE_TTL_SECONDS")
+    ai_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="AI_CACHE_MAX_BYTES")
+    ai_cache_max_entry_bytes: int = Field(default=1024 * 1024, env="AI_CACHE_MAX_ENTRY_BYTES")
+    
+    # Chunked (map-reduce) analysis of long reports
+    ai_chunked_analysis: bool = Field(default=True, env="AI_CHUNKED_ANALYSIS")
+    ai_chunk_max_chars: int = Field(default=50000, env="AI_CHUNK_MAX_CHARS")
+    ai_chunk_concurrency: int = Field(default=4, env="AI_CHUNK_CONCURRENCY")
+    ai_job_timeout_seconds: int = Field(default=1800, env="AI_JOB_TIMEOUT_SECONDS")  # AI jobs; the analysis gets a budget per chunk round up to this
+    
+    # Hybrid analysis: rules settle clear-cut checklist items, the LLM gets the rest
+    analysis_mode: str = Field(default="ai", env="ANALYSIS_MODE")  # "ai" or "hybrid" (opt-in)
+    checklist_path: str = Field(default="seeds/CHECKLIST_Art22.json", env="CHECKLIST_PATH")
+    ai_context_token_budget: int = Field(default=0, env="AI_CONTEXT_TOKEN_BUDGET")  # report text per prompt, 0 = full text (chunked analysis covers long reports)
+    
+    # Provider rate limiting (shared Redis token bucket per provider/model)
+    ai_rate_limit_enabled: bool = Field(default=True, env="AI_RATE_LIMIT_ENABLED")
+    ai_rate_limit_rpm: int = Field(default=50, env="AI_RATE_LIMIT_RPM")
+    ai_rate_limit_tpm: int = Field(default=50000, env="AI_RATE_LIMIT_TPM")
+    ai_max_concurrency: int = Field(default=8, env="AI_MAX_CONCURRENCY")  # per process, lowered on 429/529
+    ai_max_retries: int = Field(default=4, env="AI_MAX_RETRIES")
+    ai_backoff_base_seconds: float = Field(default=1.0, env="AI_BACKOFF_BASE_SECONDS")
+    ai_backoff_max_seconds: float = Field(default=60.0, env="AI_BACKOFF_MAX_SECONDS")
+    
+    # PDF text extraction
+    pdf_extraction_workers: int = Field(default=1, env="PDF_EXTRACTION_WORKERS")  # 1 = single process, 0 = CPU count
+    pdf_parallel_min_pages: int = Field(default=100, env="PDF_PARALLEL_MIN_PAGES")
+    
+    # Rule packs (default.json, tenants/<tenant_id>.json); reloaded when a file changes
+    rule_packs_dir: str = Field(default="seeds/rules", env="RULE_PACKS_DIR")
     
     # Railway Port (for local testing compatibility)
     port: int = int(os.getenv("PORT", "8000"))
@@ -66,6 +66,24 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 
+@app.on_event("startup")
+async def startup():
+    """Start verifying the storage bucket; requests use the cached readiness state."""
+    from app.services.storage import async_storage
+    async_storage.start_bucket_monitor(settings.storage_bucket_check_seconds)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release shared clients on API shutdown."""
+    from app.services.llm_service import close_http_client
+    from app.redis_queue.conn import close_async_redis
+    from app.services.storage import async_storage
+    await close_http_client()
+    await close_async_redis()
+    async_storage.shutdown()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
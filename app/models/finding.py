@@ -2,7 +2,7 @@
 Finding model for storing analysis findings.
 """
 import uuid
-from sqlalchemy import Column, Text, Enum, ForeignKey
+from sqlalchemy import Column, Text, Enum, ForeignKey, Integer
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from app.database import Base
@@ -24,6 +24,7 @@ class Finding(Base):
     suggestion = Column(Text)
     evidence = Column(JSONB)
     tags = Column(JSONB)
+    page = Column(Integer, nullable=True)  # 1-based page in the source PDF, if located
     
     def __repr__(self):
         return f"<Finding(id={self.id}, rule_id={self.rule_id}, severity={self.severity})>"
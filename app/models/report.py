@@ -6,7 +6,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum as SQLEnum, Float, Text, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum as SQLEnum, Float, Text, BigInteger, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import relationship
 
@@ -58,12 +58,19 @@ class Report(Base):
     file_size = Column(BigInteger, nullable=True)  # File size in bytes
     error_message = Column(Text, nullable=True)  # Error details if processing failed
     deleted_at = Column(DateTime, nullable=True)  # Soft delete timestamp
+    batch_id = Column(UUID(as_uuid=True), nullable=True, index=True)  # Set for batch uploads
+    source_checksum = Column(String(64), nullable=True)  # SHA-256 of the uploaded file, for deduplication
+    source_size = Column(BigInteger, nullable=True)  # Size of the uploaded file in bytes
     
     # Relationships
     tenant = relationship("Tenant", back_populates="reports")
     uploaded_by_user = relationship("User", back_populates="reports")
     audit_logs = relationship("ReportAuditLog", back_populates="report", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index("ix_reports_tenant_source_checksum", "tenant_id", "source_checksum"),
+    )
+    
     def __repr__(self):
         return f"<Report(id={self.id}, filename='{self.filename}', status='{self.status}')>"
 
@@ -1,18 +1,20 @@
 """
 AI Analysis job processing functions for the queue worker - Slice 8 version.
 """
+import asyncio
+import json
+import math
 import uuid
 import logging
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from io import BytesIO
 from pathlib import Path
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 
-from app.database import get_db_url
+from app.config import settings
+from app.redis_queue.db import get_worker_async_session_local
 from app.models.report import Report, ReportAuditLog, ReportStatus, AuditAction
 from app.models.analysis import Analysis
 from app.models.finding import Finding
@@ -20,30 +22,127 @@ from app.models.user import User
 from app.services.storage import storage
 from app.services.prompt_service import PromptService
 from app.services.llm_service import LLMService
-from app.services.analyzer.text_extraction import extract_text_from_pdf
+from app.services.analysis_progress import AnalysisProgress
+from app.services.analyzer.text_extraction import ExtractionResult
+from app.services.analyzer.chunking import split_into_chunks, chunk_prompt, merge_ai_outputs
+from app.services.analyzer.context_builder import build_context
+from app.services.analyzer.prescreen import format_checklist, load_checklist, merge_prescreen, prescreen_checklist
+from app.services.analyzer.scoring import AI_SEVERITY_WEIGHTS
+from app.schemas.ai_output import AIFinding, AIOutput
 from app.services.pdf_generator import generate_conclusion_pdf
 
 logger = logging.getLogger(__name__)
 
 
-async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
+# Estimated tokens of the system prompt and checklist sent with every chunk
+PROMPT_OVERHEAD_TOKENS = 2000
+
+
+def analysis_timeout(text_chars: int) -> float:
+    """
+    Time budget for the AI analysis of a text of `text_chars` characters.
+
+    Chunks are analysed AI_CHUNK_CONCURRENCY at a time and every call may
+    take up to AI_TIMEOUT; when the chunks reserve more tokens than the
+    shared bucket refills per minute, the calls beyond it wait for the
+    refill. The base job timeout covers extraction and storing the results.
+    Capped at AI_JOB_TIMEOUT_SECONDS, the timeout AI jobs are enqueued with.
+    """
+    chunks = max(1, math.ceil(text_chars / settings.ai_chunk_max_chars)) if settings.ai_chunked_analysis else 1
+    rounds = math.ceil(chunks / max(1, settings.ai_chunk_concurrency))
+    budget = settings.job_timeout_seconds + rounds * settings.ai_timeout
+
+    if settings.ai_rate_limit_enabled and settings.ai_rate_limit_tpm > 0:
+        chunk_chars = min(text_chars, settings.ai_chunk_max_chars)
+        reserved = chunks * (chunk_chars // 4 + 1 + settings.ai_max_tokens + PROMPT_OVERHEAD_TOKENS)
+        budget += max(0, reserved - settings.ai_rate_limit_tpm) / settings.ai_rate_limit_tpm * 60
+
+    return min(budget, settings.ai_job_timeout_seconds)
+
+
+async def analyze_text(
+    system_prompt: str,
+    text: str,
+    progress: Optional[AnalysisProgress] = None,
+    prescreened: Sequence[AIFinding] = (),
+    boundaries: Optional[Sequence[int]] = None,
+) -> Tuple[AIOutput, Dict[str, Any]]:
+    """
+    Analyse report text with the LLM, map-reducing over chunks when it is long.
+    
+    Args:
+        system_prompt: Rendered system prompt
+        text: Full extracted report text
+        progress: Optional publisher for findings as they stream in
+        prescreened: Findings already decided by the rules, published up front
+        boundaries: Preferred chunk split offsets (page starts); section
+            boundaries are used when omitted
+        
+    Returns:
+        Tuple of merged AI output and metadata about the calls made
+    """
+    if settings.ai_chunked_analysis:
+        chunks = split_into_chunks(text, settings.ai_chunk_max_chars, boundaries)
+    else:
+        chunks = [text[:settings.ai_chunk_max_chars]]
+    if not chunks:
+        chunks = [text]
+
+    semaphore = asyncio.Semaphore(max(1, settings.ai_chunk_concurrency))
+    if progress:
+        await progress.start(len(chunks))
+        for finding in prescreened:
+            await progress.add_finding(finding)
+
+    async def analyze_chunk(index: int, chunk: str) -> Tuple[AIOutput, bool]:
+        async with semaphore:
+            # One service per chunk: last_call_cached is per call
+            llm = LLMService()
+            output = await llm.call(
+                system_prompt,
+                chunk_prompt(chunk, index, len(chunks)),
+                on_finding=progress.add_finding if progress else None,
+            )
+            if progress:
+                await progress.chunk_done()
+            return output, llm.last_call_cached
+
+    results = await asyncio.gather(*(analyze_chunk(i, c) for i, c in enumerate(chunks)))
+    if len(chunks) > 1:
+        logger.info(f"Analysed {len(text)} characters in {len(chunks)} chunks")
+
+    metadata = {
+        "llm_cache_hit": all(cached for _, cached in results),
+        "chunks": len(chunks),
+        "chunk_chars": [len(c) for c in chunks],
+    }
+    return merge_ai_outputs([output for output, _ in results]), metadata
+
+
+async def run_ai_analysis(
+    report_id: str,
+    tenant_id: str,
+    extraction: ExtractionResult,
+    extraction_cached: bool = False,
+    mode: Optional[str] = None,
+):
     """
     Run AI analysis on a report using LLM services.
     
     Args:
         report_id: The UUID of the report to analyze
         tenant_id: The tenant ID for prompt overrides
-        pdf_bytes: The PDF content as bytes
+        extraction: Extracted text of the source PDF
+        extraction_cached: Whether the extraction was loaded from the cache
+        mode: "ai" or "hybrid" (defaults to settings.analysis_mode)
     """
     logger.info(f"Starting AI analysis for report {report_id}")
+    progress = AnalysisProgress(report_id)
+    hybrid = (mode or settings.analysis_mode) == "hybrid"
     
     try:
-        # Create async database session
-        from app.config import settings
-        db_url = settings.database_url  # This is already async URL
-        from sqlalchemy.ext.asyncio import create_async_engine
-        engine = create_async_engine(db_url)
-        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        # Pooled async session factory shared by jobs on this event loop
+        async_session = get_worker_async_session_local()
         
         async with async_session() as session:
             try:
@@ -56,25 +155,38 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                 session.add(audit_start)
                 await session.commit()
 
-                # 1) Extract text from PDF
-                temp_pdf_path = f"/tmp/ai_analysis_{report_id}.pdf"
-                with open(temp_pdf_path, "wb") as f:
-                    f.write(pdf_bytes)
-                
-                try:
-                    text = extract_text_from_pdf(Path(temp_pdf_path))
-                    logger.info(f"Extracted {len(text)} characters from PDF")
-                except Exception as e:
-                    logger.error(f"Text extraction failed: {e}")
-                    raise
+                # 1) Text was extracted (or loaded from the extraction cache) by the job
+                text = extraction.text
+                logger.info(f"Analysing {len(text)} characters from {extraction.page_count} pages")
 
                 # 2) Get active prompt with tenant override
                 ps = PromptService(session)
                 prompt_template = await ps.get_active_prompt("analysis_v1", tenant_id=tenant_id)
                 
-                # 3) Inject placeholders
+                # 3) Hybrid mode: the rules settle clear-cut checklist items, the LLM only
+                #    gets the unresolved items
+                checklist = load_checklist()
+                prescreen = None
+                if hybrid:
+                    prescreen = prescreen_checklist(checklist, text, extraction.page_index)
+                    logger.info(
+                        f"Pre-screen decided {len(prescreen.decided)} checklist items, "
+                        f"{len(prescreen.unresolved)} left for the LLM"
+                    )
+
+                # Only the sections relevant for those items, packed into the token budget
+                context = build_context(
+                    text, prescreen.unresolved if prescreen else checklist.items, settings.ai_context_token_budget
+                )
+                llm_text = context.text
+                logger.info(
+                    f"Context: {len(context.selected)}/{len(context.sections)} sections, "
+                    f"{len(llm_text)}/{len(text)} characters"
+                )
+
+                # Inject placeholders
                 mapping = {
-                    "CHECKLIST": """
+                    "CHECKLIST": format_checklist(prescreen.unresolved) if prescreen else """
 - Scope van onderzoek
 - Risicobeoordeling  
 - Handtekening inspecteur
@@ -85,7 +197,7 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
 - Foto's en bewijs
 - Aanbevelingen
 """,
-                    "SEVERITY_WEIGHTS": '{"CRITICAL":30,"HIGH":15,"MEDIUM":7,"LOW":3}',
+                    "SEVERITY_WEIGHTS": json.dumps(AI_SEVERITY_WEIGHTS, separators=(",", ":")),
                     "OUTPUT_SCHEMA": """
 {
   "report_summary": "string",
@@ -106,37 +218,78 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
 """
                 }
                 system_prompt = ps.inject_placeholders(prompt_template, mapping)
-                user_prompt = text[:50000]  # Limit to 50k chars for API limits
 
-                # 4) Call LLM
-                try:
-                    llm = LLMService()
-                    ai_output = await llm.call(system_prompt, user_prompt)
-                    logger.info(f"AI analysis completed: score={ai_output.score}, findings={len(ai_output.findings)}")
-                except Exception as e:
-                    logger.error(f"AI analysis failed: {e}")
-                    # Mark as failed - no fallback analysis
-                    raise Exception(f"AI analysis failed: {e}")
+                # 4) Call LLM (one call per chunk for long reports)
+                decided_by: Dict[str, str] = {}
+                if prescreen is not None and not prescreen.unresolved:
+                    # Everything was settled by the rules, no LLM call needed
+                    await progress.start(0)
+                    for finding in prescreen.decided:
+                        await progress.add_finding(finding)
+                    ai_output, decided_by = merge_prescreen(prescreen, None)
+                    chunk_metadata = {"llm_cache_hit": False, "chunks": 0, "chunk_chars": []}
+                else:
+                    try:
+                        # Chunks split at page starts when the LLM gets the full text
+                        page_starts = list(extraction.page_index.starts[1:]) if llm_text == text else None
+                        ai_output, chunk_metadata = await analyze_text(
+                            system_prompt, llm_text, progress, prescreened=prescreen.decided if prescreen else (),
+                            boundaries=page_starts,
+                        )
+                        logger.info(f"AI analysis completed: score={ai_output.score}, findings={len(ai_output.findings)}")
+                    except Exception as e:
+                        logger.error(f"AI analysis failed: {e}")
+                        # Mark as failed - no fallback analysis
+                        raise Exception(f"AI analysis failed: {e}")
+                    if prescreen is not None:
+                        ai_output, decided_by = merge_prescreen(prescreen, ai_output)
+
+                # 5) Map evidence to source pages (the model only sees text without page numbers)
+                page_index = extraction.page_index
+                ai_output.findings = [
+                    f.model_copy(update={"page": page_index.locate(text, f.evidence_snippet) or f.page})
+                    for f in ai_output.findings
+                ]
+
+                # 6) Create Analysis record
+                raw_metadata = {
+                    "ai_analysis": True,
+                    "provider": "anthropic",
+                    "page_count": extraction.page_count,
+                    "extraction_cached": extraction_cached,
+                    "analysis_mode": "hybrid" if hybrid else "ai",
+                    **chunk_metadata,
+                    "context": context.metadata(),
+                }
+                rules_passed = rules_failed = 0
+                if prescreen is not None:
+                    # Which engine decided each checklist item
+                    raw_metadata["decided_by"] = decided_by
+                    raw_metadata["prescreen"] = {
+                        "decided": len(prescreen.decided),
+                        "unresolved": [item.code for item in prescreen.unresolved],
+                    }
+                    rules_passed = sum(1 for f in prescreen.decided if f.status == "PASS")
+                    rules_failed = len(prescreen.decided) - rules_passed
 
-                # 5) Create Analysis record
                 analysis = Analysis(
                     id=uuid.uuid4(),
                     report_id=uuid.UUID(report_id),
-                    engine="ai_anthropic",
+                    engine="hybrid" if hybrid else "ai_anthropic",
                     engine_version="claude-3-5-sonnet-20241022",
                     score=ai_output.score,
                     summary=ai_output.report_summary or "AI analyse voltooid",
-                    rules_passed=0,  # AI doesn't use rules
-                    rules_failed=0,
+                    rules_passed=rules_passed,
+                    rules_failed=rules_failed,
                     started_at=datetime.now(timezone.utc),
                     finished_at=datetime.now(timezone.utc),
                     duration_ms=0,  # Could be calculated
-                    raw_metadata={"ai_analysis": True, "provider": "anthropic"}
+                    raw_metadata=raw_metadata
                 )
                 session.add(analysis)
                 await session.flush()  # Get the analysis ID
 
-                # 6) Create Finding records
+                # 7) Create Finding records
                 for finding in ai_output.findings:
                     finding_record = Finding(
                         analysis_id=analysis.id,
@@ -146,14 +299,15 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                         message=finding.title or finding.code,
                         suggestion=finding.suggested_fix,
                         evidence=finding.evidence_snippet,
-                        tags=[]  # AI findings don't have tags
+                        tags=[decided_by[finding.code]] if finding.code in decided_by else [],
+                        page=finding.page
                     )
                     session.add(finding_record)
                 
                 # Commit all changes
                 await session.commit()
 
-                # 7) Update Report
+                # 8) Update Report
                 report = await session.get(Report, uuid.UUID(report_id))
                 if report:
                     report.score = ai_output.score
@@ -162,7 +316,7 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                     report.updated_at = datetime.now(timezone.utc)
                     await session.commit()
 
-                # 8) Generate conclusion PDF
+                # 9) Generate conclusion PDF
                 try:
                     logger.info(f"Generating conclusion PDF for report {report_id}")
                     
@@ -186,7 +340,8 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                                 "title": f.title,
                                 "status": f.status,
                                 "severity": f.severity,
-                                "evidence_snippet": f.evidence_snippet
+                                "evidence_snippet": f.evidence_snippet,
+                                "page": f.page
                             }
                             for f in ai_output.findings
                         ]
@@ -215,12 +370,14 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                 )
                 session.add(audit_done)
                 await session.commit()
+                await progress.finish("DONE")
 
                 logger.info(f"AI analysis successfully completed for report {report_id}")
 
             except Exception as e:
                 await session.rollback()
                 logger.error(f"AI analysis failed for report {report_id}: {e}")
+                await progress.finish("FAILED", str(e))
                 
                 # Log analysis failure
                 audit_failed = ReportAuditLog(
@@ -232,13 +389,7 @@ async def run_ai_analysis(report_id: str, tenant_id: str, pdf_bytes: bytes):
                 await session.commit()
                 
                 raise
-            finally:
-                # Cleanup temp file
-                try:
-                    Path(temp_pdf_path).unlink(missing_ok=True)
-                except Exception as e:
-                    logger.warning(f"Failed to cleanup temp file: {e}")
-                
+
     except Exception as e:
         logger.error(f"AI analysis pipeline failed for report {report_id}: {e}")
         raise
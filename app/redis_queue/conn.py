@@ -1,29 +1,102 @@
 """
 Queue connection and configuration for Redis and RQ.
 """
+import asyncio
+import threading
+import weakref
+from typing import Optional, Tuple
+
 import redis
+import redis.asyncio as aioredis
 from rq import Queue
 from app.config import settings
 
+# Priority lanes, highest first: interactive work (single uploads, re-analysis) before bulk intake
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_BULK)
+
+# Queue that predates the lanes; still drained after the lane queues
+LEGACY_QUEUE = "reports"
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+# Async clients are bound to the event loop they were created on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def redis_conn() -> redis.Redis:
+    """
+    Get the process-wide Redis client.
+
+    The client is backed by one connection pool, so callers reuse open
+    connections instead of connecting (and pinging) per call. Idle
+    connections are health-checked before reuse, and the pool resets itself
+    in forked processes. Connection errors surface on the first command.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                pool = redis.ConnectionPool.from_url(
+                    settings.redis_url,
+                    max_connections=settings.redis_max_connections or None,
+                    health_check_interval=settings.redis_health_check_interval,
+                    socket_connect_timeout=2,
+                    socket_keepalive=True,
+                )
+                _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def async_redis_conn() -> aioredis.Redis:
+    """Get the async Redis client for the running event loop (created lazily, no ping)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_redis() -> None:
+    """Close the async Redis client of the running event loop."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def queue_name(tenant_id: str, lane: str = LANE_INTERACTIVE) -> str:
+    """Name of the queue for a tenant in a lane."""
+    if lane not in LANES:
+        raise ValueError(f"Unknown queue lane: {lane}")
+    return f"{LEGACY_QUEUE}:{lane}:{tenant_id}"
+
+
+def parse_queue_name(name: str) -> Optional[Tuple[str, str]]:
+    """Return (lane, tenant_id) for a lane queue name, None for other queues."""
+    parts = name.split(":", 2)
+    if len(parts) != 3 or parts[0] != LEGACY_QUEUE or parts[1] not in LANES:
+        return None
+    return parts[1], parts[2]
 
-def redis_conn():
-    """Get Redis connection."""
-    try:
-        conn = redis.from_url(settings.redis_url)
-        # Test connection
-        conn.ping()
-        return conn
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to connect to Redis at {settings.redis_url}: {e}")
-        raise
 
+def reports_queue(tenant_id: Optional[str] = None, lane: str = LANE_INTERACTIVE):
+    """
+    Get the reports processing queue.
 
-def reports_queue():
-    """Get the reports processing queue."""
+    With a tenant_id this is the tenant's queue in the given lane, which the
+    worker drains by lane priority and fair share; without one it is the
+    legacy shared queue.
+    """
     return Queue(
-        "reports", 
+        queue_name(str(tenant_id), lane) if tenant_id else LEGACY_QUEUE,
         connection=redis_conn(), 
         default_timeout=settings.job_timeout_seconds
     )
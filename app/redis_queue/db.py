@@ -0,0 +1,135 @@
+"""
+Worker-lifetime database engine registry for RQ jobs.
+
+Engines are created lazily once per worker process and shared by every job
+function, so jobs reuse pooled connections instead of paying a full
+connect/auth handshake per report.
+"""
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import get_db_url
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# Sync engine (psycopg2) used by the RQ job functions
+_sync_engine: Optional[Engine] = None
+_SyncSessionLocal: Optional[sessionmaker] = None
+_sync_engine_pid: Optional[int] = None
+
+# Async engines (asyncpg) are bound to the event loop they were created on,
+# so they are registered per loop.
+_async_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncEngine]" = weakref.WeakKeyDictionary()
+_async_session_factories: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, async_sessionmaker]" = weakref.WeakKeyDictionary()
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    """Pool configuration shared by the sync and async worker engines."""
+    return {
+        "pool_size": settings.worker_db_pool_size,
+        "max_overflow": settings.worker_db_max_overflow,
+        "pool_pre_ping": settings.worker_db_pool_pre_ping,
+        "pool_recycle": settings.worker_db_pool_recycle,
+    }
+
+
+def get_worker_engine() -> Engine:
+    """Get the pooled sync engine for this worker process, creating it if necessary."""
+    global _sync_engine, _SyncSessionLocal, _sync_engine_pid
+    pid = os.getpid()
+    if _sync_engine is not None and _sync_engine_pid == pid:
+        return _sync_engine
+
+    with _lock:
+        if _sync_engine is not None and _sync_engine_pid != pid:
+            # Forked child (e.g. an RQ work horse): never share the parent's sockets
+            _sync_engine.dispose(close=False)
+            _sync_engine = None
+
+        if _sync_engine is None:
+            db_url = get_db_url()
+            logger.info(f"Creating worker database engine: {db_url[:50]}...")
+            _sync_engine = create_engine(db_url, **_pool_kwargs())
+            _SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_sync_engine)
+            _sync_engine_pid = pid
+
+    return _sync_engine
+
+
+def get_worker_session_local() -> sessionmaker:
+    """Get the sync session factory bound to the worker engine."""
+    get_worker_engine()
+    return _SyncSessionLocal
+
+
+def get_worker_async_engine() -> AsyncEngine:
+    """Get the pooled async engine for the running event loop, creating it if necessary."""
+    loop = asyncio.get_running_loop()
+    engine = _async_engines.get(loop)
+    if engine is None:
+        engine = create_async_engine(settings.database_url, **_pool_kwargs())
+        _async_engines[loop] = engine
+        _async_session_factories[loop] = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        logger.info("Created worker async database engine")
+    return engine
+
+
+def get_worker_async_session_local() -> async_sessionmaker:
+    """Get the async session factory for the running event loop."""
+    get_worker_async_engine()
+    return _async_session_factories[asyncio.get_running_loop()]
+
+
+async def dispose_worker_async_engine() -> None:
+    """Dispose the async engine registered for the running event loop."""
+    loop = asyncio.get_running_loop()
+    engine = _async_engines.pop(loop, None)
+    _async_session_factories.pop(loop, None)
+    if engine is not None:
+        await engine.dispose()
+        logger.info("Disposed worker async database engine")
+
+
+def dispose_worker_engines() -> None:
+    """Dispose the sync worker engine on worker shutdown."""
+    global _sync_engine, _SyncSessionLocal, _sync_engine_pid
+    with _lock:
+        if _sync_engine is not None:
+            _sync_engine.dispose()
+            logger.info("Disposed worker database engine")
+        _sync_engine = None
+        _SyncSessionLocal = None
+        _sync_engine_pid = None
+
+
+def _stats_for(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Return connection pool statistics for sizing the worker pools."""
+    return {
+        "config": _pool_kwargs(),
+        "sync": _stats_for(_sync_engine) if _sync_engine is not None else None,
+        "async": [_stats_for(engine.sync_engine) for engine in list(_async_engines.values())],
+    }
@@ -0,0 +1,130 @@
+"""
+Long-lived asyncio event loop for the RQ worker.
+
+The worker owns one event loop running in a background thread. Sync job
+functions submit coroutines to it, so async resources (asyncpg pools, HTTP
+keep-alive connections, DNS cache) survive from one job to the next.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+
+from app.redis_queue.conn import close_async_redis
+from app.redis_queue.db import dispose_worker_async_engine
+from app.services.llm_service import close_http_client
+
+logger = logging.getLogger(__name__)
+
+# Async callables run on a loop right before it stops, to release loop-bound resources
+_shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+
+
+def register_shutdown_hook(hook: Callable[[], Awaitable[None]]) -> None:
+    """Register an async cleanup callable to run on the worker loop at shutdown."""
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
+async def run_shutdown_hooks() -> None:
+    """Run the registered hooks on the current loop; a failing hook doesn't stop the others."""
+    for hook in _shutdown_hooks:
+        try:
+            await hook()
+        except Exception as e:
+            logger.warning(f"Worker loop shutdown hook {hook!r} failed: {e}")
+
+
+register_shutdown_hook(close_http_client)
+register_shutdown_hook(close_async_redis)
+register_shutdown_hook(dispose_worker_async_engine)
+
+
+class WorkerEventLoop:
+    """Persistent event loop running in a daemon thread."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def _run(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(started.set)
+        self._loop.run_forever()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if it is not running yet."""
+        with self._lock:
+            if self.is_running:
+                return self._loop
+            self._loop = asyncio.new_event_loop()
+            started = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(started,), name="worker-event-loop", daemon=True
+            )
+            self._thread.start()
+            started.wait()
+            logger.info("Worker event loop started")
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the worker loop and block until it finishes."""
+        if not self.is_running:
+            coro.close()
+            raise RuntimeError("Worker event loop is not running")
+        future: Future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Job timeout or shutdown: don't leave the coroutine running on the loop
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 10) -> None:
+        """Run shutdown hooks, stop the loop and join the thread."""
+        with self._lock:
+            if not self.is_running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(run_shutdown_hooks(), self._loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Worker loop shutdown hooks did not finish: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info("Worker event loop stopped")
+
+
+# Global worker loop instance
+worker_loop = WorkerEventLoop()
+
+
+def run_async(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine from sync job code.
+
+    Uses the persistent worker loop when it is running, otherwise falls back
+    to a throwaway loop (e.g. forking workers or scripts).
+    """
+    if worker_loop.is_running:
+        return worker_loop.submit(coro, timeout)
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        # Pools and clients are bound to this loop, release them before closing
+        loop.run_until_complete(run_shutdown_hooks())
+        loop.close()
@@ -0,0 +1,151 @@
+"""
+Lane priority and weighted fair share for the report queues.
+
+Every tenant has a queue per lane (see conn.queue_name). Before each
+dequeue the worker orders the queues by lane (interactive before bulk) and
+within a lane by the tenant's recent usage divided by its weight, so the
+tenant that got the least work lately is served first. Usage decays with a
+half-life: a large backlog of one tenant is interleaved with everyone
+else's jobs, and a tenant that comes back after a quiet period goes first.
+
+Usage is tracked per worker process. Each worker shares out its own slots
+fairly, which keeps the overall share fair as well.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis
+from rq import Queue
+from rq.utils import as_text
+
+from app.config import settings
+from app.redis_queue.conn import LANES, LEGACY_QUEUE, parse_queue_name
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tenant_weights(value: str) -> Dict[str, float]:
+    """Parse "tenant_id:weight,..." into a dict; invalid entries are skipped."""
+    weights: Dict[str, float] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        tenant_id, _, weight = entry.rpartition(":")
+        try:
+            parsed = float(weight)
+        except ValueError:
+            parsed = 0.0
+        if not tenant_id.strip() or parsed <= 0:
+            logger.warning(f"Ignoring invalid tenant queue weight: {entry!r}")
+            continue
+        weights[tenant_id.strip()] = parsed
+    return weights
+
+
+def _report_queue_names(connection: Redis) -> List[str]:
+    """Names of the legacy queue and all lane queues registered in RQ."""
+    prefix = Queue.redis_queue_namespace_prefix
+    names = {LEGACY_QUEUE}
+    for key in connection.smembers(Queue.redis_queues_keys):
+        name = as_text(key)[len(prefix):]
+        if parse_queue_name(name):
+            names.add(name)
+    return sorted(names)
+
+
+class FairShareScheduler:
+    """Orders the report queues for dequeueing and tracks usage per tenant."""
+
+    def __init__(
+        self,
+        connection: Redis,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        half_life: Optional[float] = None,
+        refresh_interval: Optional[int] = None,
+    ):
+        self.connection = connection
+        if tenant_weights is None:
+            tenant_weights = parse_tenant_weights(settings.queue_tenant_weights)
+        self.tenant_weights = tenant_weights
+        self.half_life = half_life or settings.queue_fair_share_half_life
+        self.refresh_interval = refresh_interval or settings.queue_refresh_seconds
+        self._queues: Dict[str, Queue] = {}
+        self._refreshed_at: Optional[float] = None
+        self._usage: Dict[str, Tuple[float, float]] = {}  # tenant_id -> (usage, monotonic time)
+
+    def queues(self) -> List[Queue]:
+        """All report queues; new tenant queues are discovered every refresh_interval."""
+        now = time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_interval:
+            self._queues = {
+                name: self._queues.get(name) or Queue(name, connection=self.connection)
+                for name in _report_queue_names(self.connection)
+            }
+            self._refreshed_at = now
+        return list(self._queues.values())
+
+    def share(self, tenant_id: str, now: Optional[float] = None) -> float:
+        """Decayed usage of a tenant relative to its weight (lower is served first)."""
+        usage, at = self._usage.get(tenant_id, (0.0, 0.0))
+        if usage:
+            now = time.monotonic() if now is None else now
+            usage *= 0.5 ** ((now - at) / self.half_life)
+        return usage / self.tenant_weights.get(tenant_id, 1.0)
+
+    def ordered_queues(self) -> List[Queue]:
+        """Queues in dequeue order: lane priority, then fair share; the legacy queue last."""
+        now = time.monotonic()
+
+        def key(queue: Queue):
+            parsed = parse_queue_name(queue.name)
+            if parsed is None:
+                return (len(LANES), 0.0, queue.name)
+            lane, tenant_id = parsed
+            return (LANES.index(lane), self.share(tenant_id, now), queue.name)
+
+        return sorted(self.queues(), key=key)
+
+    def charge(self, queue: Queue) -> None:
+        """Record that a job of the queue's tenant was dequeued."""
+        parsed = parse_queue_name(queue.name)
+        if parsed is None:
+            return
+        tenant_id = parsed[1]
+        now = time.monotonic()
+        self._usage[tenant_id] = (self.share(tenant_id, now) * self.tenant_weights.get(tenant_id, 1.0) + 1.0, now)
+
+
+def queue_depths(connection: Redis, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Jobs waiting per lane and per tenant.
+
+    Args:
+        connection: Redis connection
+        tenant_id: Only list this tenant (lane totals still cover all tenants)
+
+    Returns:
+        {"lanes": {lane: n}, "legacy": n, "tenants": {tenant_id: {lane: n}}}
+    """
+    names = _report_queue_names(connection)
+    prefix = Queue.redis_queue_namespace_prefix
+    with connection.pipeline(transaction=False) as pipeline:
+        for name in names:
+            pipeline.llen(prefix + name)
+        counts = pipeline.execute()
+
+    lanes = {lane: 0 for lane in LANES}
+    tenants: Dict[str, Dict[str, int]] = {}
+    legacy = 0
+    for name, count in zip(names, counts):
+        parsed = parse_queue_name(name)
+        if parsed is None:
+            legacy = count
+            continue
+        lane, queue_tenant = parsed
+        lanes[lane] += count
+        if (tenant_id is None and count) or queue_tenant == tenant_id:
+            tenants.setdefault(queue_tenant, {lane: 0 for lane in LANES})[lane] = count
+    if tenant_id is not None:
+        tenants.setdefault(tenant_id, {lane: 0 for lane in LANES})
+    return {"lanes": lanes, "legacy": legacy, "tenants": tenants}
@@ -5,24 +5,25 @@ import uuid
 import logging
 from datetime import datetime
 from typing import List, Dict, Any
-from io import BytesIO
 from pathlib import Path
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 
-from app.database import get_db_url
+from app.config import settings
+from app.redis_queue.db import get_worker_session_local
+from app.redis_queue.event_loop import run_async
 from app.models.report import Report, ReportAuditLog, ReportStatus, AuditAction
 from app.models.analysis import Analysis
 from app.models.finding import Finding
 from app.models.user import User
 from app.services.storage import storage
-from app.services.analyzer.rules import analyze_text_to_result, run_rules_v1, RULES_VERSION
-from app.services.analyzer.text_extraction import extract_text_from_pdf
+from app.services.analyzer.rules import analyze_text_to_result, run_rules_v1
+from app.services.analyzer.rule_packs import get_rule_pack
+from app.services.extraction_cache import get_extraction, extraction_key
+from app.services.dedup import object_key_in_use
 from app.services.pdf.conclusion_reportlab import build_conclusion_pdf
 from app.services.email import email_service
-from app.redis_queue.ai_analysis import run_ai_analysis
+from app.redis_queue.ai_analysis import analysis_timeout, run_ai_analysis
 
 logger = logging.getLogger(__name__)
 
@@ -57,11 +58,8 @@ def _process_report_ai(report_id: str) -> bool:
     logger.info(f"Starting AI analysis for report {report_id}")
     
     try:
-        # Create sync database session for RQ worker
-        db_url = get_db_url()
-        logger.info(f"Using database URL: {db_url[:50]}...")
-        engine = create_engine(db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Shared, pooled session factory for this worker process
+        SessionLocal = get_worker_session_local()
     except Exception as e:
         logger.error(f"Failed to create database engine: {e}")
         return False
@@ -83,40 +81,22 @@ def _process_report_ai(report_id: str) -> bool:
             session.add(audit_start)
             session.commit()
 
-            # Download PDF from storage and run AI analysis
+            # Get the extracted text and run AI analysis
             try:
-                # Get PDF from storage
                 if not report.source_object_key:
                     logger.error(f"No source file found for report {report_id}")
                     return False
                 
-                # Download PDF from storage
-                pdf_file = storage.download_fileobj(report.source_object_key)
-                if not pdf_file:
-                    logger.error(f"Failed to download PDF for report {report_id}")
-                    return False
-                
-                # Read PDF bytes
-                pdf_bytes = pdf_file.read()
-                pdf_file.close()
-                
-                logger.info(f"Downloaded PDF for report {report_id}: {len(pdf_bytes)} bytes")
+                # Reuses the stored extraction; only downloads and parses the PDF the first time
+                extraction, extraction_cached = get_extraction(report.source_object_key)
                 
-                # Run AI analysis
-                from app.redis_queue.ai_analysis import run_ai_analysis
-                import asyncio
-                
-                # Run async AI analysis in sync context
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    result = loop.run_until_complete(
-                        run_ai_analysis(str(report.id), str(report.tenant_id), pdf_bytes)
-                    )
-                    logger.info(f"AI analysis completed for report {report_id}")
-                    return True
-                finally:
-                    loop.close()
+                # Run async AI analysis on the worker event loop, with a budget for its chunks
+                run_async(
+                    run_ai_analysis(str(report.id), str(report.tenant_id), extraction, extraction_cached),
+                    timeout=analysis_timeout(len(extraction.text))
+                )
+                logger.info(f"AI analysis completed for report {report_id}")
+                return True
                     
             except Exception as e:
                 logger.error(f"AI analysis failed for report {report_id}: {e}")
@@ -150,11 +130,8 @@ def process_report(report_id: str) -> bool:
     logger.info(f"Starting to process report {report_id}")
     
     try:
-        # Create sync database session for RQ worker
-        db_url = get_db_url()
-        logger.info(f"Using database URL: {db_url[:50]}...")
-        engine = create_engine(db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Shared, pooled session factory for this worker process
+        SessionLocal = get_worker_session_local()
     except Exception as e:
         logger.error(f"Failed to create database engine: {e}")
         return False
@@ -178,22 +155,19 @@ def process_report(report_id: str) -> bool:
 
             logger.info(f"Starting rule-based analysis for report {report_id}")
 
-            # TODO: Download source PDF from DigitalOcean Spaces to temp file
-            # For now, we'll use a placeholder path - this needs to be implemented
-            # based on your storage setup
-            temp_pdf_path = f"/tmp/source_{report.id}.pdf"
-            
-            # Extract text from PDF
+            # Extract text from the source PDF in memory (or reuse the stored extraction)
             try:
-                text = extract_text_from_pdf(temp_pdf_path)
+                extraction, _ = get_extraction(report.source_object_key)
+                text = extraction.text
                 logger.info(f"Extracted {len(text)} characters from PDF")
             except Exception as e:
                 logger.error(f"Text extraction failed: {e}")
                 raise Exception(f"PDF text extraction failed: {e}")
 
-            # Run rule-based analysis
-            analysis_result = analyze_text_to_result(report.id, text)
-            raw_findings = run_rules_v1(text)
+            # Run rule-based analysis with the tenant's (or the default) rule pack
+            rule_pack = get_rule_pack(str(report.tenant_id))
+            analysis_result = analyze_text_to_result(report.id, text, extraction.page_index, rule_pack)
+            raw_findings = analysis_result.findings
             
             logger.info(f"Analysis completed: score={analysis_result.score}, findings={len(raw_findings)}")
 
@@ -210,7 +184,7 @@ def process_report(report_id: str) -> bool:
                 started_at=analysis_result.started_at,
                 finished_at=analysis_result.finished_at,
                 duration_ms=analysis_result.duration_ms,
-                raw_metadata={"source_bytes": len(text) if text else None}
+                raw_metadata={"source_bytes": len(text) if text else None, "rule_pack": rule_pack.info()}
             )
             session.add(analysis)
             session.flush()  # Get the analysis ID
@@ -225,7 +199,8 @@ def process_report(report_id: str) -> bool:
                     message=finding.message,
                     suggestion=finding.suggestion,
                     evidence=finding.evidence,
-                    tags=finding.tags
+                    tags=finding.tags,
+                    page=finding.page
                 )
                 session.add(finding_record)
 
@@ -250,11 +225,9 @@ def process_report(report_id: str) -> bool:
             storage_key = f"tenants/{report.tenant_id}/reports/{report.id}/output.pdf"
             
             with open(pdf_temp_path, 'rb') as pdf_file:
-                pdf_buffer = BytesIO(pdf_file.read())
-                
-                # Use new method that returns checksum and file size
+                # Streams the file; returns checksum and file size
                 success, checksum, file_size = storage.upload_fileobj_with_checksum(
-                    pdf_buffer,
+                    pdf_file,
                     storage_key,
                     "application/pdf"
                 )
@@ -272,7 +245,7 @@ def process_report(report_id: str) -> bool:
             report.storage_key = storage_key  # New field for Slice 6
             report.checksum = checksum
             report.file_size = file_size
-            report.analysis_version = RULES_VERSION
+            report.analysis_version = analysis_result.engine_version
             report.analysis_duration_ms = analysis_result.duration_ms
             report.summary = analysis_result.summary
             # Keep findings_json for backward compatibility
@@ -378,10 +351,8 @@ def purge_deleted_reports() -> int:
     logger.info("Starting purge job for deleted reports")
     
     try:
-        # Create sync database session for RQ worker
-        db_url = get_db_url()
-        engine = create_engine(db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Shared, pooled session factory for this worker process
+        SessionLocal = get_worker_session_local()
     except Exception as e:
         logger.error(f"Failed to create database engine for purge job: {e}")
         return 0
@@ -404,15 +375,24 @@ def purge_deleted_reports() -> int:
                     # Delete files from storage
                     files_deleted = 0
                     
+                    # Objects shared with deduplicated reports are kept until the last one goes
+                    source_key = report.source_object_key
+                    if source_key and object_key_in_use(session, source_key, report.id):
+                        source_key = None
+                    
                     # Delete source file
-                    if report.source_object_key:
-                        if storage.delete_object(report.source_object_key):
+                    if source_key:
+                        if storage.delete_object(source_key):
                             files_deleted += 1
-                            logger.info(f"Deleted source file: {report.source_object_key}")
+                            logger.info(f"Deleted source file: {source_key}")
+                    
+                    # Delete cached text extraction (may not exist)
+                    if source_key:
+                        storage.delete_object(extraction_key(source_key))
                     
                     # Delete conclusion file (storage_key or conclusion_object_key)
                     conclusion_key = report.storage_key or report.conclusion_object_key
-                    if conclusion_key:
+                    if conclusion_key and not object_key_in_use(session, conclusion_key, report.id):
                         if storage.delete_object(conclusion_key):
                             files_deleted += 1
                             logger.info(f"Deleted conclusion file: {conclusion_key}")
@@ -17,6 +17,7 @@ class FindingDTO(BaseModel):
     suggestion: Optional[str] = None
     evidence: Optional[dict] = None
     tags: Optional[List[str]] = None
+    page: Optional[int] = None
 
 
 class AnalysisDTO(BaseModel):
@@ -2,7 +2,7 @@
 Report schemas for API requests and responses.
 """
 from datetime import datetime
-from typing import Optional, List, Literal, TYPE_CHECKING
+from typing import Dict, Optional, List, Literal, TYPE_CHECKING
 from pydantic import BaseModel, Field
 
 from app.models.report import ReportStatus
@@ -55,6 +55,47 @@ class ReportOut(ReportBase):
         return cls(**data)
 
 
+class RejectedFile(BaseModel):
+    """File of a batch upload that was not accepted."""
+    filename: str = Field(..., description="Filename (ZIP entries without their folder)")
+    reason: str = Field(..., description="Why the file was rejected")
+
+
+class BatchUploadOut(BaseModel):
+    """Schema for batch upload responses."""
+    batch_id: str = Field(..., description="Batch ID")
+    accepted: int = Field(..., description="Number of reports created")
+    rejected: List[RejectedFile] = Field(default_factory=list, description="Files that were not accepted")
+    reports: List[ReportOut] = Field(default_factory=list, description="Created reports")
+
+
+class BatchReportStatus(BaseModel):
+    """Status of one report in a batch."""
+    id: str
+    filename: str
+    status: ReportStatus
+    score: Optional[float] = None
+    finding_count: int = 0
+
+
+class BatchProgress(BaseModel):
+    """Aggregate progress of a batch."""
+    batch_id: str
+    total: int
+    processing: int
+    done: int
+    failed: int
+    progress: float = Field(..., description="Fraction of reports that finished (0-1)")
+    reports: List[BatchReportStatus]
+
+
+class QueueDepthOut(BaseModel):
+    """Waiting processing jobs per lane and per tenant."""
+    lanes: Dict[str, int] = Field(..., description="Waiting jobs per lane (all tenants)")
+    legacy: int = Field(0, description="Waiting jobs in the shared pre-lane queue")
+    tenants: Dict[str, Dict[str, int]] = Field(default_factory=dict, description="Waiting jobs per tenant and lane")
+
+
 class ReportAuditLogBase(BaseModel):
     """Base audit log schema."""
     action: str = Field(..., description="Action performed")
@@ -0,0 +1,91 @@
+"""
+Live progress of running AI analyses.
+
+While a report is analysed the worker publishes its state and every finding
+as it streams in to Redis; the API reads it back so the UI can show findings
+before the analysis is stored. Entries expire on their own and publishing is
+best-effort: a Redis problem never fails the analysis.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.redis_queue.conn import async_redis_conn
+from app.schemas.ai_output import AIFinding
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PREFIX = "report_progress"
+PROGRESS_TTL_SECONDS = 3600
+
+
+def _state_key(report_id: str) -> str:
+    return f"{PROGRESS_PREFIX}:{report_id}"
+
+
+def _findings_key(report_id: str) -> str:
+    return f"{PROGRESS_PREFIX}:{report_id}:findings"
+
+
+class AnalysisProgress:
+    """Publishes the progress of one report analysis."""
+
+    def __init__(self, report_id: str):
+        self.report_id = report_id
+
+    async def _update(self, fields: Dict[str, Any], finding: Optional[AIFinding] = None) -> None:
+        try:
+            r = async_redis_conn()
+            fields["updated_at"] = datetime.now(timezone.utc).isoformat()
+            async with r.pipeline(transaction=True) as pipe:
+                if finding is not None:
+                    pipe.rpush(_findings_key(self.report_id), finding.model_dump_json())
+                    pipe.expire(_findings_key(self.report_id), PROGRESS_TTL_SECONDS)
+                pipe.hset(_state_key(self.report_id), mapping={k: str(v) for k, v in fields.items()})
+                pipe.expire(_state_key(self.report_id), PROGRESS_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish analysis progress for report {self.report_id}: {e}")
+
+    async def start(self, chunks_total: int) -> None:
+        """Reset progress for a (re)started analysis."""
+        try:
+            await async_redis_conn().delete(_state_key(self.report_id), _findings_key(self.report_id))
+        except Exception as e:
+            logger.warning(f"Failed to reset analysis progress for report {self.report_id}: {e}")
+        await self._update({"stage": "ANALYZING", "chunks_total": chunks_total, "chunks_done": 0})
+
+    async def add_finding(self, finding: AIFinding) -> None:
+        await self._update({}, finding=finding)
+
+    async def chunk_done(self) -> None:
+        try:
+            await async_redis_conn().hincrby(_state_key(self.report_id), "chunks_done", 1)
+        except Exception as e:
+            logger.warning(f"Failed to publish analysis progress for report {self.report_id}: {e}")
+
+    async def finish(self, stage: str, error: Optional[str] = None) -> None:
+        """Mark the analysis DONE or FAILED."""
+        fields: Dict[str, Any] = {"stage": stage}
+        if error:
+            fields["error"] = error[:500]
+        await self._update(fields)
+
+
+async def get_progress(report_id: str) -> Optional[Dict[str, Any]]:
+    """Read the published progress of a report, or None if there is none."""
+    r = async_redis_conn()
+    state = await r.hgetall(_state_key(report_id))
+    if not state:
+        return None
+    state = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v for k, v in state.items()}
+    raw_findings = await r.lrange(_findings_key(report_id), 0, -1)
+    return {
+        "stage": state.get("stage"),
+        "chunks_total": int(state.get("chunks_total", 0)),
+        "chunks_done": int(state.get("chunks_done", 0)),
+        "error": state.get("error"),
+        "updated_at": state.get("updated_at"),
+        "findings": [json.loads(f) for f in raw_findings],
+    }
@@ -0,0 +1,136 @@
+"""
+Chunked (map-reduce) AI analysis helpers for long reports.
+
+Long texts are split on page/section boundaries into chunks that are
+analysed separately; the per-chunk AI outputs are merged into one result
+with findings deduplicated by code.
+"""
+import bisect
+import re
+from typing import Dict, List, Optional, Sequence
+
+from app.schemas.ai_output import AIFinding, AIOutput
+from app.services.analyzer.scoring import compute_ai_score
+
+# Blank lines and numbered/capitalised heading lines are preferred split points
+_SECTION_BREAK_RE = re.compile(r"\n[ \t]*\n|\n(?=\d+(?:\.\d+)*\.?[ \t]+[A-Z])|\n(?=[A-Z][A-Z \t]{3,}\n)")
+
+# A code passes as soon as one chunk shows it (presence checks), except for
+# categories where a FAIL means an actual problem was found in the text.
+_FAIL_WINS_CATEGORIES = {"RISK", "CONSISTENCY"}
+
+_SEVERITY_ORDER = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
+
+def find_section_boundaries(text: str) -> List[int]:
+    """Offsets where a new paragraph or section starts."""
+    return [m.end() for m in _SECTION_BREAK_RE.finditer(text)]
+
+
+def _last_boundary(boundaries: Sequence[int], low: int, high: int) -> Optional[int]:
+    """Latest boundary in (low, high], or None."""
+    i = bisect.bisect_right(boundaries, high) - 1
+    return boundaries[i] if i >= 0 and boundaries[i] > low else None
+
+
+def split_into_chunks(text: str, max_chars: int, boundaries: Optional[Sequence[int]] = None) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters.
+
+    Args:
+        text: Extracted report text
+        max_chars: Maximum chunk size
+        boundaries: Preferred split offsets (e.g. page starts); section
+            boundaries are detected when omitted, and used as the next best
+            split point when a page doesn't fit a chunk
+
+    Returns:
+        List of non-empty chunks covering the whole text
+    """
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    sections = find_section_boundaries(text)
+    # Detected sections only count in the second half of a window; given
+    # boundaries anywhere, as a shorter chunk beats one that cuts a page in two
+    given = boundaries is not None
+    boundaries = sorted(boundaries) if given else sections
+
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        limit = start + max_chars
+        if limit >= len(text):
+            end = len(text)
+        else:
+            # Latest preferred boundary, then the latest section boundary, then the latest line break
+            end = _last_boundary(boundaries, start if given else start + max_chars // 2, limit)
+            if end is None:
+                end = _last_boundary(sections, start + max_chars // 2, limit)
+            if end is None:
+                newline = text.rfind("\n", start + max_chars // 2, limit)
+                end = newline + 1 if newline != -1 else limit
+        chunk = text[start:end]
+        if chunk.strip():
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def chunk_prompt(chunk: str, index: int, total: int) -> str:
+    """User prompt for one chunk; tells the model it only sees part of the report."""
+    if total == 1:
+        return chunk
+    return (
+        f"[Dit is deel {index + 1} van {total} van het rapport. Beoordeel alleen wat in dit deel staat; "
+        f"gebruik status UNKNOWN voor checklistpunten die in dit deel niet aan bod komen.]\n\n{chunk}"
+    )
+
+
+def _pick(findings: List[AIFinding]) -> AIFinding:
+    """Most severe finding, keeping the earliest page reference."""
+    best = max(findings, key=lambda f: _SEVERITY_ORDER.get(f.severity, 0))
+    pages = [f.page for f in findings if f.page is not None]
+    if pages and best.page is None:
+        best = best.model_copy(update={"page": min(pages)})
+    return best
+
+
+def merge_findings(findings: List[AIFinding]) -> List[AIFinding]:
+    """Deduplicate findings by code, resolving status across chunks."""
+    by_code: Dict[str, List[AIFinding]] = {}
+    for finding in findings:
+        by_code.setdefault(finding.code.strip().upper(), []).append(finding)
+
+    merged: List[AIFinding] = []
+    for group in by_code.values():
+        statuses = {f.status for f in group}
+        fail_wins = group[0].category in _FAIL_WINS_CATEGORIES
+        if "FAIL" in statuses and (fail_wins or "PASS" not in statuses):
+            status = "FAIL"
+        elif "PASS" in statuses:
+            status = "PASS"
+        else:
+            status = "UNKNOWN"
+        merged.append(_pick([f for f in group if f.status == status]))
+    return merged
+
+
+def merge_ai_outputs(outputs: List[AIOutput]) -> AIOutput:
+    """Combine per-chunk AI outputs into a single result with a recomputed score."""
+    if len(outputs) == 1:
+        return outputs[0]
+
+    findings = merge_findings([f for output in outputs for f in output.findings])
+
+    summaries: List[str] = []
+    for output in outputs:
+        summary = (output.report_summary or "").strip()
+        if summary and summary not in summaries:
+            summaries.append(summary)
+
+    return AIOutput(
+        report_summary=" ".join(summaries)[:2000] or None,
+        score=compute_ai_score([f.model_dump() for f in findings]),
+        findings=findings,
+    )
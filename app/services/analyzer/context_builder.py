@@ -0,0 +1,255 @@
+"""
+Section-targeted context selection for the LLM prompt.
+
+The extracted text is segmented into sections at detected headings. Each
+section is scored against the checklist items the LLM still has to judge,
+and the most relevant sections are packed into a token budget: first the
+best section per item (most severe items first), then the remaining budget
+by relevance per token. Tables of contents are never selected; cover pages,
+lab appendices and photo captions only make it in when they carry signal
+for an item.
+"""
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.analyzer.chunking import find_section_boundaries, split_into_chunks
+from app.services.analyzer.prescreen import ChecklistItem
+from app.services.analyzer.rule_packs import RuleTermMatcher
+from app.services.rate_limiter import estimate_tokens
+
+# Numbered headings ("2.1 Resultaten"), all-caps lines and common Dutch report headings;
+# table of contents lines (dot leaders) are not headings
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?![^\n]*\.{4})(?:"
+    r"\d{1,2}(?:\.\d{1,2})*\.?[ \t]+[A-ZÀ-Ý][^\n]{0,80}?"
+    r"|[A-ZÀ-Ý][A-ZÀ-Ý0-9 &/,'\-]{3,60}"
+    r"|(?:Bijlage|Inhoudsopgave|Titelblad|Samenvatting|Conclusies?|Aanbevelingen|Inleiding|Verantwoording)\b[^\n]{0,40}?(?<![.:;,])"
+    r")[ \t]*$",
+    re.MULTILINE,
+)
+_TOC_LINE_RE = re.compile(r"\.{4,}[ \t]*\d*[ \t]*$", re.MULTILINE)
+_DOT_LEADER_RE = re.compile(r"\n[ \t]*\.{4,}")
+
+# Sections longer than this are split on paragraph boundaries so packing stays fine-grained
+MAX_SECTION_CHARS = 8000
+
+_ITEM_WEIGHTS = {"CRITICAL": 4, "HIGH": 3, "MEDIUM": 2, "LOW": 1}
+
+
+class Section:
+    """A stretch of the text under one heading."""
+    __slots__ = ("start", "end", "heading", "tokens", "is_toc", "item_scores", "score")
+
+    def __init__(self, start: int, end: int, heading: Optional[str], text: str):
+        self.start = start
+        self.end = end
+        self.heading = heading
+        self.tokens = estimate_tokens(text[start:end])
+        toc_lines = len(_TOC_LINE_RE.findall(text, start, end))
+        self.is_toc = toc_lines >= 2 or toc_lines * 3 >= text.count("\n", start, end) + 1
+        self.item_scores: Dict[str, float] = {}
+        self.score = 0.0
+
+
+class ContextSelection:
+    """Text selected for the prompt and what was chosen."""
+
+    def __init__(self, text: str, sections: List[Section], selected: List[Section], token_budget: int):
+        self.text = text
+        self.sections = sections
+        self.selected = selected
+        self.token_budget = token_budget
+
+    @property
+    def tokens_selected(self) -> int:
+        return sum(section.tokens for section in self.selected)
+
+    def metadata(self) -> Dict[str, Any]:
+        """Summary of the selection for Analysis.raw_metadata."""
+        return {
+            "token_budget": self.token_budget,
+            "tokens_total": sum(section.tokens for section in self.sections),
+            "tokens_selected": self.tokens_selected,
+            "sections_total": len(self.sections),
+            "sections": [
+                {
+                    "heading": (section.heading or "")[:80],
+                    "start": section.start,
+                    "tokens": section.tokens,
+                    "items": sorted(section.item_scores),
+                }
+                for section in self.selected
+            ],
+        }
+
+
+def segment_sections(text: str) -> List[Section]:
+    """
+    Split text into sections at detected headings.
+
+    Falls back to paragraph boundaries when the text has no recognisable
+    headings; oversized sections are split further.
+    """
+    # A heading whose dot leader wrapped onto the next line is a table of contents entry
+    starts = [m.start() for m in _HEADING_RE.finditer(text) if not _DOT_LEADER_RE.match(text, m.end())]
+    if len(starts) < 2:
+        starts = find_section_boundaries(text)
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    starts.append(len(text))
+
+    sections: List[Section] = []
+    for start, end in zip(starts, starts[1:]):
+        if not text[start:end].strip():
+            continue
+        line_end = text.find("\n", start, end)
+        first_line = text[start:line_end if line_end != -1 else end].strip()
+        heading = first_line if _HEADING_RE.match(first_line) else None
+        if end - start <= MAX_SECTION_CHARS:
+            sections.append(Section(start, end, heading, text))
+            continue
+        offset = start
+        for part in split_into_chunks(text[start:end], MAX_SECTION_CHARS):
+            part_start = text.index(part, offset)
+            sections.append(Section(part_start, part_start + len(part), heading, text))
+            offset = part_start + len(part)
+    return sections
+
+
+def _score_sections(text: str, sections: List[Section], items: Sequence[ChecklistItem]) -> None:
+    matcher = RuleTermMatcher(term for item in items for term in item.terms)
+    hits = matcher.scan(text)
+    starts = [section.start for section in sections]
+
+    # Which terms occur in which section
+    section_terms: List[set] = [set() for _ in sections]
+    for term in matcher.terms:
+        for offset in hits.offsets(term):
+            i = bisect_right(starts, offset) - 1
+            if i >= 0 and offset < sections[i].end:
+                section_terms[i].add(term)
+
+    for section, terms in zip(sections, section_terms):
+        if section.is_toc or not terms:
+            continue
+        heading = (section.heading or "").lower()
+        for item in items:
+            item_terms = {term.lower() for term in item.terms}
+            matched = terms & item_terms
+            if not matched:
+                continue
+            # Distinct terms matter more than repetitions; a matching heading counts double
+            score = len(matched) + sum(2 for term in matched if term in heading)
+            section.item_scores[item.code] = score
+            section.score += score * _ITEM_WEIGHTS.get(item.severity_default, 1)
+
+
+def _join(text: str, selected: List[Section]) -> str:
+    parts: List[str] = []
+    previous_end = 0
+    for section in selected:
+        if section.start > previous_end:
+            parts.append("[...]\n")
+        parts.append(text[section.start:section.end])
+        previous_end = section.end
+    if previous_end < len(text):
+        parts.append("\n[...]")
+    return "".join(parts)
+
+
+def build_context(text: str, items: Sequence[ChecklistItem], token_budget: int) -> ContextSelection:
+    """
+    Select the sections of the text that are relevant for the given checklist items.
+
+    Sections without any term of the items are dropped; if the relevant
+    sections exceed the token budget the best ones are packed into it.
+
+    Args:
+        text: Extracted report text
+        items: Checklist items the LLM has to judge
+        token_budget: Maximum (estimated) tokens of report text in the prompt;
+            0 disables selection
+
+    Returns:
+        Context selection with the prompt text and the chosen sections
+    """
+    sections = segment_sections(text)
+    if token_budget <= 0 or not items:
+        return ContextSelection(text, sections, sections, token_budget)
+
+    _score_sections(text, sections, items)
+    relevant = [i for i, section in enumerate(sections) if section.score > 0]
+    if not relevant:
+        # Nothing matches; keep whole sections from across the report rather than sending nothing
+        selected = [sections[i] for i in sorted(_spread(sections, token_budget))]
+        return ContextSelection(_join(text, selected), sections, selected, token_budget)
+
+    if sum(sections[i].tokens for i in relevant) <= token_budget:
+        chosen = set(relevant)
+    else:
+        chosen = _pack(sections, items, token_budget)
+
+    selected = [sections[i] for i in sorted(chosen)]
+    return ContextSelection(_join(text, selected), sections, selected, token_budget)
+
+
+def _pack(sections: List[Section], items: Sequence[ChecklistItem], token_budget: int) -> set:
+    chosen = set()
+    used = 0
+
+    # 1) Coverage: the best section for each item, most severe items first
+    for item in sorted(items, key=lambda i: -_ITEM_WEIGHTS.get(i.severity_default, 1)):
+        candidates = sorted(
+            ((section.item_scores[item.code], -section.tokens, i)
+             for i, section in enumerate(sections) if item.code in section.item_scores),
+            reverse=True,
+        )
+        for _, _, i in candidates:
+            if i in chosen:
+                break
+            if used + sections[i].tokens <= token_budget:
+                chosen.add(i)
+                used += sections[i].tokens
+                break
+
+    # 2) Fill the remaining budget by relevance per token
+    by_density = sorted(
+        (i for i, section in enumerate(sections) if section.score > 0 and i not in chosen),
+        key=lambda i: sections[i].score / sections[i].tokens,
+        reverse=True,
+    )
+    for i in by_density:
+        if used + sections[i].tokens <= token_budget:
+            chosen.add(i)
+            used += sections[i].tokens
+    return chosen
+
+
+def _spread(sections: List[Section], token_budget: int) -> set:
+    """Sections that fit the budget, taken evenly from the start, end and middle of the report."""
+    candidates = [i for i, section in enumerate(sections) if not section.is_toc] or list(range(len(sections)))
+    if not candidates:
+        return set()
+
+    # First and last section, then midpoints of the remaining gaps, breadth first
+    last = len(candidates) - 1
+    order = [0, last] if last else [0]
+    gaps = deque([(0, last)])
+    while gaps:
+        low, high = gaps.popleft()
+        if high - low < 2:
+            continue
+        middle = (low + high) // 2
+        order.append(middle)
+        gaps.extend([(low, middle), (middle, high)])
+
+    chosen = set()
+    used = 0
+    for position in order:
+        i = candidates[position]
+        if used + sections[i].tokens <= token_budget:
+            chosen.add(i)
+            used += sections[i].tokens
+    return chosen
@@ -0,0 +1,199 @@
+"""
+Rules pre-screen of the Art. 22 checklist for hybrid analysis.
+
+Checklist items with `rule_terms` are decided by the rules when the outcome
+is clear-cut: FAIL when none of the terms occur at all, not even inside
+another word. Only plain presence checks (`rule_pass`, never CRITICAL items)
+can PASS, and only when every term group occurs as a whole word on one page
+(or within PASS_WINDOW_CHARS without a page index): terms scattered over a
+report say nothing about whether the requirement is met. Everything else,
+including judgement items (no rule terms), stays unresolved and goes to the
+LLM (see context_builder for the text it gets).
+"""
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.schemas.ai_output import AIFinding, AIOutput
+from app.services.analyzer.rule_packs import PROJECT_ROOT, RuleTermMatcher
+from app.services.analyzer.scoring import compute_ai_score
+from app.services.analyzer.text_extraction import PageIndex
+
+logger = logging.getLogger(__name__)
+
+# Without a page index, term groups must occur within this distance of each other to PASS
+PASS_WINDOW_CHARS = 3000
+
+_cache: Dict[Path, Tuple[int, "Checklist"]] = {}
+_cache_lock = threading.Lock()
+
+
+class ChecklistItem(BaseModel):
+    """One item of the checklist, with optional pre-screen terms."""
+    code: str
+    title: str
+    requirement: str
+    category: str
+    severity_default: str
+    evidence_hint: Optional[str] = None
+    rule_terms: List[List[str]] = []  # no term present at all: FAIL
+    rule_pass: bool = False  # presence check: all groups as words on one page is a PASS
+    context_terms: List[str] = []  # extra terms to find the relevant sections for the LLM
+
+    @property
+    def terms(self) -> List[str]:
+        return [term for group in self.rule_terms for term in group] + self.context_terms
+
+
+class Checklist:
+    """Checklist with its terms compiled into one matcher."""
+
+    def __init__(self, name: str, items: List[ChecklistItem]):
+        self.name = name
+        self.items = items
+        self.matcher = RuleTermMatcher(term for item in items for term in item.terms)
+        self.word_patterns = {item.code: [_word_pattern(group) for group in item.rule_terms] for item in items}
+
+
+def _word_pattern(terms: List[str]) -> "re.Pattern[str]":
+    """Any of the terms as a whole word (so "datum" doesn't match "rapportdatum")."""
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+
+class PrescreenResult:
+    """Outcome of the pre-screen: rule decisions and the items left for the LLM."""
+
+    def __init__(self, checklist: Checklist, decided: List[AIFinding], unresolved: List[ChecklistItem]):
+        self.checklist = checklist
+        self.decided = decided
+        self.unresolved = unresolved
+
+
+def load_checklist(path: Optional[str] = None) -> Checklist:
+    """Load the checklist, re-reading the file only when it changed."""
+    path = Path(path or settings.checklist_path)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    with _cache_lock:
+        mtime = path.stat().st_mtime_ns
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        data = json.loads(path.read_text(encoding="utf-8"))
+        checklist = Checklist(data.get("name", path.stem), [ChecklistItem(**item) for item in data["items"]])
+        _cache[path] = (mtime, checklist)
+        logger.info(f"Loaded checklist {path.name} ({len(checklist.items)} items)")
+        return checklist
+
+
+def prescreen_checklist(
+    checklist: Checklist, text: str, page_index: Optional[PageIndex] = None
+) -> PrescreenResult:
+    """
+    Decide the checklist items the rules can settle with confidence.
+
+    Args:
+        checklist: Compiled checklist
+        text: Extracted report text
+        page_index: Optional page index; a PASS needs all term groups on one page
+            and its evidence is mapped to that page
+
+    Returns:
+        Pre-screen result with decided findings and unresolved items
+    """
+    hits = checklist.matcher.scan(text)
+    decided: List[AIFinding] = []
+    unresolved: List[ChecklistItem] = []
+
+    for item in checklist.items:
+        if not item.rule_terms:
+            unresolved.append(item)
+            continue
+
+        offset = None
+        if item.rule_pass and item.severity_default != "CRITICAL":
+            offset = _co_occurrence(text, checklist.word_patterns[item.code], page_index)
+        if offset is not None:
+            decided.append(AIFinding(
+                code=item.code,
+                title=item.title,
+                category=item.category,
+                severity=item.severity_default,
+                status="PASS",
+                page=page_index.page_for_offset(offset) if page_index else None,
+                evidence_snippet=text[offset:offset + 300].strip(),
+                suggested_fix=None,
+            ))
+        elif all(hits.first_offset(group) is None for group in item.rule_terms):
+            decided.append(AIFinding(
+                code=item.code,
+                title=item.title,
+                category=item.category,
+                severity=item.severity_default,
+                status="FAIL",
+                evidence_snippet=None,
+                suggested_fix=item.requirement,
+            ))
+        else:
+            unresolved.append(item)
+
+    return PrescreenResult(checklist, decided, unresolved)
+
+
+def _co_occurrence(text: str, patterns: Sequence["re.Pattern[str]"], page_index: Optional[PageIndex]) -> Optional[int]:
+    """Offset of the first match of the first group on a page (or window) where every group matches, else None."""
+    offsets = [[m.start() for m in pattern.finditer(text)] for pattern in patterns]
+    if not all(offsets):
+        return None
+    if page_index is not None:
+        pages = [{page_index.page_for_offset(offset) for offset in group} for group in offsets]
+        common = set.intersection(*pages) - {None}
+        if not common:
+            return None
+        page = min(common)
+        return next(offset for offset in offsets[0] if page_index.page_for_offset(offset) == page)
+    for offset in offsets[0]:
+        if all(any(abs(other - offset) <= PASS_WINDOW_CHARS for other in group) for group in offsets[1:]):
+            return offset
+    return None
+
+
+def format_checklist(items: Sequence[ChecklistItem]) -> str:
+    """Checklist placeholder text for the LLM prompt."""
+    lines = []
+    for item in items:
+        line = f"- {item.code} - {item.title}: {item.requirement}"
+        if item.evidence_hint:
+            line += f" (Zoek naar: {item.evidence_hint})"
+        lines.append(line)
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def merge_prescreen(prescreen: PrescreenResult, ai_output: Optional[AIOutput]) -> Tuple[AIOutput, Dict[str, str]]:
+    """
+    Combine rule decisions with the LLM output for the unresolved items.
+
+    Returns:
+        Tuple of the combined output (findings in checklist order, score
+        recomputed) and which engine decided each code ("rules" or "llm")
+    """
+    decided_by = {f.code: "rules" for f in prescreen.decided}
+    # The rules' decision stands if the model also reported a decided item
+    llm_findings = [f for f in (ai_output.findings if ai_output else []) if f.code not in decided_by]
+    decided_by.update((f.code, "llm") for f in llm_findings)
+
+    order = {item.code: i for i, item in enumerate(prescreen.checklist.items)}
+    findings = sorted(prescreen.decided + llm_findings, key=lambda f: order.get(f.code, len(order)))
+    summary = ai_output.report_summary if ai_output else None
+    return AIOutput(
+        report_summary=summary or "Checklist volledig beoordeeld met regelgebaseerde screening.",
+        score=compute_ai_score([f.model_dump() for f in findings]),
+        findings=findings,
+    ), decided_by
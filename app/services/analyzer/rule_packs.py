@@ -0,0 +1,313 @@
+"""
+Declarative rule packs for the rules engine.
+
+A rule pack is a JSON (or YAML, if PyYAML is installed) file with rule
+definitions. Each pack is compiled once into a term matcher and cached by
+content hash; the loader checks the file's mtime on every lookup and
+recompiles only when the pack actually changed.
+
+Rule semantics (terms match case-insensitively as substrings):
+    applies_if: rule is only evaluated when one of these terms occurs
+    required:   finding when none of these terms occur
+    forbidden:  finding when any of these terms occurs
+
+Tenant packs live in `<rule_packs_dir>/tenants/<tenant_id>.json`. A pack with
+`"extends": "default"` starts from the default rules; rules with the same id
+are replaced and ids in `disabled` are dropped.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Literal, NamedTuple, Optional
+
+from pydantic import BaseModel, ValidationError, model_validator
+
+from app.config import settings
+from app.schemas.analysis import FindingDTO
+from app.services.analyzer.text_extraction import PageIndex
+
+try:
+    import yaml
+except ImportError:  # YAML packs are optional
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK = "default"
+PACK_EXTENSIONS = (".json", ".yaml", ".yml")
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+_TENANT_ID = re.compile(r"[\w-]+")
+
+
+class RulePackError(ValueError):
+    """A rule pack can't be read or is invalid."""
+
+
+class TermHits:
+    """Hit table of a scan: first offset of every term in the text (-1 if absent)."""
+
+    def __init__(self, lowered: str, first: Dict[str, int]):
+        self._lowered = lowered
+        self._first = first
+
+    def has_any(self, terms: Iterable[str]) -> bool:
+        return any(self._first.get(term.lower(), -1) >= 0 for term in terms)
+
+    def first_offset(self, terms: Iterable[str]) -> Optional[int]:
+        """Earliest offset at which any of the terms occurs."""
+        offsets = [self._first.get(term.lower(), -1) for term in terms]
+        found = [offset for offset in offsets if offset >= 0]
+        return min(found) if found else None
+
+    def offsets(self, term: str) -> List[int]:
+        """All offsets of a term (computed on demand)."""
+        term = term.lower()
+        result = []
+        offset = self._first.get(term, -1)
+        while offset >= 0:
+            result.append(offset)
+            offset = self._lowered.find(term, offset + 1)
+        return result
+
+    def found(self) -> Dict[str, int]:
+        return {term: offset for term, offset in self._first.items() if offset >= 0}
+
+
+class RuleTermMatcher:
+    """
+    Term set compiled once for the rules engine.
+
+    A scan lowercases the text once and records the first hit of every
+    term. Terms containing a shorter term that is absent are skipped, e.g.
+    no "certificaat" means no "certificaatnummer".
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted({term.lower() for term in terms}, key=len)
+        self._requires = {
+            term: [other for other in self.terms if other != term and other in term]
+            for term in self.terms
+        }
+
+    def scan(self, text: str) -> TermHits:
+        lowered = text.lower()
+        first: Dict[str, int] = {}
+        for term in self.terms:  # shortest first, so requirements are known
+            if any(first[required] < 0 for required in self._requires[term]):
+                first[term] = -1
+            else:
+                first[term] = lowered.find(term)
+        return TermHits(lowered, first)
+
+
+class RuleDefinition(BaseModel):
+    """A single declarative rule."""
+    id: str
+    title: Optional[str] = None
+    section: Optional[str] = None
+    severity: Literal["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+    message: str
+    suggestion: Optional[str] = None
+    tags: List[str] = []
+    applies_if: List[str] = []
+    required: List[str] = []
+    forbidden: List[str] = []
+
+    @model_validator(mode="after")
+    def check_terms(self) -> "RuleDefinition":
+        if not (self.applies_if or self.required or self.forbidden):
+            raise ValueError(f"rule {self.id} needs applies_if, required or forbidden terms")
+        return self
+
+
+class RulePackDefinition(BaseModel):
+    """Contents of a rule pack file."""
+    name: str
+    version: str
+    description: Optional[str] = None
+    extends: Optional[str] = None
+    disabled: List[str] = []
+    rules: List[RuleDefinition] = []
+
+
+class RulePack:
+    """A rule pack compiled into a single term matcher."""
+
+    def __init__(self, definition: RulePackDefinition, content_hash: str):
+        self.name = definition.name
+        self.version = definition.version
+        self.content_hash = content_hash
+        self.rules = definition.rules
+        self.matcher = RuleTermMatcher(
+            term for rule in self.rules for term in rule.applies_if + rule.required + rule.forbidden
+        )
+
+    def info(self) -> Dict[str, str]:
+        """Identification of the pack, recorded with every analysis."""
+        return {"name": self.name, "version": self.version, "hash": self.content_hash[:16]}
+
+    def evaluate(self, text: str, page_index: Optional[PageIndex] = None) -> List[FindingDTO]:
+        """Run all rules of the pack against the text in one scan."""
+        hits = self.matcher.scan(text)
+        findings: List[FindingDTO] = []
+
+        for rule in self.rules:
+            offset = None
+            if rule.applies_if:
+                offset = hits.first_offset(rule.applies_if)
+                if offset is None:
+                    continue
+
+            forbidden_offset = hits.first_offset(rule.forbidden) if rule.forbidden else None
+            missing_required = bool(rule.required) and not hits.has_any(rule.required)
+            if forbidden_offset is not None:
+                offset = forbidden_offset
+            elif not missing_required and (rule.required or rule.forbidden):
+                continue
+
+            if offset is not None:
+                evidence = {"offset": offset, "snippet": text[offset:offset + 120]}
+            else:
+                evidence = {"required": rule.required}
+
+            findings.append(FindingDTO(
+                rule_id=rule.id,
+                section=rule.section,
+                severity=rule.severity,
+                message=rule.message,
+                suggestion=rule.suggestion,
+                evidence=evidence,
+                tags=rule.tags,
+                page=page_index.page_for_offset(offset) if page_index and offset is not None else None
+            ))
+
+        return findings
+
+
+def _parse_pack(path: Path, content: bytes) -> Dict[str, Any]:
+    if path.suffix in (".yaml", ".yml") and yaml is None:
+        raise RulePackError(f"PyYAML is not installed, can't read rule pack {path}")
+    try:
+        if path.suffix in (".yaml", ".yml"):
+            data = yaml.safe_load(content)
+        else:
+            data = json.loads(content)
+    except (ValueError, getattr(yaml, "YAMLError", ValueError)) as e:
+        raise RulePackError(f"Rule pack {path} can't be parsed: {e}")
+    if not isinstance(data, dict):
+        raise RulePackError(f"Rule pack {path} must contain an object")
+    return data
+
+
+def _merge_rules(base: RulePack, definition: RulePackDefinition) -> List[RuleDefinition]:
+    overrides = {rule.id: rule for rule in definition.rules}
+    rules = [
+        overrides.pop(rule.id, rule)
+        for rule in base.rules
+        if rule.id not in definition.disabled
+    ]
+    return rules + [rule for rule in definition.rules if rule.id in overrides]
+
+
+class _CachedPack(NamedTuple):
+    mtime_ns: int
+    size: int
+    base_hash: Optional[str]  # content hash of the extended pack, if any
+    pack: RulePack
+
+
+class RulePackLoader:
+    """
+    Loads and compiles rule packs from a directory.
+
+    Compiled packs are cached per file (invalidated on mtime/size change, or
+    when the pack it extends changed) and by content hash, so an unchanged
+    pack is never compiled twice. If a changed pack is invalid the last good
+    version stays in use.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._files: Dict[Path, _CachedPack] = {}
+        self._compiled: Dict[str, RulePack] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def directory(self) -> Path:
+        directory = Path(self._directory or settings.rule_packs_dir)
+        return directory if directory.is_absolute() else PROJECT_ROOT / directory
+
+    def _find(self, *parts: str) -> Optional[Path]:
+        for extension in PACK_EXTENSIONS:
+            path = self.directory.joinpath(*parts[:-1], parts[-1] + extension)
+            if path.is_file():
+                return path
+        return None
+
+    def default_pack(self) -> RulePack:
+        path = self._find(DEFAULT_PACK)
+        if path is None:
+            raise RulePackError(f"Default rule pack not found in {self.directory}")
+        return self.load(path)
+
+    def get(self, tenant_id: Optional[str] = None) -> RulePack:
+        """Rule pack for a tenant, or the default pack if the tenant has none (or it is invalid)."""
+        if tenant_id and _TENANT_ID.fullmatch(tenant_id):
+            path = self._find("tenants", tenant_id)
+            if path is not None:
+                try:
+                    return self.load(path)
+                except RulePackError as e:
+                    logger.error(f"Falling back to default rules for tenant {tenant_id}: {e}")
+        return self.default_pack()
+
+    def load(self, path: Path) -> RulePack:
+        """Load a pack file, recompiling only if it (or the pack it extends) changed."""
+        with self._lock:
+            cached = self._files.get(path)
+            try:
+                stat = path.stat()
+                base = self.default_pack() if cached and cached.base_hash else None
+                if cached and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size) \
+                        and cached.base_hash == (base.content_hash if base else None):
+                    return cached.pack
+
+                content = path.read_bytes()
+                definition = RulePackDefinition(**_parse_pack(path, content))
+                if definition.extends:
+                    if definition.extends != DEFAULT_PACK or path == self._find(DEFAULT_PACK):
+                        raise RulePackError(f"Rule pack {path} can only extend the '{DEFAULT_PACK}' pack")
+                    base = base or self.default_pack()
+                    content = base.content_hash.encode() + content
+                    definition.rules = _merge_rules(base, definition)
+                else:
+                    base = None
+            except (OSError, ValidationError, RulePackError) as e:
+                if cached:
+                    logger.error(f"Rule pack {path} is invalid, keeping version {cached.pack.version}: {e}")
+                    return cached.pack
+                raise RulePackError(f"Rule pack {path} is invalid: {e}")
+
+            content_hash = hashlib.sha256(content).hexdigest()
+            pack = self._compiled.get(content_hash)
+            if pack is None:
+                pack = RulePack(definition, content_hash)
+                logger.info(f"Compiled rule pack {pack.name} {pack.version} ({len(pack.rules)} rules) from {path}")
+
+            self._files[path] = _CachedPack(
+                stat.st_mtime_ns, stat.st_size, base.content_hash if base else None, pack
+            )
+            self._compiled = {entry.pack.content_hash: entry.pack for entry in self._files.values()}
+            return pack
+
+
+rule_packs = RulePackLoader()
+
+
+def get_rule_pack(tenant_id: Optional[str] = None) -> RulePack:
+    """Compiled rule pack for a tenant (default pack if the tenant has no own pack)."""
+    return rule_packs.get(tenant_id)
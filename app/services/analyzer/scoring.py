@@ -11,6 +11,14 @@ SEVERITY_WEIGHTS = {
     "LOW": 3,
 }
 
+# Severity weights given to the AI prompt (SEVERITY_WEIGHTS placeholder)
+AI_SEVERITY_WEIGHTS = {
+    "CRITICAL": 30,
+    "HIGH": 15,
+    "MEDIUM": 7,
+    "LOW": 3,
+}
+
 
 def compute_score(findings: List[Dict[str, Any]]) -> float:
     """
@@ -28,3 +36,21 @@ def compute_score(findings: List[Dict[str, Any]]) -> float:
         score -= SEVERITY_WEIGHTS.get(severity, 0)
     
     return max(0, min(100, score))
+
+
+def compute_ai_score(findings: List[Dict[str, Any]]) -> float:
+    """
+    Compute score for AI findings: only FAIL findings cost points.
+    
+    Args:
+        findings: List of AI finding dictionaries with 'severity' and 'status' keys
+        
+    Returns:
+        Score between 0 and 100
+    """
+    score = 100
+    for finding in findings:
+        if finding.get("status") == "FAIL":
+            score -= AI_SEVERITY_WEIGHTS.get(finding.get("severity", "LOW"), 0)
+    
+    return max(0, min(100, score))
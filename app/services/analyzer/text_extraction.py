@@ -1,43 +1,299 @@
 """
 Text extraction from PDF files.
 """
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cached_property
 from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
 import logging
+import multiprocessing
+import os
+import re
+import threading
+
+from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
+# Bump when extraction output changes so cached extractions are redone
+EXTRACTION_VERSION = "pymupdf-1"
 
-def extract_text_from_pdf(pdf_path: Path) -> str:
+# Process pool for parallel page extraction, created on first use and kept
+# for the lifetime of the (worker) process
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class PageIndex:
     """
-    Extract text from PDF file using PyMuPDF.
-    
-    Args:
-        pdf_path: Path to PDF file
-        
-    Returns:
-        Extracted text content
-        
-    Raises:
-        Exception: If text extraction fails
+    Compact page index: page number -> [start, end) character offsets in the
+    extracted text, kept as two flat integer arrays.
+
+    Offsets are mapped back to 1-based page numbers with a binary search.
     """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int]):
+        self.starts = array("q", starts)
+        self.ends = array("q", ends)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def span(self, page: int) -> Tuple[int, int]:
+        """Character range of a 1-based page number (empty for pages without text)."""
+        return self.starts[page - 1], self.ends[page - 1]
+
+    def page_for_offset(self, offset: int) -> Optional[int]:
+        """1-based page number containing a character offset, or None if out of range."""
+        if offset < 0 or not self.starts or offset >= self.ends[-1]:
+            return None
+        i = bisect_right(self.starts, offset) - 1
+        # Empty pages have no text of their own; a page separator belongs to the page before it
+        while i > 0 and self.starts[i] == self.ends[i]:
+            i -= 1
+        return i + 1 if i >= 0 else None
+
+    def locate(self, text: str, snippet: Optional[str]) -> Optional[int]:
+        """1-based page number where an evidence snippet occurs in the text."""
+        offset = find_snippet(text, snippet)
+        return self.page_for_offset(offset) if offset is not None else None
+
+
+def find_snippet(text: str, snippet: Optional[str]) -> Optional[int]:
+    """
+    Character offset of a quoted snippet in the text.
+
+    Falls back to matching the first words while ignoring whitespace,
+    punctuation and case, since quoted evidence is rarely verbatim.
+    """
+    if not snippet:
+        return None
+    snippet = snippet.strip().strip('"\'….').strip()
+    if len(snippet) < 8:
+        return None
+    offset = text.find(snippet)
+    if offset >= 0:
+        return offset
+    words = re.findall(r"\w+", snippet)[:8]
+    if len(words) < 2:
+        return None
+    match = re.search(r"\W+".join(map(re.escape, words)), text, re.IGNORECASE)
+    return match.start() if match else None
+
+
+class ExtractionResult(BaseModel):
+    """Per-page extraction output; `text` is what the analyzers consume."""
+    pages: List[str]  # text per page, empty string for pages without text
+    page_offsets: List[int]  # start offset of each page in `text`
+    version: str = EXTRACTION_VERSION
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    # Built on first access and kept: the analysis path reads both several times
+    @cached_property
+    def text(self) -> str:
+        # Non-empty pages joined by newlines, as extract_text_from_pdf always did
+        return "\n".join(page for page in self.pages if page.strip())
+
+    @cached_property
+    def page_index(self) -> PageIndex:
+        ends = [
+            offset + len(page) if page.strip() else offset
+            for offset, page in zip(self.page_offsets, self.pages)
+        ]
+        return PageIndex(self.page_offsets, ends)
+
+    @classmethod
+    def from_pages(cls, pages: List[str]) -> "ExtractionResult":
+        offsets: List[int] = []
+        position = 0
+        first = True
+        for page in pages:
+            if page.strip() and not first:
+                position += 1  # joining newline
+            offsets.append(position)
+            if page.strip():
+                position += len(page)
+                first = False
+        return cls(pages=pages, page_offsets=offsets)
+
+
+def _extract_pages(open_document: Callable[[Any], Any], source: str) -> ExtractionResult:
     try:
         import fitz  # PyMuPDF
-        text_chunks = []
-        
-        with fitz.open(str(pdf_path)) as doc:
+        pages = []
+
+        with open_document(fitz) as doc:
             for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                if text.strip():  # Only add non-empty pages
-                    text_chunks.append(text)
-        
-        extracted_text = "\n".join(text_chunks)
-        logger.info(f"Extracted {len(extracted_text)} characters from PDF: {pdf_path}")
-        return extracted_text
-        
+                pages.append(doc[page_num].get_text())
+
+        result = ExtractionResult.from_pages(pages)
+        logger.info(f"Extracted {len(result.text)} characters from {result.page_count} pages: {source}")
+        return result
+
     except ImportError:
         logger.error("PyMuPDF (fitz) not available. Please install: pip install PyMuPDF")
         raise Exception("PyMuPDF not available for text extraction")
     except Exception as e:
-        logger.error(f"Text extraction failed for {pdf_path}: {e}")
+        logger.error(f"Text extraction failed for {source}: {e}")
         raise Exception(f"Text extraction failed: {e}")
+
+
+def extract_pages_from_pdf(pdf_path: Path) -> ExtractionResult:
+    """
+    Extract text per page from a PDF file using PyMuPDF.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Extraction result with per-page text and offsets
+
+    Raises:
+        Exception: If text extraction fails
+    """
+    return _extract_pages(lambda fitz: fitz.open(str(pdf_path)), str(pdf_path))
+
+
+def _extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[str]:
+    """Extract pages [start, end) in a pool process."""
+    import fitz  # PyMuPDF
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: the worker process runs threads (event loop), forking those is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+            logger.info(f"Started PDF extraction pool with {workers} processes")
+        return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the extraction process pool (worker shutdown)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            logger.info("Stopped PDF extraction pool")
+        _pool = None
+        _pool_workers = 0
+
+
+def _page_ranges(page_count: int, parts: int) -> List[range]:
+    """Split pages into contiguous, evenly sized ranges."""
+    size, extra = divmod(page_count, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
+def _extract_pages_parallel(pdf_bytes: bytes, page_count: int, workers: int) -> ExtractionResult:
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_extract_page_range, pdf_bytes, r.start, r.stop)
+        for r in _page_ranges(page_count, workers)
+    ]
+    pages: List[str] = []
+    for future in futures:  # in page order
+        pages.extend(future.result())
+    result = ExtractionResult.from_pages(pages)
+    logger.info(f"Extracted {len(result.text)} characters from {page_count} pages using {workers} processes")
+    return result
+
+
+def extract_pages_from_bytes(
+    pdf_bytes: Union[bytes, bytearray, memoryview],
+    workers: int = 1,
+    parallel_min_pages: int = 0,
+) -> ExtractionResult:
+    """
+    Extract text per page from an in-memory PDF, without writing a temp file.
+
+    Args:
+        pdf_bytes: PDF content (e.g. as downloaded from storage)
+        workers: Processes to split the pages over (0 = CPU count, 1 = single process)
+        parallel_min_pages: Documents with fewer pages are extracted in-process
+
+    Returns:
+        Extraction result with per-page text and offsets
+
+    Raises:
+        Exception: If text extraction fails
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if workers > 1:
+        pdf_bytes = bytes(pdf_bytes)
+        try:
+            import fitz  # PyMuPDF
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                page_count = len(doc)
+        except Exception as e:
+            logger.error(f"Text extraction failed for <{len(pdf_bytes)} bytes in memory>: {e}")
+            raise Exception(f"Text extraction failed: {e}")
+
+        if page_count >= max(parallel_min_pages, 2):
+            try:
+                return _extract_pages_parallel(pdf_bytes, page_count, min(workers, page_count))
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF extraction pool failed, extracting in-process: {e}")
+                shutdown_extraction_pool()
+            except Exception as e:
+                logger.error(f"Parallel text extraction failed: {e}")
+                raise Exception(f"Text extraction failed: {e}")
+
+    return _extract_pages(
+        lambda fitz: fitz.open(stream=pdf_bytes, filetype="pdf"),
+        f"<{len(pdf_bytes)} bytes in memory>",
+    )
+
+
+def extract_text_from_pdf(pdf_path: Path) -> str:
+    """
+    Extract text from PDF file using PyMuPDF.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Extracted text content
+
+    Raises:
+        Exception: If text extraction fails
+    """
+    return extract_pages_from_pdf(pdf_path).text
+
+
+def extract_text_from_bytes(pdf_bytes: Union[bytes, bytearray, memoryview]) -> str:
+    """
+    Extract text from an in-memory PDF using PyMuPDF.
+
+    Args:
+        pdf_bytes: PDF content
+
+    Returns:
+        Extracted text content
+
+    Raises:
+        Exception: If text extraction fails
+    """
+    return extract_pages_from_bytes(pdf_bytes).text
@@ -0,0 +1,138 @@
+"""
+Bulk report intake.
+
+A batch upload may contain PDF/DOCX files and ZIP archives of them. Files
+are streamed to storage concurrently (on the async storage thread pool),
+and all processing jobs are enqueued in the tenant's bulk lane with a
+single Redis pipeline.
+"""
+import asyncio
+import logging
+import zipfile
+from contextlib import nullcontext
+from functools import partial
+from pathlib import PurePosixPath
+from typing import Callable, ContextManager, Dict, IO, List, Optional, Sequence, Tuple
+
+from fastapi import UploadFile
+from rq import Queue, Retry
+from rq.job import Job
+
+from app.config import settings
+from app.redis_queue.conn import LANE_BULK, reports_queue
+from app.services.storage import async_storage
+
+logger = logging.getLogger(__name__)
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+class BatchFile:
+    """One report file of a batch, either an uploaded file or a ZIP entry."""
+    __slots__ = ("filename", "content_type", "size", "_open")
+
+    def __init__(self, filename: str, content_type: str, size: int, opener: Callable[[], ContextManager[IO[bytes]]]):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self._open = opener
+
+    def open(self) -> ContextManager[IO[bytes]]:
+        return self._open()
+
+
+def _upload_size(upload: UploadFile) -> int:
+    if upload.size is not None:
+        return upload.size
+    upload.file.seek(0, 2)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    return size
+
+
+def collect_batch_files(
+    uploads: Sequence[UploadFile],
+    allowed_types: Dict[str, str],
+    max_file_size: int,
+) -> Tuple[List[BatchFile], List[Dict[str, str]]]:
+    """
+    Expand the uploads of a batch into report files.
+
+    Args:
+        uploads: Uploaded files (reports or ZIP archives)
+        allowed_types: Allowed extensions and their content types
+        max_file_size: Maximum size per report file in bytes
+
+    Returns:
+        Tuple of accepted files and rejected files ({"filename", "reason"})
+    """
+    files: List[BatchFile] = []
+    rejected: List[Dict[str, str]] = []
+
+    def accept(name: str, size: int, opener: Callable[[], ContextManager[IO[bytes]]]) -> None:
+        extension = PurePosixPath(name.lower()).suffix
+        if extension not in allowed_types:
+            rejected.append({"filename": name, "reason": "Unsupported file type"})
+        elif size > max_file_size:
+            rejected.append({"filename": name, "reason": f"File too large. Max size: {settings.max_upload_mb}MB"})
+        else:
+            files.append(BatchFile(name, allowed_types[extension], size, opener))
+
+    for upload in uploads:
+        name = upload.filename or ""
+        if name.lower().endswith(".zip") or upload.content_type in ZIP_CONTENT_TYPES:
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                rejected.append({"filename": name, "reason": "Invalid ZIP archive"})
+                continue
+            for info in archive.infolist():
+                entry = PurePosixPath(info.filename)
+                if info.is_dir() or "__MACOSX" in entry.parts or entry.name.startswith("."):
+                    continue
+                # The declared size is checked before anything is decompressed
+                accept(entry.name, info.file_size, partial(archive.open, info))
+        else:
+            accept(name, _upload_size(upload), partial(nullcontext, upload.file))
+
+    return files, rejected
+
+
+async def upload_batch_files(files: Sequence[BatchFile], object_keys: Sequence[str]) -> List[Optional[Tuple[str, int]]]:
+    """Stream files to storage concurrently; returns (checksum, size) per file, None if its upload failed."""
+    semaphore = asyncio.Semaphore(max(1, settings.batch_upload_concurrency))
+
+    async def upload(file: BatchFile, object_key: str) -> Optional[Tuple[str, int]]:
+        async with semaphore:
+            try:
+                with file.open() as fileobj:
+                    return await async_storage.upload_stream(fileobj, object_key, file.content_type, file.size)
+            except Exception as e:
+                logger.error(f"Failed to upload {file.filename} to {object_key}: {e}")
+                return None
+
+    return await asyncio.gather(*(upload(f, key) for f, key in zip(files, object_keys)))
+
+
+def enqueue_reports(
+    report_ids: Sequence[str],
+    tenant_id: str,
+    lane: str = LANE_BULK,
+    func: str = "app.redis_queue.jobs.process_report_with_ai",
+    timeout: Optional[int] = None,
+) -> List[Job]:
+    """
+    Enqueue a processing job per report in one Redis pipeline (bulk lane of the tenant by default).
+
+    Jobs get the AI job timeout unless another `timeout` is given.
+    """
+    job_datas = [
+        Queue.prepare_data(
+            func,
+            kwargs={"report_id": report_id},
+            timeout=timeout or settings.ai_job_timeout_seconds,
+            retry=Retry(max=settings.job_max_retries),
+        )
+        for report_id in report_ids
+    ]
+    return reports_queue(tenant_id, lane).enqueue_many(job_datas)
@@ -0,0 +1,105 @@
+"""
+Deduplication of identical report uploads.
+
+Uploads are identified by the SHA-256 of their content (Report.source_checksum,
+computed by storage.upload_stream). When a tenant uploads a file it already
+had analysed, the new report points at the stored source object and gets a
+copy of the latest analysis instead of a new processing job.
+"""
+import logging
+import uuid
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.analysis import Analysis
+from app.models.finding import Finding
+from app.models.report import Report, ReportStatus
+
+logger = logging.getLogger(__name__)
+
+
+async def find_analysed_duplicate(session: AsyncSession, tenant_id: uuid.UUID, checksum: str) -> Optional[Report]:
+    """Latest analysed, not deleted report of the tenant with the same source checksum."""
+    result = await session.execute(
+        select(Report).where(
+            Report.tenant_id == tenant_id,
+            Report.source_checksum == checksum,
+            Report.status == ReportStatus.DONE,
+            Report.deleted_at.is_(None),
+        ).order_by(Report.uploaded_at.desc()).limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def clone_analysis(session: AsyncSession, source: Report, target: Report) -> Optional[Analysis]:
+    """
+    Copy the latest analysis of `source` (with its findings and report results) to `target`.
+
+    The target must already be flushed. Nothing is copied (and None returned)
+    when the source has no analysis.
+    """
+    result = await session.execute(
+        select(Analysis).where(Analysis.report_id == source.id).order_by(Analysis.finished_at.desc()).limit(1)
+    )
+    analysis = result.scalar_one_or_none()
+    if analysis is None:
+        return None
+
+    clone = Analysis(
+        id=uuid.uuid4(),
+        report_id=target.id,
+        engine=analysis.engine,
+        engine_version=analysis.engine_version,
+        score=analysis.score,
+        summary=analysis.summary,
+        rules_passed=analysis.rules_passed,
+        rules_failed=analysis.rules_failed,
+        started_at=analysis.started_at,
+        finished_at=analysis.finished_at,
+        duration_ms=analysis.duration_ms,
+        raw_metadata={
+            **(analysis.raw_metadata or {}),
+            "deduplicated_from": {"report_id": str(source.id), "analysis_id": str(analysis.id)},
+        },
+    )
+    session.add(clone)
+
+    findings = (await session.execute(select(Finding).where(Finding.analysis_id == analysis.id))).scalars().all()
+    session.add_all(
+        Finding(
+            analysis_id=clone.id,
+            rule_id=finding.rule_id,
+            section=finding.section,
+            severity=finding.severity,
+            message=finding.message,
+            suggestion=finding.suggestion,
+            evidence=finding.evidence,
+            tags=finding.tags,
+            page=finding.page,
+        )
+        for finding in findings
+    )
+
+    for column in (
+        "score", "finding_count", "summary", "findings_json", "analysis_version", "analysis_duration_ms",
+        "conclusion_object_key", "storage_key", "checksum", "file_size",
+    ):
+        setattr(target, column, getattr(source, column))
+    target.status = ReportStatus.DONE
+    logger.info(f"Report {target.id}: reused analysis {analysis.id} of identical report {source.id}")
+    return clone
+
+
+def object_key_in_use(session: Session, object_key: str, report_id: uuid.UUID) -> bool:
+    """Whether a report other than `report_id` still references the object (deduplicated reports share them)."""
+    return session.query(Report.id).filter(
+        Report.id != report_id,
+        or_(
+            Report.source_object_key == object_key,
+            Report.storage_key == object_key,
+            Report.conclusion_object_key == object_key,
+        ),
+    ).first() is not None
@@ -0,0 +1,79 @@
+"""
+Cached presigned download URLs and coalesced download audit entries.
+
+Dashboards poll the download endpoint, so signing a URL and writing an
+audit row per call is wasted work. Signed URLs are kept in Redis per object
+key and TTL and reused until they get close to expiry; a REPORT_DOWNLOAD
+audit entry is written once per user, report and window. Both are
+best-effort: without Redis every call signs a new URL and is audited.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config import settings
+from app.redis_queue.conn import async_redis_conn
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "download_url"
+AUDIT_PREFIX = "download_audit"
+
+
+def _url_key(object_key: str, ttl: int) -> str:
+    return f"{URL_PREFIX}:{ttl}:{hashlib.sha256(object_key.encode()).hexdigest()}"
+
+
+async def cached_presigned_url(
+    object_key: str,
+    ttl: int,
+    sign: Callable[[str, int], Awaitable[Optional[str]]]
+) -> Tuple[Optional[str], int]:
+    """
+    Presigned URL for `object_key` and its remaining lifetime in seconds.
+
+    A cached URL is returned while it is valid for more than
+    DOWNLOAD_URL_MIN_REMAINING seconds; otherwise `sign(object_key, ttl)`
+    signs a new one, which is cached for the rest of its usable lifetime.
+    """
+    key = _url_key(object_key, ttl)
+    try:
+        cached = await async_redis_conn().get(key)
+        if cached:
+            entry = json.loads(cached)
+            return entry["url"], max(0, int(entry["expires_at"] - time.time()))
+    except Exception as e:
+        logger.warning(f"Download URL cache unavailable: {e}")
+
+    url = await sign(object_key, ttl)
+    if url is None:
+        return None, ttl
+
+    reusable_for = ttl - settings.download_url_min_remaining
+    if reusable_for > 0:
+        try:
+            await async_redis_conn().set(key, json.dumps({"url": url, "expires_at": time.time() + ttl}), ex=reusable_for)
+        except Exception as e:
+            logger.warning(f"Could not cache download URL: {e}")
+    return url, ttl
+
+
+async def claim_download_audit(report_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+    """
+    Whether this download should get an audit entry.
+
+    True for the first download of the report by the user in the
+    DOWNLOAD_AUDIT_WINDOW_SECONDS window, False for repeats within it.
+    Without Redis every download is audited.
+    """
+    window = settings.download_audit_window_seconds
+    if window <= 0:
+        return True
+    try:
+        return bool(await async_redis_conn().set(f"{AUDIT_PREFIX}:{report_id}:{user_id}", 1, nx=True, ex=window))
+    except Exception as e:
+        logger.warning(f"Download audit coalescing unavailable: {e}")
+        return True
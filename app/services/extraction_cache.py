@@ -0,0 +1,91 @@
+"""
+Persisted text extraction results.
+
+The extraction of a report's source PDF is stored once as a gzipped JSON
+object next to the source in object storage. Later analyses (re-analysis,
+prompt changes) load it instead of downloading and parsing the PDF again.
+The entry records the source fingerprint (ETag) and the extractor version;
+if either changes the PDF is extracted again.
+"""
+import gzip
+import json
+import logging
+from io import BytesIO
+from typing import Optional, Tuple
+
+from app.config import settings
+from app.services.analyzer.text_extraction import EXTRACTION_VERSION, ExtractionResult, extract_pages_from_bytes
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+def extraction_key(source_object_key: str) -> str:
+    """Object key of the cached extraction for a source file."""
+    return f"{source_object_key}.extraction.json.gz"
+
+
+def load_extraction(source_object_key: str, fingerprint: Optional[str]) -> Optional[ExtractionResult]:
+    """Load a cached extraction if it matches the source fingerprint and extractor version."""
+    if not fingerprint:
+        return None
+    payload = storage.download_bytes(extraction_key(source_object_key))
+    if payload is None:
+        return None
+    try:
+        data = json.loads(gzip.decompress(payload))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable extraction cache for {source_object_key}: {e}")
+        return None
+    if data.get("fingerprint") != fingerprint or data.get("version") != EXTRACTION_VERSION:
+        return None
+    return ExtractionResult(pages=data["pages"], page_offsets=data["page_offsets"], version=data["version"])
+
+
+def save_extraction(source_object_key: str, fingerprint: Optional[str], result: ExtractionResult) -> bool:
+    """Store an extraction next to its source. Never raises."""
+    if not fingerprint:
+        return False
+    try:
+        data = result.model_dump()
+        data["fingerprint"] = fingerprint
+        payload = gzip.compress(json.dumps(data).encode("utf-8"))
+        return storage.upload_fileobj(BytesIO(payload), extraction_key(source_object_key), "application/gzip")
+    except Exception as e:
+        logger.warning(f"Failed to store extraction cache for {source_object_key}: {e}")
+        return False
+
+
+def get_extraction(source_object_key: str) -> Tuple[ExtractionResult, bool]:
+    """
+    Get the extraction of a source PDF, from the cache when possible.
+
+    Args:
+        source_object_key: Storage key of the source PDF
+
+    Returns:
+        Tuple of (extraction result, whether it came from the cache)
+
+    Raises:
+        Exception: If the source can't be downloaded or extracted
+    """
+    head = storage.head_object(source_object_key)
+    fingerprint = head["etag"] if head else None
+
+    cached = load_extraction(source_object_key, fingerprint)
+    if cached is not None:
+        logger.info(f"Using cached extraction for {source_object_key} ({cached.page_count} pages)")
+        return cached, True
+
+    pdf_bytes = storage.download_bytes(source_object_key)
+    if pdf_bytes is None:
+        raise Exception(f"Failed to download source file {source_object_key}")
+
+    result = extract_pages_from_bytes(
+        pdf_bytes,
+        workers=settings.pdf_extraction_workers,
+        parallel_min_pages=settings.pdf_parallel_min_pages,
+    )
+
+    save_extraction(source_object_key, fingerprint, result)
+    return result, False
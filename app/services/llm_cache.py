@@ -0,0 +1,155 @@
+"""
+Content-addressed cache for parsed LLM responses.
+
+The cache key is a SHA-256 over provider, model, max_tokens, the rendered
+system prompt and the user prompt. A new prompt version or tenant override
+renders a different system prompt and therefore a different key, so stale
+answers are never served; old entries age out through TTL and size-based
+eviction (oldest first).
+"""
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.redis_queue.conn import async_redis_conn
+from app.schemas.ai_output import AIOutput
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "llm_cache"
+ENTRY_PREFIX = f"{CACHE_PREFIX}:entry:"
+INDEX_KEY = f"{CACHE_PREFIX}:index"  # sorted set: cache key -> stored_at
+SIZES_KEY = f"{CACHE_PREFIX}:sizes"  # hash: cache key -> payload bytes
+BYTES_KEY = f"{CACHE_PREFIX}:bytes"  # total payload bytes
+HITS_KEY = f"{CACHE_PREFIX}:hits"
+MISSES_KEY = f"{CACHE_PREFIX}:misses"
+
+EVICT_BATCH = 50
+
+
+def make_cache_key(provider: str, model: str, max_tokens: int, system_prompt: str, user_prompt: str) -> str:
+    """Hash the inputs that determine an LLM answer."""
+    digest = hashlib.sha256()
+    for part in (provider, model, str(max_tokens), system_prompt, user_prompt):
+        data = part.encode("utf-8")
+        # Length prefix so ("ab", "c") and ("a", "bc") never collide
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Redis-backed cache of parsed AIOutput objects."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ai_cache_enabled
+
+    async def get(self, key: str) -> Optional[AIOutput]:
+        """Return the cached output for a key, or None on a miss or cache error."""
+        try:
+            r = async_redis_conn()
+            payload = await r.get(ENTRY_PREFIX + key)
+            if payload is None:
+                self.misses += 1
+                await r.incr(MISSES_KEY)
+                return None
+            self.hits += 1
+            await r.incr(HITS_KEY)
+            return AIOutput.model_validate_json(payload)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed, treating as miss: {e}")
+            self.misses += 1
+            return None
+
+    async def put(self, key: str, output: AIOutput) -> bool:
+        """Store an output; oversized entries are skipped. Never raises."""
+        payload = output.model_dump_json().encode("utf-8")
+        size = len(payload)
+        if size > settings.ai_cache_max_entry_bytes:
+            logger.info(f"LLM cache entry of {size} bytes exceeds limit, not cached")
+            return False
+        try:
+            r = async_redis_conn()
+            previous = int(await r.hget(SIZES_KEY, key) or 0)
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.set(ENTRY_PREFIX + key, payload, ex=settings.ai_cache_ttl_seconds)
+                pipe.zadd(INDEX_KEY, {key: time.time()})
+                pipe.hset(SIZES_KEY, key, size)
+                pipe.incrby(BYTES_KEY, size - previous)
+                await pipe.execute()
+            await self._evict(r)
+            return True
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+            return False
+
+    async def _evict(self, r) -> int:
+        """Drop expired entries and the oldest entries while over the byte budget."""
+        cutoff = time.time() - settings.ai_cache_ttl_seconds
+        total = int(await r.get(BYTES_KEY) or 0)
+        evicted = 0
+        while True:
+            batch = await r.zrange(INDEX_KEY, 0, EVICT_BATCH - 1, withscores=True)
+            if not batch:
+                break
+            members = [member for member, _ in batch]
+            sizes = await r.hmget(SIZES_KEY, members)
+
+            victims = []
+            freed = 0
+            for (member, stored_at), size in zip(batch, sizes):
+                if stored_at >= cutoff and total - freed <= settings.ai_cache_max_bytes:
+                    break
+                victims.append(member)
+                freed += int(size or 0)
+            if not victims:
+                break
+
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.delete(*[ENTRY_PREFIX + (m.decode() if isinstance(m, bytes) else m) for m in victims])
+                pipe.zrem(INDEX_KEY, *victims)
+                pipe.hdel(SIZES_KEY, *victims)
+                pipe.decrby(BYTES_KEY, freed)
+                await pipe.execute()
+            total -= freed
+            evicted += len(victims)
+            if len(victims) < len(batch):
+                break
+
+        if evicted:
+            logger.info(f"LLM cache evicted {evicted} entries")
+        return evicted
+
+    async def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (cluster-wide and for this process) and cache size."""
+        result: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "process": {"hits": self.hits, "misses": self.misses},
+        }
+        try:
+            r = async_redis_conn()
+            hits, misses, total_bytes = await r.mget(HITS_KEY, MISSES_KEY, BYTES_KEY)
+            hits, misses = int(hits or 0), int(misses or 0)
+            result.update({
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+                "entries": await r.zcard(INDEX_KEY),
+                "bytes": int(total_bytes or 0),
+                "max_bytes": settings.ai_cache_max_bytes,
+                "ttl_seconds": settings.ai_cache_ttl_seconds,
+            })
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+
+# Global cache instance
+llm_cache = LLMResponseCache()
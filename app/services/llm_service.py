@@ -1,10 +1,93 @@
-import json, httpx, logging, asyncio
+import json, httpx, logging, asyncio, weakref
+from typing import Awaitable, Callable, List, Optional
 from pydantic import BaseModel, ValidationError
-from app.schemas.ai_output import AIOutput
+from app.schemas.ai_output import AIFinding, AIOutput
 from app.config import settings
+from app.services.llm_cache import llm_cache, make_cache_key
+from app.services.llm_stream import FindingsStreamParser, LLMStreamParseError, iter_sse_data
+from app.services.rate_limiter import (
+    rate_limiter, get_concurrency_limiter, estimate_tokens, parse_retry_after, backoff_delay
+)
 
 logger = logging.getLogger(__name__)
 
+# Called with each finding as soon as it has been streamed in
+FindingCallback = Callable[[AIFinding], Awaitable[None]]
+
+# Overloaded/throttled responses that are worth retrying after a pause
+RETRYABLE_STATUS_CODES = {429, 503, 529}
+
+
+class LLMProviderError(Exception):
+    """Raised when the LLM provider returns an error response."""
+    def __init__(self, provider: str, status_code: int, detail: str = ""):
+        self.provider = provider
+        self.status_code = status_code
+        self.detail = detail
+        super().__init__(f"{provider} API error: {status_code}")
+
+
+class LLMRateLimitError(LLMProviderError):
+    """Raised on 429/529 (and 503) responses; carries the provider's Retry-After."""
+    def __init__(self, provider: str, status_code: int, detail: str = "", retry_after: Optional[float] = None):
+        super().__init__(provider, status_code, detail)
+        self.retry_after = retry_after
+
+
+def _raise_for_status(provider: str, resp: httpx.Response) -> None:
+    if resp.status_code == 200:
+        return
+    logger.error(f"{provider} API error: {resp.status_code} - {resp.text}")
+    if resp.status_code in RETRYABLE_STATUS_CODES:
+        raise LLMRateLimitError(
+            provider, resp.status_code, resp.text,
+            retry_after=parse_retry_after(resp.headers.get("retry-after")),
+        )
+    raise LLMProviderError(provider, resp.status_code, resp.text)
+
+# One pooled client per event loop (httpx connections are bound to the loop
+# they were opened on). In the API and the worker that means one per process.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _http2_enabled() -> bool:
+    if not settings.ai_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("AI_HTTP2 is enabled but the 'h2' package is not installed, using HTTP/1.1")
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared LLM HTTP client for the running event loop, creating it if necessary."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=settings.ai_timeout,
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=settings.ai_http_max_connections,
+                max_keepalive_connections=settings.ai_http_max_keepalive,
+                keepalive_expiry=settings.ai_http_keepalive_expiry,
+            ),
+        )
+        _http_clients[loop] = client
+        logger.info("Created shared LLM HTTP client")
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the shared LLM HTTP client of the running event loop (API/worker shutdown)."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("Closed shared LLM HTTP client")
+
+
 class LLMService:
     def __init__(self):
         self.provider = settings.ai_provider
@@ -12,11 +95,82 @@ class LLMService:
         self.api_key = settings.ai_api_key
         self.timeout = settings.ai_timeout
         self.max_tokens = settings.ai_max_tokens
+        self.use_cache = llm_cache.enabled
+        self.stream = settings.ai_streaming
+        self.last_call_cached = False
+        self.last_usage_tokens = None
+
+    async def call(self, system_prompt: str, user_prompt: str, on_finding: Optional[FindingCallback] = None) -> AIOutput:
+        self.last_call_cached = False
+        cache_key = None
+        if self.use_cache:
+            cache_key = make_cache_key(self.provider, self.model, self.max_tokens, system_prompt, user_prompt)
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for {self.provider}/{self.model} ({cache_key[:12]})")
+                self.last_call_cached = True
+                if on_finding:
+                    for finding in cached.findings:
+                        await on_finding(finding)
+                return cached
 
-    async def call(self, system_prompt: str, user_prompt: str) -> AIOutput:
+        output = await self._call_provider(system_prompt, user_prompt, on_finding)
+        if cache_key:
+            await llm_cache.put(cache_key, output)
+        return output
+
+    async def _call_provider(self, system_prompt: str, user_prompt: str, on_finding: Optional[FindingCallback] = None) -> AIOutput:
+        """Call the provider within the shared rate budget, retrying throttled requests."""
+        reserved = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + self.max_tokens
+        limiter = get_concurrency_limiter(self.provider, self.model)
+
+        # A retried stream repeats the findings an interrupted attempt already
+        # reported; skip them by position, the same code can occur more than once
+        report_finding = None
+        stream = {"position": 0, "forwarded": 0}
+        if on_finding is not None:
+
+            async def report_finding(finding: AIFinding) -> None:
+                stream["position"] += 1
+                if stream["position"] > stream["forwarded"]:
+                    stream["forwarded"] = stream["position"]
+                    await on_finding(finding)
+
+        attempt = 0
+        while True:
+            if settings.ai_rate_limit_enabled:
+                await rate_limiter.acquire(self.provider, self.model, reserved)
+            self.last_usage_tokens = None
+            stream["position"] = 0
+            try:
+                async with limiter:
+                    output = await self._dispatch(system_prompt, user_prompt, report_finding)
+            except LLMRateLimitError as e:
+                limiter.on_throttle()
+                if attempt >= settings.ai_max_retries:
+                    raise
+                delay = backoff_delay(attempt, e.retry_after)
+                logger.warning(
+                    f"{self.provider} returned {e.status_code}, retry {attempt + 1}/{settings.ai_max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            limiter.on_success()
+            if settings.ai_rate_limit_enabled and self.last_usage_tokens is not None:
+                # Give back what the reservation over-estimated
+                await rate_limiter.adjust(self.provider, self.model, reserved - self.last_usage_tokens)
+            return output
+
+    async def _dispatch(self, system_prompt: str, user_prompt: str, on_finding: Optional[FindingCallback] = None) -> AIOutput:
         if self.provider == "anthropic":
+            if self.stream:
+                return await self._stream_anthropic(system_prompt, user_prompt, on_finding)
             return await self._call_anthropic(system_prompt, user_prompt)
         elif self.provider == "openai":
+            if self.stream:
+                return await self._stream_openai(system_prompt, user_prompt, on_finding)
             return await self._call_openai(system_prompt, user_prompt)
         else:
             raise RuntimeError(f"Unsupported provider {self.provider}")
@@ -39,24 +193,25 @@ class LLMService:
         logger.info(f"System prompt length: {len(system_prompt)}")
         logger.info(f"User prompt length: {len(user_prompt)}")
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            
-            logger.info(f"Anthropic API response status: {resp.status_code}")
-            
-            if resp.status_code != 200:
-                logger.error(f"Anthropic API error: {resp.status_code} - {resp.text}")
-                raise Exception(f"Anthropic API error: {resp.status_code}")
-            
-            data = resp.json()
-            logger.info(f"Anthropic API response data keys: {list(data.keys())}")
-            
-            if "content" not in data or not data["content"]:
-                logger.error(f"Anthropic API returned no content: {data}")
-                raise Exception("Anthropic API returned no content")
-            
-            text = data["content"][0]["text"]
-            return self._parse_json(text)
+        client = get_http_client()
+        resp = await client.post(url, headers=headers, json=body, timeout=self.timeout)
+        
+        logger.info(f"Anthropic API response status: {resp.status_code}")
+        
+        _raise_for_status("anthropic", resp)
+        
+        data = resp.json()
+        logger.info(f"Anthropic API response data keys: {list(data.keys())}")
+        usage = data.get("usage") or {}
+        if usage:
+            self.last_usage_tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        
+        if "content" not in data or not data["content"]:
+            logger.error(f"Anthropic API returned no content: {data}")
+            raise Exception("Anthropic API returned no content")
+        
+        text = data["content"][0]["text"]
+        return self._parse_json(text)
 
     async def _call_openai(self, system_prompt: str, user_prompt: str) -> AIOutput:
         url = "https://api.openai.com/v1/chat/completions"
@@ -69,17 +224,109 @@ class LLMService:
             ],
             "max_tokens": self.max_tokens,
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            resp.raise_for_status()
-            data = resp.json()
-            text = data["choices"][0]["message"]["content"]
-            return self._parse_json(text)
+        client = get_http_client()
+        resp = await client.post(url, headers=headers, json=body, timeout=self.timeout)
+        _raise_for_status("openai", resp)
+        data = resp.json()
+        usage = data.get("usage") or {}
+        if usage:
+            self.last_usage_tokens = usage.get("total_tokens")
+        text = data["choices"][0]["message"]["content"]
+        return self._parse_json(text)
+
+    async def _emit(self, findings: List[dict], on_finding: Optional[FindingCallback]) -> None:
+        """Validate streamed findings right away; a bad one aborts the stream."""
+        for data in findings:
+            try:
+                finding = AIFinding(**data)
+            except ValidationError as e:
+                raise LLMStreamParseError(f"Invalid finding in AI response: {e}") from e
+            if on_finding:
+                await on_finding(finding)
+
+    async def _stream_anthropic(self, system_prompt: str, user_prompt: str, on_finding: Optional[FindingCallback]) -> AIOutput:
+        url = "https://api.anthropic.com/v1/messages"
+        headers = {
+            "x-api-key": self.api_key,
+            "content-type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+        body = {
+            "model": self.model,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": user_prompt}],
+            "max_tokens": self.max_tokens,
+            "stream": True,
+        }
+        logger.info(f"Streaming Anthropic API with model: {self.model} (user prompt length: {len(user_prompt)})")
+
+        parser = FindingsStreamParser()
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        client = get_http_client()
+        # Leaving the block on an error closes the response and frees the worker
+        async with client.stream("POST", url, headers=headers, json=body, timeout=self.timeout) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                _raise_for_status("anthropic", resp)
+            async for payload in iter_sse_data(resp):
+                event = json.loads(payload)
+                event_type = event.get("type")
+                if event_type == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                    await self._emit(parser.feed(event["delta"]["text"]), on_finding)
+                elif event_type == "message_start":
+                    usage["input_tokens"] = event["message"].get("usage", {}).get("input_tokens", 0)
+                elif event_type == "message_delta":
+                    usage["output_tokens"] = event.get("usage", {}).get("output_tokens", 0)
+                elif event_type == "error":
+                    error = event.get("error", {})
+                    if error.get("type") in ("overloaded_error", "rate_limit_error"):
+                        status = 429 if error.get("type") == "rate_limit_error" else 529
+                        raise LLMRateLimitError("anthropic", status, error.get("message", ""))
+                    raise LLMProviderError("anthropic", 500, error.get("message", ""))
+
+        self.last_usage_tokens = usage["input_tokens"] + usage["output_tokens"]
+        logger.info(f"Anthropic stream finished: {len(parser.text)} chars, {parser.findings_seen} findings")
+        if not parser.text:
+            raise Exception("Anthropic API returned no content")
+        return self._parse_json(parser.text)
+
+    async def _stream_openai(self, system_prompt: str, user_prompt: str, on_finding: Optional[FindingCallback]) -> AIOutput:
+        url = "https://api.openai.com/v1/chat/completions"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "max_tokens": self.max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+        parser = FindingsStreamParser()
+        client = get_http_client()
+        async with client.stream("POST", url, headers=headers, json=body, timeout=self.timeout) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                _raise_for_status("openai", resp)
+            async for payload in iter_sse_data(resp):
+                if payload == "[DONE]":
+                    break
+                event = json.loads(payload)
+                if event.get("usage"):
+                    self.last_usage_tokens = event["usage"].get("total_tokens")
+                for choice in event.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        await self._emit(parser.feed(content), on_finding)
+
+        return self._parse_json(parser.text)
 
     def _parse_json(self, text: str) -> AIOutput:
         try:
-            # Log the raw response for debugging
-            logger.info(f"AI raw response: {text[:500]}...")
+            # Log the start of the raw response for debugging
+            logger.debug(f"AI raw response: {text[:500]}...")
             
             if not text or not text.strip():
                 logger.error("AI returned empty response")
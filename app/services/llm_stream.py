@@ -0,0 +1,110 @@
+"""
+Helpers for streamed LLM responses.
+
+``FindingsStreamParser`` scans the model output as it arrives and returns
+each object of the top-level ``findings`` array as soon as it closes, so
+findings can be shown (and invalid output rejected) before generation ends.
+"""
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+
+class LLMStreamParseError(ValueError):
+    """Raised when streamed LLM output can't be the expected JSON document."""
+
+
+async def iter_sse_data(resp: httpx.Response) -> AsyncIterator[str]:
+    """Yield the data payloads of a server-sent events response."""
+    async for line in resp.aiter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+class FindingsStreamParser:
+    """Incremental scanner for ``{"...": ..., "findings": [{...}, ...]}`` output."""
+
+    def __init__(self, max_preamble_chars: int = 2000):
+        self.max_preamble_chars = max_preamble_chars
+        self.text = ""
+        self.findings_seen = 0
+        self._pos = 0
+        self._depth = 0  # nesting depth of {} and []; the root object is depth 1
+        self._root_seen = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_key_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._findings_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add streamed text; return the findings completed by it."""
+        self.text += chunk
+        completed: List[Dict[str, Any]] = []
+        text = self.text
+
+        while self._pos < len(text) and not self._done:
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+
+            if not self._root_seen:
+                # Prose or a ```json fence may precede the object
+                if ch == "{":
+                    self._root_seen = True
+                    self._depth = 1
+                elif i >= self.max_preamble_chars:
+                    raise LLMStreamParseError("No JSON object found at the start of the AI response")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._last_key_string = text[self._string_start + 1:i]
+                        self._string_start = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                # Only strings directly in the root object can be keys we care about
+                self._string_start = i if self._depth == 1 else None
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_key_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._current_key == "findings":
+                    self._findings_depth = 2
+                elif ch == "{" and self._findings_depth is not None and self._depth == self._findings_depth + 1:
+                    self._object_start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._object_start is not None and self._depth == self._findings_depth:
+                    completed.append(self._load(text[self._object_start:i + 1]))
+                    self._object_start = None
+                elif ch == "]" and self._findings_depth is not None and self._depth == self._findings_depth - 1:
+                    self._findings_depth = None
+                if self._depth == 0:
+                    self._done = True
+
+        return completed
+
+    def _load(self, raw: str) -> Dict[str, Any]:
+        try:
+            finding = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise LLMStreamParseError(f"Invalid finding #{self.findings_seen + 1} in AI response: {e}") from e
+        if not isinstance(finding, dict):
+            raise LLMStreamParseError(f"Finding #{self.findings_seen + 1} in AI response is not an object")
+        self.findings_seen += 1
+        return finding
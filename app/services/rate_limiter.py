@@ -0,0 +1,204 @@
+"""
+Rate limiting for LLM provider calls.
+
+Two layers keep worker throughput just under the provider quota:
+
+* ``ProviderRateLimiter``: a token bucket in Redis, shared by all worker
+  processes, with separate requests-per-minute and tokens-per-minute budgets
+  per provider/model.
+* ``AdaptiveConcurrencyLimiter``: a per-process AIMD limit on concurrent calls
+  that halves on 429/529 responses and slowly grows back on success.
+"""
+import asyncio
+import logging
+import random
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from app.config import settings
+from app.redis_queue.conn import async_redis_conn
+
+logger = logging.getLogger(__name__)
+
+BUCKET_PREFIX = "llm_rate"
+BUCKET_TTL_SECONDS = 120  # idle buckets are full again after a minute anyway
+MAX_WAIT_STEP = 5.0  # re-check the bucket at least this often while waiting
+
+# KEYS: request bucket, token bucket
+# ARGV: now, requests/minute, tokens/minute, tokens requested, ttl
+# Returns the seconds to wait before retrying (as a string), "0" when granted.
+_ACQUIRE_LUA = """
+local function level(key, capacity, now)
+  local data = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(data[1]) or capacity
+  local ts = tonumber(data[2]) or now
+  return math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+end
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local need = math.min(tonumber(ARGV[4]), tpm)
+local requests = level(KEYS[1], rpm, now)
+local tokens = level(KEYS[2], tpm, now)
+local wait = 0
+if requests < 1 then wait = (1 - requests) * 60 / rpm end
+if tokens < need then wait = math.max(wait, (need - tokens) * 60 / tpm) end
+if wait == 0 then
+  requests = requests - 1
+  tokens = tokens - need
+end
+redis.call('HSET', KEYS[1], 'tokens', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return tostring(wait)
+"""
+
+# KEYS: token bucket; ARGV: now, tokens/minute, delta, ttl
+_ADJUST_LUA = """
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[1])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+tokens = math.min(capacity, tokens + tonumber(ARGV[3]))
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return tostring(tokens)
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for budgeting."""
+    return len(text) // 4 + 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Delay before retry number attempt+1; the provider's Retry-After wins when given."""
+    if retry_after is not None:
+        return min(retry_after, settings.ai_backoff_max_seconds)
+    delay = settings.ai_backoff_base_seconds * (2 ** attempt)
+    # Jitter so throttled workers don't all come back at the same moment
+    return min(delay, settings.ai_backoff_max_seconds) * random.uniform(0.5, 1.0)
+
+
+class ProviderRateLimiter:
+    """Redis token bucket shared by all processes, keyed by provider and model."""
+
+    def _keys(self, provider: str, model: str):
+        base = f"{BUCKET_PREFIX}:{provider}:{model}"
+        return f"{base}:rpm", f"{base}:tpm"
+
+    async def acquire(self, provider: str, model: str, tokens: int) -> float:
+        """
+        Wait until one request and ``tokens`` tokens fit in the budget.
+
+        Returns:
+            Seconds spent waiting. Fails open (no wait) when Redis is unavailable.
+        """
+        rpm_key, tpm_key = self._keys(provider, model)
+        waited = 0.0
+        while True:
+            try:
+                r = async_redis_conn()
+                wait = float(await r.eval(
+                    _ACQUIRE_LUA, 2, rpm_key, tpm_key,
+                    time.time(), settings.ai_rate_limit_rpm, settings.ai_rate_limit_tpm,
+                    tokens, BUCKET_TTL_SECONDS,
+                ))
+            except Exception as e:
+                logger.warning(f"LLM rate limiter unavailable, not throttling: {e}")
+                return waited
+            if wait <= 0:
+                if waited:
+                    logger.info(f"Waited {waited:.1f}s for {provider}/{model} rate budget")
+                return waited
+            step = min(wait, MAX_WAIT_STEP)
+            await asyncio.sleep(step)
+            waited += step
+
+    async def adjust(self, provider: str, model: str, delta: int) -> None:
+        """Correct the token bucket once the real usage is known (positive delta refunds)."""
+        if not delta:
+            return
+        _, tpm_key = self._keys(provider, model)
+        try:
+            r = async_redis_conn()
+            await r.eval(_ADJUST_LUA, 1, tpm_key, time.time(), settings.ai_rate_limit_tpm, delta, BUCKET_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"LLM rate limiter adjust failed: {e}")
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent provider calls within one process and event loop."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.cooldown = cooldown
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        """Additive increase: about one extra slot per window of successful calls."""
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        """Multiplicative decrease; a burst of 429s from one window counts once."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+        logger.warning(f"LLM provider throttling, concurrency limit lowered to {int(self.limit)}")
+
+
+# Concurrency limiters hold asyncio primitives, so they are kept per event loop
+_concurrency_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AdaptiveConcurrencyLimiter]]" = weakref.WeakKeyDictionary()
+
+
+def get_concurrency_limiter(provider: str, model: str) -> AdaptiveConcurrencyLimiter:
+    """Get the adaptive limiter for a provider/model on the running event loop."""
+    limiters = _concurrency_limiters.setdefault(asyncio.get_running_loop(), {})
+    key = f"{provider}:{model}"
+    if key not in limiters:
+        limiters[key] = AdaptiveConcurrencyLimiter(settings.ai_max_concurrency)
+    return limiters[key]
+
+
+# Global rate limiter instance
+rate_limiter = ProviderRateLimiter()
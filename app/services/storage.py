@@ -1,19 +1,24 @@
 """
 Object storage service for S3/MinIO compatibility.
 """
+import asyncio
 import boto3
 from botocore.exceptions import ClientError
 from botocore.config import Config
-from typing import BinaryIO, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Optional, Tuple, TypeVar
 import logging
 import hashlib
-import io
+import time
 
 from app.config import settings
-from app.exceptions import StorageError
+from app.exceptions import FileTooLargeError, StorageError
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class ObjectStorage:
     """Object storage adapter for S3/MinIO."""
@@ -44,7 +49,8 @@ class ObjectStorage:
             aws_secret_access_key=secret_key,
             config=Config(
                 s3={'addressing_style': 'path'},  # Always use path style for DO Spaces
-                signature_version='s3v4'  # Use S3 v4 signatures for DO Spaces
+                signature_version='s3v4',  # Use S3 v4 signatures for DO Spaces
+                max_pool_connections=max(10, settings.storage_max_workers)  # one per storage thread
             ),
             use_ssl=secure,
             verify=secure  # Verify SSL certificates in production
@@ -53,25 +59,22 @@ class ObjectStorage:
         logger.info(f"Initialized ObjectStorage for bucket: {bucket}")
     
     def ensure_bucket(self) -> bool:
-        """Ensure the bucket exists, create if it doesn't."""
+        """Check that the bucket exists and is accessible (a single HEAD request)."""
         try:
-            # Try a simple list_buckets operation first to test credentials
-            response = self.client.list_buckets()
-            bucket_names = [bucket['Name'] for bucket in response['Buckets']]
-            
-            if self.bucket in bucket_names:
-                logger.info(f"Bucket {self.bucket} exists and is accessible")
-                return True
-            else:
-                logger.error(f"Bucket {self.bucket} not found in available buckets: {bucket_names}")
-                raise StorageError(f"Storage bucket '{self.bucket}' does not exist. Available buckets: {bucket_names}")
+            self.client.head_bucket(Bucket=self.bucket)
+            logger.debug(f"Bucket {self.bucket} exists and is accessible")
+            return True
                 
         except ClientError as e:
             error_code = e.response['Error']['Code']
             logger.error(f"Error checking bucket {self.bucket}: {e}")
+            if error_code in ('404', 'NoSuchBucket'):
+                raise StorageError(f"Storage bucket '{self.bucket}' does not exist")
+            if error_code in ('403', 'AccessDenied'):
+                raise StorageError(f"Storage bucket '{self.bucket}' is not accessible with the configured credentials")
             raise StorageError(f"Storage error: {e}")
         except Exception as e:
-            logger.error(f"Unexpected error ensuring bucket {self.bucket}: {e}")
+            logger.error(f"Unexpected error checking bucket {self.bucket}: {e}")
             raise StorageError(f"Storage error: {e}")
     
     def upload_fileobj(
@@ -100,6 +103,103 @@ class ObjectStorage:
             logger.error(f"Unexpected error uploading {object_key}: {e}")
             return False
     
+    def upload_stream(
+        self,
+        fileobj: BinaryIO,
+        object_key: str,
+        content_type: str,
+        max_size: Optional[int] = None
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Upload a stream in a single pass, computing its SHA-256 and size on the way.
+        
+        The stream is read sequentially, one part at a time: files up to one
+        part are stored with a single PUT, larger files as a multipart upload.
+        Memory use is bounded by the part size (storage_multipart_part_mb).
+        
+        Args:
+            fileobj: Readable stream (doesn't need to be seekable)
+            object_key: Target object key
+            content_type: Content type of the object
+            max_size: Maximum size in bytes; larger streams raise FileTooLargeError
+                and leave nothing behind in storage
+        
+        Returns:
+            Optional[Tuple[str, int]]: (checksum, size), or None if the upload failed
+        """
+        part_size = max(5, settings.storage_multipart_part_mb) * 1024 * 1024  # S3 minimum is 5 MB
+        digest = hashlib.sha256()
+        size = 0
+        upload_id = None
+        parts = []
+        
+        def read_part() -> bytes:
+            nonlocal size
+            chunks = []
+            remaining = part_size
+            while remaining:
+                chunk = fileobj.read(remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            part = b"".join(chunks)
+            size += len(part)
+            if max_size is not None and size > max_size:
+                raise FileTooLargeError(f"File too large. Max size: {settings.max_upload_mb}MB")
+            digest.update(part)
+            return part
+        
+        try:
+            part = read_part()
+            if len(part) < part_size:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    Body=part,
+                    ContentType=content_type,
+                    ACL='private'
+                )
+            else:
+                upload_id = self.client.create_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    ContentType=content_type,
+                    ACL='private'
+                )['UploadId']
+                while part:
+                    part_number = len(parts) + 1
+                    response = self.client.upload_part(
+                        Bucket=self.bucket,
+                        Key=object_key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=part
+                    )
+                    parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                    part = read_part()
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+            
+            checksum = digest.hexdigest()
+            logger.info(f"Successfully uploaded {object_key} to {self.bucket} (size: {size}, checksum: {checksum[:16]}..., parts: {len(parts) or 1})")
+            return checksum, size
+        
+        except Exception as e:
+            if upload_id is not None:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+                except Exception as abort_error:
+                    logger.error(f"Failed to abort multipart upload of {object_key}: {abort_error}")
+            if isinstance(e, FileTooLargeError):
+                raise
+            logger.error(f"Failed to upload {object_key}: {e}")
+            return None
+    
     def upload_fileobj_with_checksum(
         self,
         fileobj: BinaryIO,
@@ -112,38 +212,11 @@ class ObjectStorage:
         Returns:
             Tuple[bool, Optional[str], Optional[int]]: (success, checksum, file_size)
         """
-        try:
-            # Read file content to calculate checksum and size
-            fileobj.seek(0)
-            content = fileobj.read()
-            file_size = len(content)
-            
-            # Calculate SHA256 checksum
-            checksum = hashlib.sha256(content).hexdigest()
-            
-            # Reset fileobj position and upload
-            fileobj.seek(0)
-            fileobj_io = io.BytesIO(content)
-            
-            self.client.upload_fileobj(
-                fileobj_io,
-                self.bucket,
-                object_key,
-                ExtraArgs={
-                    'ContentType': content_type,
-                    'ACL': 'private'
-                }
-            )
-            
-            logger.info(f"Successfully uploaded {object_key} to {self.bucket} (size: {file_size}, checksum: {checksum[:16]}...)")
-            return True, checksum, file_size
-            
-        except ClientError as e:
-            logger.error(f"Failed to upload {object_key}: {e}")
-            return False, None, None
-        except Exception as e:
-            logger.error(f"Unexpected error uploading {object_key}: {e}")
+        fileobj.seek(0)
+        result = self.upload_stream(fileobj, object_key, content_type)
+        if result is None:
             return False, None, None
+        return True, result[0], result[1]
     
     def download_fileobj(self, object_key: str) -> Optional[BinaryIO]:
         """Download a file object from storage."""
@@ -165,6 +238,74 @@ class ObjectStorage:
             logger.error(f"Unexpected error downloading {object_key}: {e}")
             return None
     
+    def get_object(
+        self,
+        object_key: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Open an object for streaming, optionally a byte range or conditional on its ETag.
+        
+        Returns the GetObject response; the caller reads and closes its Body.
+        A matching ETag gives {"NotModified": True, "ETag": ...} and an
+        unsatisfiable range {"RangeNotSatisfiable": True, "ObjectSize": ...}.
+        Returns None when the object can't be read.
+        """
+        params = {"Bucket": self.bucket, "Key": object_key}
+        if byte_range:
+            params["Range"] = byte_range
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+        try:
+            return self.client.get_object(**params)
+        except ClientError as e:
+            error = e.response.get('Error', {})
+            if error.get('Code') in ('304', 'NotModified'):
+                return {"NotModified": True, "ETag": e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('etag')}
+            if error.get('Code') == 'InvalidRange':
+                size = error.get('ActualObjectSize')
+                if size is None:
+                    size = (self.head_object(object_key) or {}).get('size')
+                return {"RangeNotSatisfiable": True, "ObjectSize": int(size) if size is not None else None}
+            logger.error(f"Failed to open {object_key}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error opening {object_key}: {e}")
+            return None
+    
+    def download_bytes(self, object_key: str) -> Optional[bytes]:
+        """Download an object's content; returns None (without logging an error) if it doesn't exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=object_key)
+            return response['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                logger.debug(f"Object {object_key} not found in {self.bucket}")
+            else:
+                logger.error(f"Failed to download {object_key}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error downloading {object_key}: {e}")
+            return None
+    
+    def head_object(self, object_key: str) -> Optional[Dict[str, Any]]:
+        """Get object metadata (etag, size, content type) without downloading it."""
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=object_key)
+            return {
+                'etag': response.get('ETag', '').strip('"'),
+                'size': response.get('ContentLength'),
+                'content_type': response.get('ContentType'),
+            }
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.error(f"Failed to get metadata for {object_key}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error getting metadata for {object_key}: {e}")
+            return None
+    
     def presigned_get_url(self, object_key: str, expires: int = 3600) -> Optional[str]:
         """Generate a presigned URL for downloading an object."""
         try:
@@ -202,6 +343,139 @@ class ObjectStorage:
             return False
 
 
+class AsyncObjectStorage:
+    """
+    Async interface to ObjectStorage for the API.
+    
+    boto3 is synchronous, so every call runs in a bounded thread pool of
+    its own: slow transfers occupy pool threads instead of the event loop,
+    and they don't compete with other to_thread work for the default
+    executor. Methods and return values are the same as ObjectStorage.
+    """
+    
+    def __init__(self, storage: ObjectStorage, max_workers: int):
+        self.sync = storage
+        self.bucket = storage.bucket
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="storage")
+        # Cached bucket readiness, see bucket_ready()
+        self.bucket_checked_at: Optional[float] = None
+        self.bucket_error: Optional[str] = None
+        self._monitor: Optional[asyncio.Task] = None
+    
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    async def ensure_bucket(self) -> bool:
+        return await self._run(self.sync.ensure_bucket)
+    
+    async def refresh_bucket_status(self, timeout: float = 5.0) -> bool:
+        """Check the bucket now and cache the outcome; a check that hangs counts as an outage."""
+        try:
+            await asyncio.wait_for(self.ensure_bucket(), timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"Storage bucket check timed out after {timeout:g}s"
+        except StorageError as e:
+            error = e.detail
+        if error and error != self.bucket_error:
+            logger.error(f"Storage bucket {self.bucket} not available: {error}")
+        elif not error and self.bucket_error:
+            logger.info(f"Storage bucket {self.bucket} available again")
+        self.bucket_error = error
+        self.bucket_checked_at = time.monotonic()
+        return error is None
+    
+    async def bucket_ready(self) -> bool:
+        """
+        Bucket readiness for the request path.
+        
+        Uses the state kept up to date by the bucket monitor, so requests
+        don't make an extra storage call while the bucket is fine. Only
+        when the state is unknown or bad the bucket is checked again, so
+        uploads resume as soon as storage is back.
+        """
+        if self.bucket_checked_at is None or self.bucket_error is not None:
+            return await self.refresh_bucket_status()
+        return True
+    
+    def start_bucket_monitor(self, interval: float) -> None:
+        """Check the bucket now and then every `interval` seconds (API startup)."""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitor_bucket(interval))
+    
+    async def _monitor_bucket(self, interval: float) -> None:
+        while True:
+            await self.refresh_bucket_status()
+            await asyncio.sleep(interval)
+    
+    async def upload_fileobj(self, fileobj: BinaryIO, object_key: str, content_type: str) -> bool:
+        return await self._run(self.sync.upload_fileobj, fileobj, object_key, content_type)
+    
+    async def upload_stream(
+        self,
+        fileobj: BinaryIO,
+        object_key: str,
+        content_type: str,
+        max_size: Optional[int] = None
+    ) -> Optional[Tuple[str, int]]:
+        return await self._run(self.sync.upload_stream, fileobj, object_key, content_type, max_size)
+    
+    async def upload_fileobj_with_checksum(
+        self,
+        fileobj: BinaryIO,
+        object_key: str,
+        content_type: str
+    ) -> Tuple[bool, Optional[str], Optional[int]]:
+        return await self._run(self.sync.upload_fileobj_with_checksum, fileobj, object_key, content_type)
+    
+    async def download_fileobj(self, object_key: str) -> Optional[BinaryIO]:
+        return await self._run(self.sync.download_fileobj, object_key)
+    
+    async def get_object(
+        self,
+        object_key: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._run(self.sync.get_object, object_key, byte_range, if_none_match)
+    
+    async def iter_body(self, body: Any, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Read a GetObject body chunk by chunk.
+        
+        The next chunk is only read once the previous one has been consumed,
+        so a slow client holds at most one chunk in memory. The body (and its
+        connection) is released when the iterator is closed.
+        """
+        try:
+            while True:
+                chunk = await self._run(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    async def download_bytes(self, object_key: str) -> Optional[bytes]:
+        return await self._run(self.sync.download_bytes, object_key)
+    
+    async def head_object(self, object_key: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.sync.head_object, object_key)
+    
+    async def presigned_get_url(self, object_key: str, expires: int = 3600) -> Optional[str]:
+        return await self._run(self.sync.presigned_get_url, object_key, expires)
+    
+    async def delete_object(self, object_key: str) -> bool:
+        return await self._run(self.sync.delete_object, object_key)
+    
+    def shutdown(self) -> None:
+        """Stop the thread pool (API shutdown); running transfers finish first."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+        self._executor.shutdown(wait=True)
+
+
 # Global storage instance
 storage = ObjectStorage(
     endpoint=settings.s3_endpoint,
@@ -212,3 +486,6 @@ storage = ObjectStorage(
     use_path_style=settings.s3_use_path_style,
     secure=settings.s3_secure
 )
+
+# Async interface for the API
+async_storage = AsyncObjectStorage(storage, settings.storage_max_workers)
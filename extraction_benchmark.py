@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark voor PDF tekstextractie: single-process versus process pool.
+
+Gebruikt test_real_asbest_rapport.pdf; met --repeat wordt het document
+vermenigvuldigd om een groot inventarisatierapport (300+ pagina's) na te bootsen.
+
+Voorbeeld:
+    python extraction_benchmark.py --repeat 20 --workers 4
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import fitz
+
+from app.services.analyzer.text_extraction import extract_pages_from_bytes, shutdown_extraction_pool
+
+DEFAULT_PDF = Path(__file__).parent / "test_real_asbest_rapport.pdf"
+
+
+def build_document(pdf_path: Path, repeat: int) -> bytes:
+    """Lees de PDF en plak hem `repeat` keer achter elkaar."""
+    source = fitz.open(str(pdf_path))
+    doc = fitz.open()
+    for _ in range(repeat):
+        doc.insert_pdf(source)
+    data = doc.tobytes()
+    doc.close()
+    source.close()
+    return data
+
+
+def time_extraction(pdf_bytes: bytes, workers: int, runs: int) -> float:
+    """Beste tijd over `runs` runs (in seconden)."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        extract_pages_from_bytes(pdf_bytes, workers=workers, parallel_min_pages=0)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=DEFAULT_PDF)
+    parser.add_argument("--repeat", type=int, default=20, help="aantal keer dat het document herhaald wordt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_bytes = build_document(args.pdf, args.repeat)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = len(doc)
+
+    print(f"📄 {args.pdf.name} x{args.repeat}: {page_count} pagina's, {len(pdf_bytes) / 1024 / 1024:.1f} MB")
+
+    single = time_extraction(pdf_bytes, workers=1, runs=args.runs)
+    print(f"🐢 Single-process:        {single:.2f}s")
+
+    # Eerste run start de pool; die kost telt niet mee in een langlopende worker
+    extract_pages_from_bytes(pdf_bytes, workers=args.workers, parallel_min_pages=0)
+    parallel = time_extraction(pdf_bytes, workers=args.workers, runs=args.runs)
+    print(f"🚀 Process pool ({args.workers} workers): {parallel:.2f}s")
+
+    if parallel > 0:
+        print(f"📊 Versnelling: {single / parallel:.2f}x")
+
+    shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    main()
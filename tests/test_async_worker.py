@@ -0,0 +1,108 @@
+"""
+Unit tests for the asyncio report worker.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from worker.async_worker import AsyncReportWorker
+
+
+def make_job(job_id, perform, timeout=None, retries_left=None):
+    job = MagicMock()
+    job.id = job_id
+    job.timeout = timeout
+    job.retries_left = retries_left
+    job.perform.side_effect = perform
+    job.get_result_ttl.return_value = 500
+    return job
+
+
+def run_worker(jobs, concurrency=2, job_timeout=5):
+    """Run the worker until all given jobs have been dequeued and processed."""
+    queue = MagicMock()
+    queue.name = "reports"
+    pending = list(jobs)
+    worker = AsyncReportWorker([queue], MagicMock(), concurrency=concurrency, job_timeout=job_timeout)
+
+    def dequeue_any(queues, timeout, connection=None):
+        if pending:
+            return pending.pop(0), queue
+        worker.request_stop()
+        return None
+
+    with patch("worker.async_worker.Queue.dequeue_any", side_effect=dequeue_any):
+        asyncio.run(worker.run())
+    return worker, queue
+
+
+class TestAsyncReportWorker:
+    """Test async worker functionality."""
+
+    def test_concurrency_is_bounded(self):
+        """Never more than `concurrency` jobs run at the same time."""
+        lock = threading.Lock()
+        state = {"running": 0, "max": 0}
+
+        def perform():
+            with lock:
+                state["running"] += 1
+                state["max"] = max(state["max"], state["running"])
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+            return True
+
+        jobs = [make_job(f"job-{i}", perform) for i in range(6)]
+        run_worker(jobs, concurrency=3)
+
+        assert state["max"] == 3
+        for job in jobs:
+            job._handle_success.assert_called_once()
+
+    def test_failed_job_is_retried(self):
+        """A failing job with retries left is re-queued."""
+        job = make_job("job-1", RuntimeError("boom"), retries_left=2)
+        _, queue = run_worker([job])
+
+        job.retry.assert_called_once()
+        job._handle_failure.assert_not_called()
+
+    def test_failed_job_without_retries(self):
+        """A failing job without retries ends in the failed registry."""
+        job = make_job("job-1", RuntimeError("boom"), retries_left=0)
+        run_worker([job])
+
+        job.retry.assert_not_called()
+        job._handle_failure.assert_called_once()
+        assert "boom" in job._handle_failure.call_args[0][0]
+
+    def test_job_timeout(self):
+        """A job running past its timeout is failed once, even if it finishes later."""
+        job = make_job("job-1", lambda: time.sleep(0.3), timeout=0.05, retries_left=0)
+        run_worker([job])
+
+        job._handle_failure.assert_called_once()
+        assert "JobTimeoutException" in job._handle_failure.call_args[0][0]
+        job._handle_success.assert_not_called()
+
+    def test_timed_out_job_is_requeued_after_its_thread_returns(self):
+        """A timed-out job is marked failed at once but only re-queued once perform has returned."""
+        state = {"done": False}
+
+        def perform():
+            time.sleep(0.3)
+            state["done"] = True
+
+        job = make_job("job-1", perform, timeout=0.05, retries_left=1)
+        job.retry.side_effect = lambda *args: state.setdefault("done_at_retry", state["done"])
+        job.set_status.side_effect = lambda *args, **kwargs: state.setdefault("done_at_status", state["done"])
+        run_worker([job])
+
+        job.retry.assert_called_once()
+        assert state["done_at_status"] is False
+        assert state["done_at_retry"] is True
+        job._handle_success.assert_not_called()
@@ -0,0 +1,123 @@
+"""
+Unit tests for bulk report intake.
+"""
+import asyncio
+import io
+import threading
+import time
+import zipfile
+from unittest.mock import MagicMock, patch
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.services.batch_upload import collect_batch_files, enqueue_reports, upload_batch_files
+from app.services.storage import AsyncObjectStorage
+
+
+ALLOWED = {".pdf": "application/pdf", ".docx": "application/docx"}
+
+
+def make_upload(filename, data, content_type="application/pdf"):
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename=filename,
+        size=len(data),
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TestCollectBatchFiles:
+    """Test expanding uploads into report files."""
+
+    def test_zip_entries_are_expanded(self):
+        """ZIP entries become report files; folders, macOS metadata and unsupported files are skipped."""
+        archive = make_zip({
+            "rapporten/a.pdf": b"%PDF-a",
+            "rapporten/b.docx": b"docx",
+            "rapporten/notes.txt": b"txt",
+            "__MACOSX/rapporten/._a.pdf": b"meta",
+            ".DS_Store": b"meta",
+        })
+        uploads = [make_upload("c.pdf", b"%PDF-c"), make_upload("batch.zip", archive, "application/zip")]
+
+        files, rejected = collect_batch_files(uploads, ALLOWED, max_file_size=1024)
+
+        assert [f.filename for f in files] == ["c.pdf", "a.pdf", "b.docx"]
+        assert files[2].content_type == "application/docx"
+        assert rejected == [{"filename": "notes.txt", "reason": "Unsupported file type"}]
+        with files[1].open() as fileobj:
+            assert fileobj.read() == b"%PDF-a"
+
+    def test_oversized_and_invalid_files_are_rejected(self):
+        """Size is checked per file and broken archives are reported."""
+        uploads = [
+            make_upload("groot.pdf", b"x" * 20),
+            make_upload("kapot.zip", b"not a zip", "application/zip"),
+            make_upload("ok.pdf", b"x"),
+        ]
+
+        files, rejected = collect_batch_files(uploads, ALLOWED, max_file_size=10)
+
+        assert [f.filename for f in files] == ["ok.pdf"]
+        assert [r["filename"] for r in rejected] == ["groot.pdf", "kapot.zip"]
+        assert rejected[1]["reason"] == "Invalid ZIP archive"
+
+
+class TestUploadBatchFiles:
+    """Test concurrent uploads to storage."""
+
+    def test_uploads_run_concurrently_and_report_failures(self):
+        """Uploads overlap and a failing upload doesn't stop the others."""
+        files, _ = collect_batch_files(
+            [make_upload(f"{i}.pdf", b"%PDF") for i in range(4)], ALLOWED, max_file_size=1024
+        )
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def upload_stream(fileobj, object_key, content_type, max_size):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            if object_key == "key-2":
+                raise RuntimeError("S3 down")
+            return "checksum", len(fileobj.read())
+
+        sync_storage = MagicMock(bucket="test-bucket")
+        sync_storage.upload_stream.side_effect = upload_stream
+        with patch("app.services.batch_upload.async_storage", AsyncObjectStorage(sync_storage, max_workers=4)):
+            results = asyncio.run(upload_batch_files(files, [f"key-{i}" for i in range(4)]))
+
+        assert results == [("checksum", 4), ("checksum", 4), None, ("checksum", 4)]
+        assert peak > 1
+
+
+class TestEnqueueReports:
+    """Test enqueuing batch jobs."""
+
+    def test_jobs_enqueued_in_one_call(self):
+        """All jobs go to the tenant's bulk lane with a single enqueue_many."""
+        queue = MagicMock()
+        with patch("app.services.batch_upload.reports_queue", return_value=queue) as reports_queue:
+            enqueue_reports(["r1", "r2", "r3"], "tenant-1")
+
+        reports_queue.assert_called_once_with("tenant-1", "bulk")
+        queue.enqueue_many.assert_called_once()
+        job_datas = queue.enqueue_many.call_args.args[0]
+        assert [data.kwargs for data in job_datas] == [{"report_id": "r1"}, {"report_id": "r2"}, {"report_id": "r3"}]
+        assert job_datas[0].func == "app.redis_queue.jobs.process_report_with_ai"
+        assert job_datas[0].timeout == settings.ai_job_timeout_seconds
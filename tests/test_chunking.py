@@ -0,0 +1,164 @@
+"""
+Unit tests for chunked (map-reduce) AI analysis.
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.redis_queue import ai_analysis
+from app.schemas.ai_output import AIFinding, AIOutput
+from app.services.analyzer.chunking import split_into_chunks, merge_ai_outputs
+from app.services.analyzer.text_extraction import ExtractionResult
+
+
+def finding(code, status, severity="HIGH", category="FORMAL", page=None):
+    return AIFinding(
+        code=code, title=code, category=category, severity=severity, status=status,
+        page=page, evidence_snippet=None, suggested_fix=None,
+    )
+
+
+class TestSplitIntoChunks:
+    """Test splitting long texts."""
+
+    def test_short_text_is_single_chunk(self):
+        """Text under the limit is not split."""
+        assert split_into_chunks("korte tekst", 100) == ["korte tekst"]
+
+    def test_chunks_cover_text_and_respect_limit(self):
+        """Chunks stay under the limit and together contain the whole text."""
+        text = "\n\n".join(f"Paragraaf {i} " + "asbest " * 30 for i in range(50))
+        chunks = split_into_chunks(text, 1000)
+        assert len(chunks) > 1
+        assert all(len(c) <= 1000 for c in chunks)
+        assert "".join(chunks) == text
+
+    def test_prefers_given_boundaries(self):
+        """Page boundaries are used as split points when available."""
+        pages = ["a" * 300 + "\n", "b" * 300 + "\n", "c" * 300 + "\n"]
+        text = "".join(pages)
+        boundaries = [301, 602]
+        chunks = split_into_chunks(text, 650, boundaries)
+        assert chunks == [pages[0] + pages[1], pages[2]]
+
+
+class TestMergeAIOutputs:
+    """Test merging per-chunk AI outputs."""
+
+    def test_dedupes_by_code_and_pass_wins_for_presence_checks(self):
+        """A checklist item found in any chunk passes."""
+        merged = merge_ai_outputs([
+            AIOutput(report_summary="Deel 1", score=70, findings=[finding("SCOPE", "FAIL", page=1)]),
+            AIOutput(report_summary="Deel 2", score=100, findings=[finding("SCOPE", "PASS", page=9)]),
+        ])
+        assert [(f.code, f.status) for f in merged.findings] == [("SCOPE", "PASS")]
+        assert merged.score == 100
+        assert merged.report_summary == "Deel 1 Deel 2"
+
+    def test_risk_fail_wins_and_score_is_recomputed(self):
+        """Problems found in one chunk are kept and cost points once."""
+        merged = merge_ai_outputs([
+            AIOutput(report_summary=None, score=85, findings=[
+                finding("RISK", "FAIL", severity="HIGH", category="RISK"),
+                finding("SIGN", "UNKNOWN"),
+            ]),
+            AIOutput(report_summary=None, score=70, findings=[
+                finding("RISK", "PASS", category="RISK"),
+                finding("RISK", "FAIL", severity="CRITICAL", category="RISK"),
+            ]),
+        ])
+        by_code = {f.code: f for f in merged.findings}
+        assert by_code["RISK"].status == "FAIL"
+        assert by_code["RISK"].severity == "CRITICAL"
+        assert by_code["SIGN"].status == "UNKNOWN"
+        assert merged.score == 70
+
+
+class TestAnalyzeText:
+    """Test the map-reduce LLM call flow."""
+
+    def test_long_text_is_analysed_in_chunks(self):
+        """Every chunk is sent to the LLM instead of truncating the text."""
+        prompts = []
+
+        async def fake_call(self, system_prompt, user_prompt, on_finding=None):
+            prompts.append(user_prompt)
+            return AIOutput(report_summary=None, score=100, findings=[])
+
+        text = "\n\n".join("x" * 90 for _ in range(30))
+        with patch.object(ai_analysis.settings, "ai_chunk_max_chars", 1000), \
+             patch.object(ai_analysis.LLMService, "call", fake_call):
+            output, metadata = asyncio.run(ai_analysis.analyze_text("systeem", text))
+
+        assert metadata["chunks"] == len(prompts) > 1
+        assert sum(metadata["chunk_chars"]) == len(text)
+        assert prompts[-1].rstrip().endswith("x" * 90)
+        assert output.score == 100
+
+    def test_chunks_split_on_page_starts(self):
+        """With the page index passed in every chunk starts at a page instead of mid-page."""
+        prompts = []
+
+        async def fake_call(self, system_prompt, user_prompt, on_finding=None):
+            prompts.append(user_prompt)
+            return AIOutput(report_summary=None, score=100, findings=[])
+
+        pages = [f"Pagina {i}\n" + "\n\n".join("asbest " * 10 for _ in range(2 + i % 4)) for i in range(12)]
+        extraction = ExtractionResult.from_pages(pages)
+        page_starts = list(extraction.page_index.starts[1:])
+        with patch.object(ai_analysis.settings, "ai_chunk_max_chars", 600), \
+             patch.object(ai_analysis.LLMService, "call", fake_call):
+            asyncio.run(ai_analysis.analyze_text("systeem", extraction.text, boundaries=page_starts))
+
+        assert len(prompts) > 1
+        chunks = [prompt.split("]\n\n", 1)[1] for prompt in prompts]
+        assert all(chunk.startswith("Pagina ") for chunk in chunks)
+        assert "".join(chunks) == extraction.text
+
+
+class TestAnalysisTimeout:
+    """Test the time budget of chunked analyses."""
+
+    def test_budget_scales_with_chunks_and_rate_limit(self):
+        """A long report gets time for every round of chunk calls and the token bucket refill."""
+        settings = ai_analysis.settings
+        with patch.object(settings, "ai_job_timeout_seconds", 10**6):
+            short = ai_analysis.analysis_timeout(10_000)
+            long = ai_analysis.analysis_timeout(400_000)
+
+        chunks = 8
+        rounds = 2
+        assert short < long
+        assert long >= settings.job_timeout_seconds + rounds * settings.ai_timeout + 60 * (
+            chunks * settings.ai_chunk_max_chars / 4 - settings.ai_rate_limit_tpm
+        ) / settings.ai_rate_limit_tpm
+        with patch.object(settings, "ai_job_timeout_seconds", 600):
+            assert ai_analysis.analysis_timeout(10_000_000) == 600
+
+    def test_multi_chunk_analysis_fits_its_budget(self):
+        """Chunk calls that each take the full AI timeout finish within the budget."""
+        settings = ai_analysis.settings
+
+        async def slow_call(self, system_prompt, user_prompt, on_finding=None):
+            await asyncio.sleep(settings.ai_timeout)
+            return AIOutput(report_summary=None, score=100, findings=[])
+
+        text = "\n\n".join("x" * 90 for _ in range(60))
+        with patch.object(settings, "ai_chunk_max_chars", 1000), \
+             patch.object(settings, "ai_chunk_concurrency", 2), \
+             patch.object(settings, "ai_timeout", 0.05), \
+             patch.object(settings, "job_timeout_seconds", 0.02), \
+             patch.object(settings, "ai_rate_limit_enabled", False), \
+             patch.object(ai_analysis.LLMService, "call", slow_call):
+            budget = ai_analysis.analysis_timeout(len(text))
+            output, metadata = asyncio.run(asyncio.wait_for(ai_analysis.analyze_text("systeem", text), budget))
+
+            # The fixed budget of a single call is not enough
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(asyncio.wait_for(
+                    ai_analysis.analyze_text("systeem", text), settings.job_timeout_seconds + settings.ai_timeout
+                ))
+
+        assert metadata["chunks"] >= 6
+        assert output.score == 100
@@ -0,0 +1,94 @@
+"""
+Unit tests for section-targeted LLM context selection.
+"""
+from app.services.analyzer.context_builder import build_context, segment_sections
+from app.services.analyzer.prescreen import load_checklist
+
+
+REPORT = (
+    "Rapportage Asbestinventarisatie\n"
+    "Inhoudsopgave\n"
+    "1 SAMENVATTING ........................ 4\n"
+    "2 RESULTATEN\n"
+    "........................................ 5\n"
+    "3 CONCLUSIE ........................... 6\n"
+    "1 SAMENVATTING\n"
+    "Inleiding van het rapport zonder veel inhoud.\n"
+    "2 RESULTATEN\n"
+    "Asbestverdacht materiaal aangetroffen: tegellijm in de badkamer, conditie goed.\n"
+    "3 CONCLUSIE\n"
+    "Aanbeveling: verwijderen voor renovatie. Aannames en onzekerheden zijn beschreven.\n"
+    "4 BIJLAGEN\n"
+    "Foto 1. Foto 2. Foto 3.\n"
+)
+
+
+def checklist_items(*codes):
+    return [item for item in load_checklist().items if item.code in codes]
+
+
+class TestSegmentSections:
+    """Test splitting text at headings."""
+
+    def test_headings_start_sections(self):
+        """Numbered headings start sections; table of contents entries don't."""
+        headings = [section.heading for section in segment_sections(REPORT)]
+
+        assert headings[-4:] == ["1 SAMENVATTING", "2 RESULTATEN", "3 CONCLUSIE", "4 BIJLAGEN"]
+        toc = next(s for s in segment_sections(REPORT) if s.heading == "Inhoudsopgave")
+        assert toc.is_toc
+
+    def test_text_without_headings_uses_paragraphs(self):
+        """Plain text falls back to paragraph boundaries."""
+        sections = segment_sections("eerste alinea\n\ntweede alinea\n\nderde alinea")
+        assert len(sections) == 3
+
+
+class TestBuildContext:
+    """Test packing relevant sections into the token budget."""
+
+    def test_irrelevant_sections_are_dropped(self):
+        """Only sections mentioning the items' terms are kept, in document order."""
+        items = checklist_items("A22.ID_FINDINGS", "A22.CONDITION_RISK", "A22.RECOMMENDATIONS")
+        context = build_context(REPORT, items, token_budget=10000)
+
+        assert "tegellijm in de badkamer" in context.text
+        assert "Aanbeveling: verwijderen" in context.text
+        assert "Inleiding van het rapport" not in context.text
+        assert "......" not in context.text
+        assert context.text.index("RESULTATEN") < context.text.index("Aanbeveling")
+
+        metadata = context.metadata()
+        assert metadata["tokens_selected"] < metadata["tokens_total"]
+        assert "2 RESULTATEN" in [s["heading"] for s in metadata["sections"]]
+
+    def test_budget_is_respected_and_items_covered(self):
+        """With a tight budget each item still gets its best section first."""
+        items = checklist_items("A22.ID_FINDINGS", "A22.ASSUMPTIONS")
+        filler = "".join(f"{i} HOOFDSTUK\nAsbest asbest verdacht materiaal, resultaten.\n" for i in range(10, 40))
+        text = filler + "5 ONZEKERHEDEN\nAannames en onzekerheden van het onderzoek.\n"
+
+        context = build_context(text, items, token_budget=60)
+        covered = {code for s in context.metadata()["sections"] for code in s["items"]}
+
+        assert context.tokens_selected <= 60
+        assert covered == {"A22.ID_FINDINGS", "A22.ASSUMPTIONS"}
+        assert "Aannames en onzekerheden" in context.text
+
+    def test_zero_budget_keeps_full_text(self):
+        """A budget of 0 disables selection."""
+        context = build_context(REPORT, checklist_items("A22.ID_FINDINGS"), token_budget=0)
+        assert context.text == REPORT
+
+    def test_no_matching_sections_spreads_over_report(self):
+        """Without relevant sections whole sections from across the report are kept, not just its start."""
+        text = "".join(f"{i} HOOFDSTUK\nAlgemene tekst zonder relevante termen, deel {i}.\n" for i in range(10, 30))
+        sections = segment_sections(text)
+
+        context = build_context(text, checklist_items("A22.ID_FINDINGS"), token_budget=sections[0].tokens * 5)
+        headings = [section.heading for section in context.selected]
+
+        assert len(headings) == 5
+        assert headings[0] == "10 HOOFDSTUK" and headings[-1] == "29 HOOFDSTUK"
+        assert "19 HOOFDSTUK" in headings
+        assert all(text[s.start:s.end] in context.text for s in context.selected)
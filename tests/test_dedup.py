@@ -0,0 +1,58 @@
+"""
+Unit tests for deduplication of identical uploads.
+"""
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import app.models  # noqa: F401 - registers all mappers
+from app.models.analysis import Analysis
+from app.models.finding import Finding
+from app.models.report import Report, ReportStatus
+from app.services.dedup import clone_analysis
+
+
+def make_session(analysis, findings=()):
+    analysis_result = MagicMock()
+    analysis_result.scalar_one_or_none.return_value = analysis
+    findings_result = MagicMock()
+    findings_result.scalars.return_value.all.return_value = list(findings)
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=[analysis_result, findings_result])
+    return session
+
+
+class TestCloneAnalysis:
+    """Test reusing the analysis of an identical report."""
+
+    def test_analysis_and_findings_are_copied(self):
+        """The latest analysis, its findings and the report results are copied to the new report."""
+        source = Report(id=uuid.uuid4(), status=ReportStatus.DONE, score=85.0, finding_count=1,
+                        conclusion_object_key="tenants/t/reports/s/output.pdf")
+        target = Report(id=uuid.uuid4(), status=ReportStatus.PROCESSING, finding_count=0)
+        analysis = Analysis(id=uuid.uuid4(), report_id=source.id, engine="hybrid", engine_version="1",
+                            score=85, summary="Samenvatting", rules_passed=3, rules_failed=1,
+                            duration_ms=10, raw_metadata={"analysis_mode": "hybrid"})
+        finding = Finding(id=uuid.uuid4(), analysis_id=analysis.id, rule_id="A22.SCOPE", severity="HIGH",
+                          message="Scope ontbreekt", page=2, tags=["rules"])
+        session = make_session(analysis, [finding])
+
+        clone = asyncio.run(clone_analysis(session, source, target))
+
+        assert clone.report_id == target.id and clone.id != analysis.id
+        assert clone.raw_metadata["deduplicated_from"] == {"report_id": str(source.id), "analysis_id": str(analysis.id)}
+        assert clone.raw_metadata["analysis_mode"] == "hybrid"
+        cloned_findings = list(session.add_all.call_args.args[0])
+        assert [(f.analysis_id, f.rule_id, f.page) for f in cloned_findings] == [(clone.id, "A22.SCOPE", 2)]
+        assert target.status == ReportStatus.DONE
+        assert target.score == 85.0
+        assert target.conclusion_object_key == source.conclusion_object_key
+
+    def test_no_analysis(self):
+        """Without an analysis to copy nothing changes."""
+        target = Report(id=uuid.uuid4(), status=ReportStatus.PROCESSING)
+        session = make_session(None)
+
+        assert asyncio.run(clone_analysis(session, Report(id=uuid.uuid4()), target)) is None
+        assert target.status == ReportStatus.PROCESSING
+        session.add.assert_not_called()
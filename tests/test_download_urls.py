@@ -0,0 +1,102 @@
+"""
+Unit tests for cached download URLs and coalesced download audits.
+"""
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, patch
+
+from app.services import download_urls
+from app.services.download_urls import cached_presigned_url, claim_download_audit
+
+
+class FakeRedis:
+    """The part of the Redis API used for the caches, with expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    async def set(self, key, value, ex, nx=False):
+        if nx and await self.get(key) is not None:
+            return None
+        self.data[key] = (value, time.time() + ex)
+        return True
+
+
+class TestCachedPresignedUrl:
+    """Test reuse of presigned URLs."""
+
+    def test_url_reused_until_close_to_expiry(self):
+        """Repeat calls reuse the signed URL; it is re-signed once too little validity is left."""
+        redis = FakeRedis()
+        sign = AsyncMock(side_effect=["https://signed/1", "https://signed/2"])
+
+        async def scenario():
+            first = await cached_presigned_url("tenants/t/r.pdf", 3600, sign)
+            second = await cached_presigned_url("tenants/t/r.pdf", 3600, sign)
+            # Move the cached entry past its reuse period
+            for key, (value, _) in redis.data.items():
+                redis.data[key] = (value, time.time() - 1)
+            third = await cached_presigned_url("tenants/t/r.pdf", 3600, sign)
+            return first, second, third
+
+        with patch.object(download_urls, "async_redis_conn", return_value=redis):
+            first, second, third = asyncio.run(scenario())
+
+        assert first == ("https://signed/1", 3600)
+        assert second[0] == "https://signed/1" and 3598 <= second[1] <= 3600
+        assert third == ("https://signed/2", 3600)
+        assert sign.await_count == 2
+        _, expires_at = next(iter(redis.data.values()))
+        assert expires_at <= time.time() + 3600 - download_urls.settings.download_url_min_remaining
+
+    def test_ttl_and_object_are_separate_entries(self):
+        """Another object or TTL gets its own URL."""
+        redis = FakeRedis()
+        sign = AsyncMock(side_effect=lambda key, ttl: f"https://signed/{key}?ttl={ttl}")
+
+        async def scenario():
+            return [await cached_presigned_url(key, ttl, sign) for key, ttl in [("a", 3600), ("b", 3600), ("a", 7200)]]
+
+        with patch.object(download_urls, "async_redis_conn", return_value=redis):
+            urls = [url for url, _ in asyncio.run(scenario())]
+
+        assert urls == ["https://signed/a?ttl=3600", "https://signed/b?ttl=3600", "https://signed/a?ttl=7200"]
+
+    def test_redis_unavailable(self):
+        """Without Redis every call signs a new URL."""
+        sign = AsyncMock(return_value="https://signed/1")
+        with patch.object(download_urls, "async_redis_conn", side_effect=ConnectionError("down")):
+            result = asyncio.run(cached_presigned_url("a", 3600, sign))
+
+        assert result == ("https://signed/1", 3600)
+        sign.assert_awaited_once_with("a", 3600)
+
+
+class TestClaimDownloadAudit:
+    """Test coalescing of download audit entries."""
+
+    def test_one_audit_per_user_and_report_per_window(self):
+        """Only the first download in the window is audited, per user and report."""
+        redis = FakeRedis()
+        report_id, user_id, other_user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+        async def scenario():
+            return [
+                await claim_download_audit(report_id, user_id),
+                await claim_download_audit(report_id, user_id),
+                await claim_download_audit(report_id, other_user_id),
+                await claim_download_audit(uuid.uuid4(), user_id),
+            ]
+
+        with patch.object(download_urls, "async_redis_conn", return_value=redis):
+            assert asyncio.run(scenario()) == [True, False, True, True]
+
+    def test_redis_unavailable_still_audits(self):
+        """Without Redis every download is audited."""
+        with patch.object(download_urls, "async_redis_conn", side_effect=ConnectionError("down")):
+            assert asyncio.run(claim_download_audit(uuid.uuid4(), uuid.uuid4())) is True
@@ -0,0 +1,172 @@
+"""
+Unit tests for persisted text extraction.
+"""
+from unittest.mock import patch
+
+import fitz
+import pytest
+
+from app.services import extraction_cache
+from app.services.analyzer.text_extraction import (
+    ExtractionResult, extract_pages_from_bytes, extract_text_from_bytes, extract_text_from_pdf,
+    shutdown_extraction_pool,
+)
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class FakeStorage:
+    """In-memory stand-in for ObjectStorage."""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = 0
+
+    def head_object(self, key):
+        return {"etag": f"etag-{len(self.objects[key])}"} if key in self.objects else None
+
+    def download_bytes(self, key):
+        if not key.endswith(".json.gz"):
+            self.downloads += 1
+        return self.objects.get(key)
+
+    def upload_fileobj(self, fileobj, key, content_type):
+        self.objects[key] = fileobj.read()
+        return True
+
+
+@pytest.fixture
+def fake_storage():
+    fake = FakeStorage()
+    with patch.object(extraction_cache, "storage", fake):
+        yield fake
+
+
+class TestExtractionResult:
+    """Test the extraction result model."""
+
+    def test_text_and_offsets(self):
+        """Text joins non-empty pages; offsets point at each page's start."""
+        result = ExtractionResult.from_pages(["Pagina een", "", "Pagina drie"])
+        assert result.text == "Pagina een\nPagina drie"
+        assert result.page_count == 3
+        assert result.text[result.page_offsets[2]:].startswith("Pagina drie")
+        assert result.page_offsets[0] == 0
+
+    def test_text_and_page_index_are_built_once(self):
+        """Repeated reads reuse the joined text and page index; they are not serialised."""
+        result = ExtractionResult.from_pages(["Pagina een", "Pagina twee"])
+
+        assert result.text is result.text
+        assert result.page_index is result.page_index
+        assert set(result.model_dump()) == {"pages", "page_offsets", "version"}
+
+
+class TestPageIndex:
+    """Test mapping text offsets back to pages."""
+
+    def test_offsets_map_to_pages(self):
+        """Binary search skips empty pages and maps separators to the page before."""
+        result = ExtractionResult.from_pages(["", "Inleiding rapport", "", "Conclusie en advies", ""])
+        index = result.page_index
+        text = result.text
+
+        assert index.page_for_offset(0) == 2
+        assert index.page_for_offset(text.index("\n")) == 2
+        assert index.page_for_offset(text.index("Conclusie")) == 4
+        assert index.page_for_offset(len(text)) is None
+        assert index.span(4) == (text.index("Conclusie"), len(text))
+
+    def test_locate_evidence_snippet(self):
+        """Quoted evidence is found despite whitespace, case and punctuation differences."""
+        result = ExtractionResult.from_pages(["Projectgegevens\nOpdrachtgever: Gemeente", "Risicoklasse 2 volgens\nNEN 2991"])
+        index = result.page_index
+
+        assert index.locate(result.text, "Risicoklasse 2 volgens NEN 2991") == 2
+        assert index.locate(result.text, "\"opdrachtgever:   gemeente\"") == 1
+        assert index.locate(result.text, "Niet in dit rapport aanwezig") is None
+        assert index.locate(result.text, None) is None
+
+
+class TestInMemoryExtraction:
+    """Test extracting from bytes without temp files."""
+
+    def test_bytes_match_file_extraction(self, tmp_path):
+        """In-memory extraction gives the same text as reading the file."""
+        data = make_pdf(["Rapport asbestinventarisatie", "", "Handtekening inspecteur"])
+        pdf_path = tmp_path / "rapport.pdf"
+        pdf_path.write_bytes(data)
+
+        assert extract_text_from_bytes(data) == extract_text_from_pdf(pdf_path)
+        assert "Handtekening inspecteur" in extract_text_from_bytes(data)
+
+    def test_invalid_bytes_raise(self):
+        """Corrupt input fails like a corrupt file does."""
+        with pytest.raises(Exception, match="Text extraction failed"):
+            extract_text_from_bytes(b"geen pdf")
+
+
+class TestParallelExtraction:
+    """Test page extraction over a process pool."""
+
+    def test_parallel_matches_single_process(self):
+        """Pages come back complete and in order."""
+        data = make_pdf([f"Pagina {i}" if i % 4 else "" for i in range(1, 12)])
+        try:
+            parallel = extract_pages_from_bytes(data, workers=3, parallel_min_pages=0)
+        finally:
+            shutdown_extraction_pool()
+        single = extract_pages_from_bytes(data)
+
+        assert parallel.pages == single.pages
+        assert parallel.page_offsets == single.page_offsets
+
+    def test_small_documents_stay_in_process(self):
+        """Below the page threshold no pool is started."""
+        data = make_pdf(["Een", "Twee"])
+        with patch("app.services.analyzer.text_extraction._get_pool") as get_pool:
+            result = extract_pages_from_bytes(data, workers=4, parallel_min_pages=50)
+        get_pool.assert_not_called()
+        assert result.page_count == 2
+
+
+class TestExtractionCache:
+    """Test storing and reusing extractions."""
+
+    def test_second_analysis_skips_download(self, fake_storage):
+        """The PDF is downloaded and parsed once; later runs use the stored extraction."""
+        fake_storage.objects["src.pdf"] = make_pdf(["Asbestinventarisatie", "", "Conclusie"])
+
+        first, cached_first = extraction_cache.get_extraction("src.pdf")
+        second, cached_second = extraction_cache.get_extraction("src.pdf")
+
+        assert (cached_first, cached_second) == (False, True)
+        assert fake_storage.downloads == 1
+        assert second.text == first.text
+        assert "Asbestinventarisatie" in second.text
+        assert second.page_count == 3
+
+    def test_changed_source_is_extracted_again(self, fake_storage):
+        """A different source fingerprint invalidates the stored extraction."""
+        fake_storage.objects["src.pdf"] = make_pdf(["Versie een"])
+        extraction_cache.get_extraction("src.pdf")
+
+        fake_storage.objects["src.pdf"] = make_pdf(["Versie twee met meer tekst"])
+        result, cached = extraction_cache.get_extraction("src.pdf")
+
+        assert cached is False
+        assert "Versie twee" in result.text
+
+    def test_missing_source_raises(self, fake_storage):
+        """A source that can't be downloaded fails the job."""
+        with pytest.raises(Exception):
+            extraction_cache.get_extraction("bestaat-niet.pdf")
@@ -0,0 +1,110 @@
+"""
+Unit tests for queue lanes and fair-share dequeue order.
+"""
+from collections import deque
+from unittest.mock import MagicMock
+
+from app.redis_queue.conn import parse_queue_name, queue_name
+from app.redis_queue.fair_share import FairShareScheduler, parse_tenant_weights, queue_depths
+
+
+def make_connection(names):
+    connection = MagicMock()
+    connection.smembers.side_effect = lambda key: {f"rq:queue:{name}".encode() for name in names}
+    return connection
+
+
+def drain(scheduler, backlog, count):
+    """Dequeue `count` jobs the way the worker does; returns the tenants served in order."""
+    served = []
+    for _ in range(count):
+        queue = next(q for q in scheduler.ordered_queues() if backlog.get(q.name))
+        backlog[queue.name].popleft()
+        scheduler.charge(queue)
+        served.append(parse_queue_name(queue.name)[1])
+    return served
+
+
+class TestQueueNames:
+    """Test lane queue naming."""
+
+    def test_round_trip(self):
+        """Lane queue names parse back; other queues don't."""
+        assert parse_queue_name(queue_name("t1", "bulk")) == ("bulk", "t1")
+        assert parse_queue_name("reports") is None
+        assert parse_queue_name("reports:other:t1") is None
+
+    def test_tenant_weights(self):
+        """Invalid weights are ignored."""
+        assert parse_tenant_weights("a:2, b:0.5,c:0,d:x,") == {"a": 2.0, "b": 0.5}
+
+
+class TestFairShareScheduler:
+    """Test the dequeue order."""
+
+    def test_lane_priority(self):
+        """Interactive queues come before bulk ones, the legacy queue last."""
+        names = [queue_name("big", "bulk"), queue_name("small", "interactive"), "reports"]
+        scheduler = FairShareScheduler(make_connection(names), tenant_weights={})
+
+        order = [q.name for q in scheduler.ordered_queues()]
+
+        assert order == [queue_name("small", "interactive"), queue_name("big", "bulk"), "reports"]
+
+    def test_small_tenant_not_starved_by_backlog(self):
+        """A small tenant's jobs are interleaved with a large backlog instead of waiting behind it."""
+        names = [queue_name("big", "bulk"), queue_name("small", "bulk")]
+        scheduler = FairShareScheduler(make_connection(names), tenant_weights={})
+        backlog = {names[0]: deque(range(500)), names[1]: deque()}
+
+        drain(scheduler, backlog, 100)
+        backlog[names[1]].extend(range(5))
+        served = drain(scheduler, backlog, 10)
+
+        # The small tenant has no recent usage, so all its jobs go first
+        assert served[:5] == ["small"] * 5
+        assert not backlog[names[1]]
+
+    def test_weights(self):
+        """A tenant with weight 2 gets twice the share of a backlogged tenant with weight 1."""
+        names = [queue_name("a", "bulk"), queue_name("b", "bulk")]
+        scheduler = FairShareScheduler(make_connection(names), tenant_weights={"a": 2.0})
+        backlog = {name: deque(range(100)) for name in names}
+
+        served = drain(scheduler, backlog, 90)
+
+        assert served.count("a") == 60
+        assert served.count("b") == 30
+
+    def test_new_queues_are_discovered(self):
+        """Queues registered after start are picked up on refresh."""
+        names = ["reports"]
+        scheduler = FairShareScheduler(make_connection(names), tenant_weights={}, refresh_interval=1)
+        scheduler.queues()
+        names.append(queue_name("new", "interactive"))
+        scheduler._refreshed_at -= 1
+
+        assert scheduler.ordered_queues()[0].name == queue_name("new", "interactive")
+
+
+class TestQueueDepths:
+    """Test queue depth reporting."""
+
+    def test_depth_per_lane_and_tenant(self):
+        """Lane totals cover all tenants; a tenant filter limits the tenant list."""
+        names = [queue_name("a", "bulk"), queue_name("a", "interactive"), queue_name("b", "bulk"), "reports"]
+        connection = make_connection(names)
+        lengths = {f"rq:queue:{name}": n for name, n in zip(names, [400, 1, 3, 2])}
+        pipeline = MagicMock()
+        pipeline.llen.side_effect = lambda key: pipeline.keys.append(key)
+        pipeline.keys = []
+        pipeline.execute.side_effect = lambda: [lengths[key] for key in pipeline.keys]
+        connection.pipeline.return_value.__enter__.return_value = pipeline
+
+        depths = queue_depths(connection)
+        assert depths["lanes"] == {"interactive": 1, "bulk": 403}
+        assert depths["legacy"] == 2
+        assert depths["tenants"]["a"] == {"interactive": 1, "bulk": 400}
+
+        pipeline.keys = []
+        assert list(queue_depths(connection, tenant_id="b")["tenants"]) == ["b"]
@@ -0,0 +1,273 @@
+"""
+Unit tests for the LLM service HTTP client handling.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services import llm_service
+from app.services.llm_service import LLMService, get_http_client, close_http_client
+from app.services.llm_cache import make_cache_key
+from app.services.llm_stream import FindingsStreamParser, LLMStreamParseError
+from app.schemas.ai_output import AIOutput
+
+
+AI_RESPONSE = {
+    "report_summary": "Samenvatting",
+    "score": 80,
+    "findings": [],
+}
+
+
+def anthropic_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"content": [{"type": "text", "text": json.dumps(AI_RESPONSE)}]})
+
+
+class TestSharedHttpClient:
+    """Test shared LLM HTTP client functionality."""
+
+    def test_client_is_reused_within_loop(self):
+        """Calls on the same loop share one client until it is closed."""
+        async def scenario():
+            client = get_http_client()
+            assert get_http_client() is client
+            await close_http_client()
+            assert client.is_closed
+            new_client = get_http_client()
+            assert new_client is not client
+            await close_http_client()
+
+        asyncio.run(scenario())
+
+    def test_calls_use_shared_client(self):
+        """Consecutive LLM calls go through the same pooled client."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return anthropic_handler(request)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            llm_service._http_clients[loop] = client
+
+            llm = LLMService()
+            llm.provider = "anthropic"
+            llm.use_cache = False
+            llm.stream = False
+            first = await llm.call("system", "user")
+            second = await llm.call("system", "user")
+
+            assert get_http_client() is client
+            await close_http_client()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first.score == second.score == 80
+        assert len(requests) == 2
+
+
+class TestLLMResponseCache:
+    """Test LLM response cache functionality."""
+
+    def test_cache_key_depends_on_all_inputs(self):
+        """Any change in provider, model, max_tokens or prompts changes the key."""
+        base = ("anthropic", "claude", 4000, "system v1", "document")
+        key = make_cache_key(*base)
+        assert key == make_cache_key(*base)
+        for i, changed in enumerate(["openai", "gpt", 2000, "system v2", "document 2"]):
+            args = list(base)
+            args[i] = changed
+            assert make_cache_key(*args) != key
+
+    def test_cache_key_has_no_boundary_collisions(self):
+        """Prompt boundaries are part of the key."""
+        assert make_cache_key("p", "m", 1, "ab", "c") != make_cache_key("p", "m", 1, "a", "bc")
+
+    def test_cache_hit_skips_provider(self, monkeypatch):
+        """A cached answer is returned without calling the provider."""
+        cached = AIOutput(**AI_RESPONSE)
+        stored = {}
+
+        async def fake_get(key):
+            return stored.get(key)
+
+        async def fake_put(key, output):
+            stored[key] = output
+            return True
+
+        provider_calls = []
+
+        async def fake_provider(self, system_prompt, user_prompt, on_finding=None):
+            provider_calls.append(system_prompt)
+            return cached
+
+        monkeypatch.setattr(llm_service.llm_cache, "get", fake_get)
+        monkeypatch.setattr(llm_service.llm_cache, "put", fake_put)
+        monkeypatch.setattr(LLMService, "_call_provider", fake_provider)
+
+        async def scenario():
+            llm = LLMService()
+            llm.use_cache = True
+            await llm.call("system", "user")
+            assert llm.last_call_cached is False
+            await llm.call("system", "user")
+            assert llm.last_call_cached is True
+
+        asyncio.run(scenario())
+        assert len(provider_calls) == 1
+
+    def test_cache_stats_require_system_owner(self):
+        """The cache statistics endpoint is not readable without logging in."""
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        response = TestClient(app).get("/admin/ai-configurations/cache/stats")
+
+        assert response.status_code == 401
+
+
+def sse(events):
+    return "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events)
+
+
+FINDING = {
+    "code": "SCOPE", "title": "Scope", "category": "FORMAL", "severity": "HIGH",
+    "status": "PASS", "page": 1, "evidence_snippet": "Scope van onderzoek", "suggested_fix": None,
+}
+
+
+class TestStreamingResponses:
+    """Test SSE streaming with incremental findings."""
+
+    def run_stream(self, text_parts, on_finding=None, monkeypatch=None):
+        events = [{"type": "message_start", "message": {"usage": {"input_tokens": 10}}}]
+        events += [{"type": "content_block_delta", "delta": {"type": "text_delta", "text": t}} for t in text_parts]
+        events += [{"type": "message_delta", "usage": {"output_tokens": 5}}, {"type": "message_stop"}]
+        body = sse(events)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            llm_service._http_clients[loop] = httpx.AsyncClient(
+                transport=httpx.MockTransport(lambda request: httpx.Response(
+                    200, text=body, headers={"content-type": "text/event-stream"}
+                ))
+            )
+            llm = LLMService()
+            llm.provider = "anthropic"
+            llm.use_cache = False
+            llm.stream = True
+            try:
+                return await llm.call("system", "user", on_finding=on_finding), llm
+            finally:
+                await close_http_client()
+
+        return asyncio.run(scenario())
+
+    def test_findings_arrive_before_the_end(self):
+        """Each finding is reported as soon as its object closes."""
+        document = json.dumps({"report_summary": "Samenvatting {met} [haakjes]", "score": 85,
+                               "findings": [FINDING, dict(FINDING, code="SIGN", status="FAIL")]})
+        parts = [document[i:i + 7] for i in range(0, len(document), 7)]
+        seen = []
+
+        async def on_finding(finding):
+            seen.append(finding.code)
+
+        with patch.object(llm_service.settings, "ai_rate_limit_enabled", False):
+            output, llm = self.run_stream(["Hier is de analyse:\n```json\n"] + parts + ["\n```"], on_finding)
+
+        assert seen == ["SCOPE", "SIGN"]
+        assert [f.code for f in output.findings] == ["SCOPE", "SIGN"]
+        assert llm.last_usage_tokens == 15
+
+    def test_findings_with_the_same_code_are_all_reported(self):
+        """Two findings for the same checklist item in one stream are both reported."""
+        document = json.dumps({"report_summary": "Samenvatting", "score": 60,
+                               "findings": [dict(FINDING, code="LOC_QTY", evidence_snippet="Kelder"),
+                                            dict(FINDING, code="LOC_QTY", evidence_snippet="Zolder")]})
+        seen = []
+
+        async def on_finding(finding):
+            seen.append((finding.code, finding.evidence_snippet))
+
+        with patch.object(llm_service.settings, "ai_rate_limit_enabled", False):
+            self.run_stream([document], on_finding)
+
+        assert seen == [("LOC_QTY", "Kelder"), ("LOC_QTY", "Zolder")]
+
+    def test_retry_after_mid_stream_throttle_does_not_repeat_findings(self):
+        """Findings already reported by an attempt that got throttled mid-stream are not reported again."""
+        document = json.dumps({"report_summary": "Samenvatting", "score": 85,
+                               "findings": [FINDING, dict(FINDING, code="SIGN", status="FAIL")]})
+        start = {"type": "message_start", "message": {"usage": {"input_tokens": 10}}}
+        first_finding_end = document.index("}, {") + 1
+        throttled = sse([
+            start,
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": document[:first_finding_end]}},
+            {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+        ])
+        complete = sse([
+            start,
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": document}},
+            {"type": "message_stop"},
+        ])
+        bodies = [throttled, complete]
+        seen = []
+
+        async def on_finding(finding):
+            seen.append(finding.code)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            llm_service._http_clients[loop] = httpx.AsyncClient(
+                transport=httpx.MockTransport(lambda request: httpx.Response(
+                    200, text=bodies.pop(0), headers={"content-type": "text/event-stream"}
+                ))
+            )
+            llm = LLMService()
+            llm.provider = "anthropic"
+            llm.use_cache = False
+            llm.stream = True
+            try:
+                return await llm.call("system", "user", on_finding=on_finding)
+            finally:
+                await close_http_client()
+
+        with patch.object(llm_service.settings, "ai_rate_limit_enabled", False), \
+             patch.object(llm_service.asyncio, "sleep", AsyncMock()):
+            output = asyncio.run(scenario())
+
+        assert not bodies
+        assert seen == ["SCOPE", "SIGN"]
+        assert [f.code for f in output.findings] == ["SCOPE", "SIGN"]
+
+    def test_invalid_finding_aborts_stream(self):
+        """A finding that doesn't match the schema stops the call right away."""
+        bad = json.dumps(dict(FINDING, severity="ENORM"))
+        with patch.object(llm_service.settings, "ai_rate_limit_enabled", False):
+            with pytest.raises(LLMStreamParseError):
+                self.run_stream(['{"score": 50, "findings": [', bad, ", never reached"])
+
+
+class TestFindingsStreamParser:
+    """Test incremental findings parsing."""
+
+    def test_nested_structures_and_strings(self):
+        """Braces inside strings and nested values don't confuse the parser."""
+        parser = FindingsStreamParser()
+        document = '{"note": "a } b", "findings": [{"code": "X", "extra": {"a": [1, "]"]}}, {"code": "Y\\"}"}]}'
+        found = []
+        for ch in document:
+            found.extend(parser.feed(ch))
+        assert [f["code"] for f in found] == ["X", 'Y"}']
+
+    def test_long_preamble_is_rejected(self):
+        """Output that never starts a JSON object is rejected early."""
+        parser = FindingsStreamParser(max_preamble_chars=50)
+        with pytest.raises(LLMStreamParseError):
+            parser.feed("Sorry, ik kan dit rapport niet analyseren. " * 5)
@@ -0,0 +1,104 @@
+"""
+Unit tests for the hybrid rules pre-screen of the checklist.
+"""
+from app.schemas.ai_output import AIFinding, AIOutput
+from app.services.analyzer.prescreen import format_checklist, load_checklist, merge_prescreen, prescreen_checklist
+from app.services.analyzer.text_extraction import ExtractionResult
+
+
+def llm_finding(code, status="FAIL", severity="HIGH"):
+    return AIFinding(
+        code=code, title=code, category="CONTENT", severity=severity, status=status,
+        evidence_snippet=None, suggested_fix=None,
+    )
+
+
+class TestPrescreen:
+    """Test which checklist items the rules settle."""
+
+    def test_clear_cut_items_are_decided(self):
+        """All term groups present is a PASS, no terms at all is a FAIL; the rest goes to the LLM."""
+        extraction = ExtractionResult.from_pages([
+            "Opdrachtgever: Gemeente\nProjectnummer 42\nAdres: Dorpsstraat 1\nDatum: 1-2-2025\nVersie 1.0",
+            "Foto 1: dakbeschot",
+        ])
+        result = prescreen_checklist(load_checklist(), extraction.text, extraction.page_index)
+        decided = {f.code: f for f in result.decided}
+        unresolved = [item.code for item in result.unresolved]
+
+        assert decided["A22.META"].status == "PASS"
+        assert decided["A22.META"].page == 1
+        assert decided["A22.SCOPE"].status == "FAIL"
+        assert decided["A22.SCOPE"].suggested_fix
+        # Photos without drawings and versioning without a signature need judgement
+        assert "A22.PHOTOS_DRAWINGS" in unresolved
+        assert "A22.VERSION_SIGN" in unresolved
+        # Judgement items are never decided by the rules
+        assert {"A22.CONDITION_RISK", "A22.ASSUMPTIONS"} <= set(unresolved)
+
+    def test_terms_inside_other_words_do_not_pass(self):
+        """Generic terms only count as whole words; inside another word the LLM decides."""
+        result = prescreen_checklist(
+            load_checklist(), "Opdrachtgever: Gemeente\nProjectnummer 42\nWerkadres Dorpsstraat 1\nRapportdatum 1-2-2025\nVersie 1.0"
+        )
+        decided = {f.code: f for f in result.decided}
+
+        assert "A22.META" not in decided
+        assert "A22.META" in [item.code for item in result.unresolved]
+
+    def test_mentioned_words_do_not_pass_critical_or_judgement_items(self):
+        """Words that any report contains don't settle critical or judgement items."""
+        extraction = ExtractionResult.from_pages([
+            "Er is geen monster genomen; analyse door een laboratorium was niet nodig.\n"
+            "Scope en doel: niet beschreven. Locatie: onbekend, hoeveelheid: onbekend.",
+        ])
+        result = prescreen_checklist(load_checklist(), extraction.text, extraction.page_index)
+        decided = {f.code for f in result.decided}
+        unresolved = [item.code for item in result.unresolved]
+
+        assert {"A22.SAMPLES_LAB", "A22.SCOPE", "A22.LOC_QTY"} <= set(unresolved)
+        assert not decided & {"A22.SAMPLES_LAB", "A22.SCOPE", "A22.LOC_QTY"}
+
+    def test_terms_scattered_over_pages_do_not_pass(self):
+        """A presence check only passes when its terms occur together on one page."""
+        pages = ["Opdrachtgever: Gemeente", "Projectnummer 42", "Adres: Dorpsstraat 1", "Datum: 1-2-2025", "Versie 1.0"]
+        extraction = ExtractionResult.from_pages(pages)
+        result = prescreen_checklist(load_checklist(), extraction.text, extraction.page_index)
+        assert "A22.META" in [item.code for item in result.unresolved]
+
+        # Without a page index the terms must be close together
+        spread = "\n".join(page + "\n" + "tekst " * 700 for page in pages)
+        result = prescreen_checklist(load_checklist(), spread)
+        assert "A22.META" in [item.code for item in result.unresolved]
+
+    def test_prompt_only_lists_unresolved_items(self):
+        """The checklist placeholder holds just the items left for the LLM."""
+        result = prescreen_checklist(load_checklist(), "Opdrachtgever, projectnummer, adres, datum en versie.")
+        checklist_text = format_checklist(result.unresolved)
+
+        assert "A22.META" not in checklist_text
+        assert "A22.CONDITION_RISK" in checklist_text
+
+
+class TestMergePrescreen:
+    """Test combining rule and LLM decisions."""
+
+    def test_decided_by_and_score(self):
+        """Rule decisions win for their codes; the score covers both engines."""
+        result = prescreen_checklist(load_checklist(), "Opdrachtgever, projectnummer, adres, datum en versie.")
+        ai_output = AIOutput(
+            report_summary="Samenvatting",
+            score=0,
+            findings=[llm_finding("A22.META"), llm_finding("A22.ID_FINDINGS", severity="CRITICAL")],
+        )
+
+        merged, decided_by = merge_prescreen(result, ai_output)
+        codes = [f.code for f in merged.findings]
+
+        assert decided_by["A22.META"] == "rules"
+        assert decided_by["A22.ID_FINDINGS"] == "llm"
+        assert codes.index("A22.SCOPE") < codes.index("A22.ID_FINDINGS") < codes.index("A22.LOC_QTY")
+        assert next(f for f in merged.findings if f.code == "A22.META").status == "PASS"
+        failed = [f for f in merged.findings if f.status == "FAIL"]
+        assert merged.score == max(0, 100 - sum({"CRITICAL": 30, "HIGH": 15, "MEDIUM": 7, "LOW": 3}[f.severity] for f in failed))
+        assert merged.report_summary == "Samenvatting"
@@ -0,0 +1,155 @@
+"""
+Unit tests for LLM provider rate limiting and retries.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services import llm_service
+from app.services.llm_service import LLMService, LLMProviderError, LLMRateLimitError, close_http_client
+from app.services.rate_limiter import (
+    AdaptiveConcurrencyLimiter, backoff_delay, parse_retry_after, estimate_tokens
+)
+
+
+AI_RESPONSE = {"report_summary": "Samenvatting", "score": 90, "findings": []}
+
+
+def ok_response() -> httpx.Response:
+    return httpx.Response(200, json={
+        "content": [{"type": "text", "text": json.dumps(AI_RESPONSE)}],
+        "usage": {"input_tokens": 100, "output_tokens": 50},
+    })
+
+
+def run_with_transport(handler, llm: LLMService):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        llm_service._http_clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await llm.call("system", "user")
+        finally:
+            await close_http_client()
+
+    return asyncio.run(scenario())
+
+
+def make_llm() -> LLMService:
+    llm = LLMService()
+    llm.provider = "anthropic"
+    llm.use_cache = False
+    llm.stream = False
+    return llm
+
+
+class TestRetryHelpers:
+    """Test Retry-After parsing and backoff."""
+
+    def test_parse_retry_after(self):
+        """Seconds and HTTP dates are supported, garbage is ignored."""
+        assert parse_retry_after("7") == 7.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("niet-geldig") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_backoff_honours_retry_after(self):
+        """The provider's Retry-After is used instead of exponential backoff."""
+        assert backoff_delay(3, retry_after=2.5) == 2.5
+        assert 0.5 <= backoff_delay(0) <= 1.0
+        assert backoff_delay(20) <= 60.0
+
+    def test_estimate_tokens(self):
+        """Token estimate is roughly four characters per token."""
+        assert estimate_tokens("a" * 400) == 101
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test AIMD concurrency control."""
+
+    def test_throttle_halves_and_success_recovers(self):
+        """429s halve the limit once per cooldown window; successes grow it back."""
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(max_limit=8, cooldown=60)
+            limiter.on_throttle()
+            limiter.on_throttle()
+            assert int(limiter.limit) == 4
+            for _ in range(100):
+                limiter.on_success()
+            assert limiter.limit == 8
+
+        asyncio.run(scenario())
+
+    def test_limit_bounds_in_flight_calls(self):
+        """No more than the current limit of calls run at once."""
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(max_limit=2)
+            peak = 0
+
+            async def work():
+                nonlocal peak
+                async with limiter:
+                    peak = max(peak, limiter.in_flight)
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(*(work() for _ in range(6)))
+            return peak
+
+        assert asyncio.run(scenario()) == 2
+
+
+class TestLLMServiceRetries:
+    """Test retrying throttled provider calls."""
+
+    @pytest.fixture(autouse=True)
+    def no_shared_bucket(self):
+        with patch.object(llm_service.settings, "ai_rate_limit_enabled", False):
+            yield
+
+    def test_retries_429_with_retry_after(self):
+        """A 429 is retried after the provider's Retry-After instead of failing the job."""
+        responses = [
+            httpx.Response(429, headers={"retry-after": "3"}, text="rate limited"),
+            httpx.Response(529, text="overloaded"),
+            ok_response(),
+        ]
+        sleep = AsyncMock()
+        with patch.object(llm_service.asyncio, "sleep", sleep):
+            output = run_with_transport(lambda request: responses.pop(0), make_llm())
+
+        assert output.score == 90
+        assert sleep.await_args_list[0].args == (3.0,)
+        assert sleep.await_count == 2
+
+    def test_gives_up_after_max_retries(self):
+        """Persistent throttling surfaces as LLMRateLimitError."""
+        sleep = AsyncMock()
+        with patch.object(llm_service.settings, "ai_max_retries", 2), \
+             patch.object(llm_service.asyncio, "sleep", sleep):
+            with pytest.raises(LLMRateLimitError) as exc_info:
+                run_with_transport(lambda request: httpx.Response(429, text="rate limited"), make_llm())
+
+        assert exc_info.value.status_code == 429
+        assert sleep.await_count == 2
+
+    def test_other_errors_are_not_retried(self):
+        """Client errors fail immediately with LLMProviderError."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400, text="bad request")
+
+        with pytest.raises(LLMProviderError) as exc_info:
+            run_with_transport(handler, make_llm())
+
+        assert not isinstance(exc_info.value, LLMRateLimitError)
+        assert len(calls) == 1
+
+    def test_usage_is_recorded(self):
+        """Token usage from the response is kept for rate budget correction."""
+        llm = make_llm()
+        run_with_transport(lambda request: ok_response(), llm)
+        assert llm.last_usage_tokens == 150
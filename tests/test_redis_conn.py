@@ -0,0 +1,30 @@
+"""
+Unit tests for the shared Redis connection pool.
+"""
+from unittest.mock import patch
+
+from app.redis_queue import conn
+
+
+class TestRedisConn:
+    """Test connection reuse on the enqueue path."""
+
+    def test_client_and_pool_are_shared(self):
+        """Every call returns the same client on one health-checked pool."""
+        with patch.object(conn, "_client", None):
+            client = conn.redis_conn()
+            pool = client.connection_pool
+
+            assert conn.redis_conn() is client
+            assert conn.reports_queue("t1").connection is client
+            assert conn.reports_queue().connection is client
+            assert pool.connection_kwargs["health_check_interval"] == conn.settings.redis_health_check_interval
+
+    def test_no_ping_on_enqueue_path(self):
+        """Getting a queue doesn't talk to Redis."""
+        with patch.object(conn, "_client", None), patch("redis.Redis.ping") as ping, \
+                patch("redis.Redis.execute_command") as execute_command:
+            conn.reports_queue("t1", conn.LANE_BULK)
+
+        ping.assert_not_called()
+        execute_command.assert_not_called()
@@ -0,0 +1,53 @@
+"""
+Unit tests for the live analysis progress endpoint.
+"""
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import reports
+from app.models.report import Report, ReportStatus
+from app.models.user import UserRole
+
+
+def make_user(role, tenant_id):
+    return MagicMock(id=uuid.uuid4(), role=role, tenant_id=tenant_id)
+
+
+def make_session(report):
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = report
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+class TestReportProgressAccess:
+    """Test who can read the progress of a report."""
+
+    def setup_method(self):
+        self.report = Report(id=uuid.uuid4(), tenant_id=uuid.uuid4(), status=ReportStatus.PROCESSING)
+        self.progress = {"stage": "ANALYZING", "chunks_total": 2, "chunks_done": 1, "findings": []}
+
+    def get(self, user):
+        with patch.object(reports, "get_progress", AsyncMock(return_value=self.progress)):
+            return asyncio.run(reports.get_report_progress(
+                str(self.report.id), current_user=user, session=make_session(self.report)
+            ))
+
+    def test_system_owner_sees_other_tenants(self):
+        """System owners can follow reports of every tenant, like on the other report endpoints."""
+        progress = self.get(make_user(UserRole.SYSTEM_OWNER, tenant_id=None))
+
+        assert progress.stage == "ANALYZING"
+        assert progress.chunks_done == 1
+
+    def test_own_tenant_only_for_users(self):
+        """Other users only see reports of their own tenant."""
+        assert self.get(make_user(UserRole.USER, self.report.tenant_id)).stage == "ANALYZING"
+        with pytest.raises(HTTPException) as exc_info:
+            self.get(make_user(UserRole.USER, uuid.uuid4()))
+        assert exc_info.value.status_code == 404
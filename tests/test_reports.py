@@ -14,9 +14,9 @@ from app.main import app
 @pytest.fixture
 def mock_storage():
     """Mock storage service."""
-    with patch('app.api.reports.storage') as mock:
-        mock.ensure_bucket.return_value = True
-        mock.upload_fileobj.return_value = True
+    with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock:
+        mock.bucket_ready.return_value = True
+        mock.upload_stream.return_value = ("0" * 64, 17)
         mock.delete_object.return_value = True
         yield mock
 
@@ -103,10 +103,8 @@ def test_upload_report_redis_unavailable(client, mock_storage, mock_auth):
     """Test upload fails with 503 when Redis is unavailable."""
     test_file = io.BytesIO(b"test file content")
     
-    with patch("app.api.reports.redis_conn") as mock_redis_conn:
-        mock_conn = MagicMock()
-        mock_conn.ping.side_effect = Exception("Redis connection failed")
-        mock_redis_conn.return_value = mock_conn
+    with patch("app.api.reports.reports_queue") as mock_reports_queue:
+        mock_reports_queue.return_value.enqueue.side_effect = Exception("Redis connection failed")
         
         response = client.post(
             "/reports/",
@@ -387,8 +385,9 @@ def
 
 def test_upload_report_storage_error(client, mock_auth):
     """Test upload when storage fails."""
-    with patch('app.api.reports.storage') as mock_storage:
-        mock_storage.ensure_bucket.return_value = False
+    with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock_storage:
+        mock_storage.bucket_ready.return_value = False
+        mock_storage.bucket_error = "Storage bucket check timed out after 5s"
         
         test_file = io.BytesIO(b"test content")
         
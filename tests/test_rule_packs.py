@@ -0,0 +1,118 @@
+"""
+Unit tests for declarative rule packs.
+"""
+import json
+import os
+
+import pytest
+
+from app.services.analyzer import rule_packs
+from app.services.analyzer.rule_packs import RulePackError, RulePackLoader, get_rule_pack
+
+
+def write_pack(path, rules, name="default", version="1", **extra):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"name": name, "version": version, "rules": rules, **extra}))
+    # Make sure the mtime changes even on coarse-grained filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+LICENSE_RULE = {
+    "id": "R-002", "section": "Kwalificaties", "severity": "HIGH",
+    "required": ["licentie", "certificaat"], "message": "Licentie ontbreekt.",
+}
+
+
+class TestDefaultPack:
+    """Test the shipped default pack."""
+
+    def test_default_pack_reproduces_builtin_rules(self):
+        """Risk class without a norm triggers R-003; complete reports pass."""
+        pack = get_rule_pack()
+        assert pack.version == "rules-1.0.0"
+
+        findings = pack.evaluate("Risicoklasse 1 voor dit object")
+        assert "R-003" in [f.rule_id for f in findings]
+
+        complete = (
+            "Projectgegevens opdrachtgever. Certificaat inspecteur. Risicoklasse 2 volgens NEN 2991. "
+            "Inventaris tabel. Laboratorium rapport. Foto 1. Conclusie. Wet en regelgeving."
+        )
+        assert pack.evaluate(complete) == []
+
+
+class TestRulePackLoader:
+    """Test loading, caching and reloading rule packs."""
+
+    def test_forbidden_terms_report_location(self, tmp_path):
+        """A forbidden term produces a finding pointing at its first occurrence."""
+        write_pack(tmp_path / "default.json", [{
+            "id": "X-1", "severity": "LOW", "forbidden": ["concept"], "message": "Conceptversie.",
+        }])
+        pack = RulePackLoader(str(tmp_path)).get()
+
+        finding, = pack.evaluate("Rapport (CONCEPT) versie 0.1")
+        assert finding.evidence["offset"] == 9
+        assert pack.evaluate("Definitief rapport") == []
+
+    def test_unchanged_pack_is_compiled_once(self, tmp_path):
+        """Repeated lookups return the same compiled pack."""
+        write_pack(tmp_path / "default.json", [LICENSE_RULE])
+        loader = RulePackLoader(str(tmp_path))
+
+        assert loader.get() is loader.get()
+
+    def test_changed_pack_is_reloaded(self, tmp_path):
+        """Editing the file swaps in the new pack; a broken edit keeps the last good one."""
+        path = tmp_path / "default.json"
+        write_pack(path, [LICENSE_RULE], version="1")
+        loader = RulePackLoader(str(tmp_path))
+        first = loader.get()
+
+        write_pack(path, [LICENSE_RULE], version="2")
+        second = loader.get()
+        assert (first.version, second.version) == ("1", "2")
+        assert second.content_hash != first.content_hash
+
+        path.write_text("{niet geldig")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000_000))
+        assert loader.get() is second
+
+    def test_tenant_pack_extends_default(self, tmp_path):
+        """A tenant pack overrides and disables default rules; other tenants keep the default."""
+        write_pack(tmp_path / "default.json", [
+            LICENSE_RULE,
+            {"id": "R-007", "severity": "LOW", "required": ["conclusie"], "message": "Geen conclusie."},
+        ])
+        write_pack(tmp_path / "tenants" / "tenant-a.json", [
+            {**LICENSE_RULE, "severity": "CRITICAL"},
+            {"id": "T-1", "severity": "MEDIUM", "required": ["handtekening"], "message": "Niet ondertekend."},
+        ], name="tenant-a", extends="default", disabled=["R-007"])
+        loader = RulePackLoader(str(tmp_path))
+
+        tenant = loader.get("tenant-a")
+        assert [(f.rule_id, f.severity) for f in tenant.evaluate("tekst")] == [("R-002", "CRITICAL"), ("T-1", "MEDIUM")]
+        assert loader.get("tenant-b") is loader.get()
+        assert loader.get("../default") is loader.get()
+
+    def test_missing_default_pack_raises(self, tmp_path):
+        """Without a default pack there is nothing to fall back to."""
+        with pytest.raises(RulePackError):
+            RulePackLoader(str(tmp_path)).get()
+
+    def test_invalid_rule_is_rejected(self, tmp_path):
+        """Rules without any terms are refused."""
+        write_pack(tmp_path / "default.json", [{"id": "X", "severity": "LOW", "message": "Leeg"}])
+        with pytest.raises(RulePackError):
+            RulePackLoader(str(tmp_path)).get()
+
+    @pytest.mark.skipif(rule_packs.yaml is None, reason="PyYAML not installed")
+    def test_yaml_pack(self, tmp_path):
+        """YAML packs are read when PyYAML is available."""
+        (tmp_path / "default.yaml").write_text(
+            "name: default\nversion: y1\nrules:\n"
+            "  - id: Y-1\n    severity: LOW\n    required: [foto]\n    message: Geen foto's.\n"
+        )
+        pack = RulePackLoader(str(tmp_path)).get()
+        assert [f.rule_id for f in pack.evaluate("tekst")] == ["Y-1"]
@@ -0,0 +1,58 @@
+"""
+Unit tests for the compiled rules engine term matcher.
+"""
+import random
+
+from app.services.analyzer.rule_packs import RuleTermMatcher, get_rule_pack
+from app.services.analyzer.rules import run_rules_v1
+from app.services.analyzer.text_extraction import ExtractionResult
+
+
+ALL_TERMS = list(get_rule_pack().matcher.terms)
+
+
+def naive_has_any(text, terms):
+    text_lower = text.lower()
+    return any(term.lower() in text_lower for term in terms)
+
+
+class TestRuleTermMatcher:
+    """Test the one-pass hit table."""
+
+    def test_hit_table_matches_substring_semantics(self):
+        """Every term is found exactly when a plain substring search finds it."""
+        random.seed(7)
+        words = ALL_TERMS + ["Certificaatnummer", "RISICOKLASSE", "tekst", "x", "\n", "NEN-2991"]
+        matcher = RuleTermMatcher(ALL_TERMS)
+        for _ in range(200):
+            text = " ".join(random.choice(words) for _ in range(random.randint(0, 8)))
+            hits = matcher.scan(text)
+            for term in set(ALL_TERMS):
+                assert hits.has_any([term]) == naive_has_any(text, [term]), (term, text)
+                offset = hits.first_offset([term])
+                assert offset == (text.lower().find(term) if term in text.lower() else None)
+
+    def test_offsets_lists_all_hits(self):
+        """All occurrences are available with their offsets."""
+        hits = RuleTermMatcher(["foto"]).scan("Foto 1, foto 2 en FOTO 3")
+        assert hits.offsets("foto") == [0, 8, 18]
+        assert hits.found() == {"foto": 0}
+
+
+class TestRunRules:
+    """Test rules evaluated from the hit table."""
+
+    def test_rules_match_previous_behaviour(self):
+        """A report without any terms triggers the absence rules."""
+        findings = run_rules_v1("xyz")
+        assert [f.rule_id for f in findings] == ["R-001", "R-002", "R-004", "R-005", "R-006", "R-007", "R-008"]
+
+    def test_risk_without_norm_has_evidence_offset_and_page(self):
+        """R-003 reports where the risk class was found, including the page."""
+        extraction = ExtractionResult.from_pages(["Projectgegevens opdrachtgever", "Risicoklasse 2 vastgesteld"])
+        findings = run_rules_v1(extraction.text, extraction.page_index)
+        r003 = next(f for f in findings if f.rule_id == "R-003")
+
+        assert r003.evidence["offset"] == extraction.text.index("Risicoklasse")
+        assert r003.evidence["snippet"].startswith("Risicoklasse 2")
+        assert r003.page == 2
@@ -178,12 +178,12 @@ class TestQueueIntegration:
 class TestDownloadEndpoints:
     """Test download endpoints."""
     
-    @patch('app.services.storage.storage.download_fileobj')
+    @patch('app.services.storage.storage.get_object')
     def test_download_source(self, mock_download, client, auth_headers, sample_report):
         """Test downloading source file."""
         # Mock storage response
         mock_file = BytesIO(b"test file content")
-        mock_download.return_value = mock_file
+        mock_download.return_value = {"Body": mock_file, "ContentLength": 17, "ETag": '"etag"'}
         
         # Download source
         response = client.get(
@@ -197,7 +197,7 @@ class TestDownloadEndpoints:
         assert "attachment" in response.headers["content-disposition"]
         assert sample_report.filename in response.headers["content-disposition"]
     
-    @patch('app.services.storage.storage.download_fileobj')
+    @patch('app.services.storage.storage.get_object')
     def test_download_conclusion(self, mock_download, client, auth_headers, sample_report):
         """Test downloading conclusion PDF."""
         # Set report to DONE with conclusion
@@ -206,7 +206,7 @@ class TestDownloadEndpoints:
         
         # Mock storage response
         mock_file = BytesIO(b"pdf content")
-        mock_download.return_value = mock_file
+        mock_download.return_value = {"Body": mock_file, "ContentLength": 11, "ETag": '"etag"'}
         
         # Download conclusion
         response = client.get(
@@ -249,9 +249,9 @@ class TestDownloadEndpoints:
     def test_download_rbac_system_owner(self, client, system_owner_headers, other_tenant_report):
         """Test RBAC on downloads - system owner can access all."""
         # Mock storage response
-        with patch('app.services.storage.storage.download_fileobj') as mock_download:
+        with patch('app.services.storage.storage.get_object') as mock_download:
             mock_file = BytesIO(b"test content")
-            mock_download.return_value = mock_file
+            mock_download.return_value = {"Body": mock_file, "ContentLength": 12, "ETag": '"etag"'}
             
             # System owner should be able to download
             response = client.get(
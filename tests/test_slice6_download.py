@@ -4,7 +4,7 @@ Unit tests for Slice 6 download endpoint functionality.
 import pytest
 import uuid
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -106,7 +106,7 @@ class TestDownloadEndpoint:
     """Test download endpoint functionality."""
     
     @patch('app.services.reports.ReportService')
-    @patch('app.api.reports.storage')
+    @patch('app.api.reports.async_storage', new_callable=AsyncMock)
     def test_download_done_report_success(self, mock_storage, mock_service, client, done_report, test_user, mock_auth_dependencies):
         """✅ DONE → 200 met {url, expires_in} en audit REPORT_DOWNLOAD geschreven."""
         # Setup mocks
@@ -198,7 +198,7 @@ class TestDownloadEndpoint:
         """✅ expires_in == settings.download_ttl."""
         mock_service.return_value.get_report_for_download.return_value = done_report
         
-        with patch('app.api.reports.storage') as mock_storage:
+        with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock_storage:
             mock_storage.presigned_get_url.return_value = "https://storage.example.com/presigned-url"
             
             with patch('app.api.reports.fastapi_users.current_user', return_value=test_user):
@@ -213,7 +213,7 @@ class TestDownloadEndpoint:
         """✅ URL bevat juiste key (storage_key) en is S3v4 gesigned."""
         mock_service.return_value.get_report_for_download.return_value = done_report
         
-        with patch('app.api.reports.storage') as mock_storage:
+        with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock_storage:
             mock_storage.presigned_get_url.return_value = "https://storage.example.com/presigned-url"
             
             with patch('app.api.reports.fastapi_users.current_user', return_value=test_user):
@@ -243,7 +243,7 @@ class TestDownloadEndpoint:
         
         mock_service.return_value.get_report_for_download.return_value = report_without_storage_key
         
-        with patch('app.api.reports.storage') as mock_storage:
+        with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock_storage:
             mock_storage.presigned_get_url.return_value = "https://storage.example.com/presigned-url"
             
             with patch('app.api.reports.fastapi_users.current_user', return_value=test_user):
@@ -283,7 +283,7 @@ class TestDownloadEndpoint:
         """❌ Storage error → 500."""
         mock_service.return_value.get_report_for_download.return_value = done_report
         
-        with patch('app.api.reports.storage') as mock_storage:
+        with patch('app.api.reports.async_storage', new_callable=AsyncMock) as mock_storage:
             mock_storage.presigned_get_url.return_value = None  # Simulate storage error
             
             with patch('app.api.reports.fastapi_users.current_user', return_value=test_user):
@@ -6,7 +6,7 @@ import uuid
 import json
 import time
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -70,7 +70,7 @@ class TestSlice6E2E:
     """End-to-end integration tests for Slice 6."""
     
     @patch('app.api.reports.ReportService')
-    @patch('app.api.reports.storage')
+    @patch('app.api.reports.async_storage', new_callable=AsyncMock)
     def test_e2e_download_availability_flow(self, mock_storage, mock_service, client, test_user):
         """2.1 End-to-end download beschikbaarheid."""
         
@@ -235,7 +235,7 @@ class TestSlice6E2E:
             assert "FAILED" in response.json()["detail"]
     
     @patch('app.api.reports.ReportService')
-    @patch('app.api.reports.storage')
+    @patch('app.api.reports.async_storage', new_callable=AsyncMock)
     def test_e2e_ttl_behavior(self, mock_storage, mock_service, client, test_user):
         """2.5 TTL gedrag (spot-check)."""
         
@@ -4,7 +4,7 @@ Unit tests for Slice 6 storage service functionality.
 import pytest
 import hashlib
 import io
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, Mock, patch, MagicMock
 
 from app.services.storage import ObjectStorage
 from app.config import settings
@@ -42,7 +42,7 @@ class TestStorageService:
         
         # Mock the S3 client
         with patch.object(storage_service, 'client') as mock_client:
-            mock_client.upload_fileobj.return_value = None  # Success
+            mock_client.put_object.return_value = {}  # Success
             
             success, checksum, file_size = storage_service.upload_fileobj_with_checksum(
                 fileobj, object_key, content_type
@@ -56,11 +56,12 @@ class TestStorageService:
         expected_checksum = hashlib.sha256(sample_pdf_content).hexdigest()
         assert checksum == expected_checksum
         
-        # Verify S3 upload was called
-        mock_client.upload_fileobj.assert_called_once()
-        call_args = mock_client.upload_fileobj.call_args
-        assert call_args[1]['ExtraArgs']['ContentType'] == content_type
-        assert call_args[1]['ExtraArgs']['ACL'] == 'private'
+        # Verify S3 upload was called (small files in a single PUT)
+        mock_client.put_object.assert_called_once()
+        call_args = mock_client.put_object.call_args
+        assert call_args[1]['ContentType'] == content_type
+        assert call_args[1]['ACL'] == 'private'
+        assert call_args[1]['Body'] == sample_pdf_content
     
     def test_upload_fileobj_with_checksum_failure(self, storage_service, sample_pdf_content):
         """❌ Upload failure → False, None, None."""
@@ -70,7 +71,7 @@ class TestStorageService:
         
         # Mock S3 client to raise exception
         with patch.object(storage_service, 'client') as mock_client:
-            mock_client.upload_fileobj.side_effect = Exception("Upload failed")
+            mock_client.put_object.side_effect = Exception("Upload failed")
             
             success, checksum, file_size = storage_service.upload_fileobj_with_checksum(
                 fileobj, object_key, content_type
@@ -184,7 +185,7 @@ class TestStorageService:
         content_type = "application/pdf"
         
         with patch.object(storage_service, 'client') as mock_client:
-            mock_client.upload_fileobj.return_value = None
+            mock_client.put_object.return_value = {}
             
             # First upload
             success1, checksum1, size1 = storage_service.upload_fileobj_with_checksum(
@@ -211,7 +212,7 @@ class TestStorageService:
         content_type = "application/pdf"
         
         with patch.object(storage_service, 'client') as mock_client:
-            mock_client.upload_fileobj.return_value = None
+            mock_client.put_object.return_value = {}
             
             success, checksum, file_size = storage_service.upload_fileobj_with_checksum(
                 fileobj, object_key, content_type
@@ -233,7 +234,7 @@ class TestStorageService:
         content_type = "application/pdf"
         
         with patch.object(storage_service, 'client') as mock_client:
-            mock_client.upload_fileobj.return_value = None
+            mock_client.put_object.return_value = {}
             
             success, checksum, file_size = storage_service.upload_fileobj_with_checksum(
                 fileobj, object_key, content_type
@@ -242,9 +243,114 @@ class TestStorageService:
         assert success is True
         
         # Verify the fileobj was read from beginning (position 0)
-        # The upload_fileobj call should have received content from position 0
-        call_args = mock_client.upload_fileobj.call_args
-        uploaded_fileobj = call_args[0][0]  # First positional argument
-        uploaded_fileobj.seek(0)
-        uploaded_content = uploaded_fileobj.read()
+        uploaded_content = mock_client.put_object.call_args[1]['Body']
         assert uploaded_content == content
+
+
+class TestUploadStream:
+    """Test the single-pass streaming upload."""
+    
+    def test_multipart_upload_in_one_pass(self, storage_service):
+        """✅ Large streams go up in parts; checksum and size are computed on the way."""
+        content = b"%PDF" + bytes(range(256)) * 45000  # ~11 MB: three 5 MB parts
+        fileobj = io.BytesIO(content)
+        
+        with patch.object(settings, 'storage_multipart_part_mb', 5), \
+                patch.object(storage_service, 'client') as mock_client:
+            mock_client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+            mock_client.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+            
+            checksum, size = storage_service.upload_stream(fileobj, "test/big.pdf", "application/pdf")
+        
+        assert checksum == hashlib.sha256(content).hexdigest()
+        assert size == len(content)
+        parts = [c[1]['Body'] for c in mock_client.upload_part.call_args_list]
+        assert [len(p) for p in parts[:-1]] == [5 * 1024 * 1024] * 2
+        assert b"".join(parts) == content
+        mock_client.complete_multipart_upload.assert_called_once()
+        assert mock_client.complete_multipart_upload.call_args[1]['MultipartUpload']['Parts'][2] == {
+            'ETag': 'etag-3', 'PartNumber': 3
+        }
+        mock_client.put_object.assert_not_called()
+    
+    def test_too_large_is_aborted(self, storage_service):
+        """❌ Exceeding max_size raises and aborts the multipart upload."""
+        from app.exceptions import FileTooLargeError
+        
+        fileobj = io.BytesIO(b"x" * (11 * 1024 * 1024))
+        
+        with patch.object(settings, 'storage_multipart_part_mb', 5), \
+                patch.object(storage_service, 'client') as mock_client:
+            mock_client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+            mock_client.upload_part.return_value = {'ETag': 'etag'}
+            
+            with pytest.raises(FileTooLargeError):
+                storage_service.upload_stream(fileobj, "test/big.pdf", "application/pdf", max_size=8 * 1024 * 1024)
+        
+        mock_client.abort_multipart_upload.assert_called_once_with(
+            Bucket="test-bucket", Key="test/big.pdf", UploadId="upload-1"
+        )
+        mock_client.complete_multipart_upload.assert_not_called()
+
+
+class TestAsyncObjectStorage:
+    """Test the async storage interface used by the API."""
+    
+    def test_slow_transfer_does_not_block_event_loop(self):
+        """✅ A slow storage call runs in the pool while the event loop keeps serving."""
+        import asyncio
+        import time
+        from app.services.storage import AsyncObjectStorage
+        
+        sync_storage = MagicMock(bucket="test-bucket")
+        sync_storage.upload_stream.side_effect = lambda *args: time.sleep(0.3) or ("checksum", 4)
+        async_storage = AsyncObjectStorage(sync_storage, max_workers=2)
+        
+        async def scenario():
+            upload = asyncio.create_task(
+                async_storage.upload_stream(io.BytesIO(b"data"), "test/slow.pdf", "application/pdf", 10)
+            )
+            ticks = 0
+            while not upload.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+            return await upload, ticks
+        
+        result, ticks = asyncio.run(scenario())
+        async_storage.shutdown()
+        
+        assert result == ("checksum", 4)
+        assert ticks > 10
+        sync_storage.upload_stream.assert_called_once_with(ANY, "test/slow.pdf", "application/pdf", 10)
+    
+    def test_bucket_readiness_is_cached(self):
+        """✅ Requests reuse the cached bucket state; an outage is rechecked until storage is back."""
+        import asyncio
+        from botocore.exceptions import ClientError
+        from app.services.storage import AsyncObjectStorage
+        
+        storage = ObjectStorage(
+            endpoint="http://localhost:9000", region="us-east-1", access_key="test",
+            secret_key="test", bucket="test-bucket"
+        )
+        storage.client = MagicMock()
+        async_storage = AsyncObjectStorage(storage, max_workers=1)
+        
+        async def scenario():
+            states = [await async_storage.bucket_ready() for _ in range(3)]
+            storage.client.head_bucket.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadBucket")
+            states.append(await async_storage.refresh_bucket_status())
+            states.append(await async_storage.bucket_ready())
+            storage.client.head_bucket.side_effect = None
+            states.append(await async_storage.bucket_ready())
+            states.append(await async_storage.bucket_ready())
+            return states
+        
+        states = asyncio.run(scenario())
+        async_storage.shutdown()
+        
+        assert states == [True, True, True, False, False, True, True]
+        # First check, health refresh, two rechecks while down; none while up
+        assert storage.client.head_bucket.call_count == 4
+        storage.client.list_buckets.assert_not_called()
+        assert async_storage.bucket_error is None
@@ -0,0 +1,144 @@
+"""
+Unit tests for streamed source and conclusion downloads.
+"""
+import io
+from unittest.mock import MagicMock, patch
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.reports import stream_object
+from app.services.storage import AsyncObjectStorage
+
+
+CONTENT = b"%PDF-" + bytes(range(256)) * 40
+ETAG = '"abc123"'
+
+
+class TrackingBody(io.BytesIO):
+    """GetObject body that records how it is read."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def fake_get_object(object_key, byte_range=None, if_none_match=None):
+    """Answers like S3 GetObject for a single stored object."""
+    if if_none_match == ETAG:
+        return {"NotModified": True, "ETag": ETAG}
+    if byte_range is None:
+        return {"Body": TrackingBody(CONTENT), "ContentLength": len(CONTENT), "ETag": ETAG}
+    start, end = byte_range[len("bytes="):].split("-")
+    if start == "":
+        start, end = len(CONTENT) - int(end), len(CONTENT) - 1
+    else:
+        start, end = int(start), int(end) if end else len(CONTENT) - 1
+    if start >= len(CONTENT):
+        return {"RangeNotSatisfiable": True, "ObjectSize": len(CONTENT)}
+    part = CONTENT[start:end + 1]
+    return {
+        "Body": TrackingBody(part),
+        "ContentLength": len(part),
+        "ContentRange": f"bytes {start}-{end}/{len(CONTENT)}",
+        "ETag": ETAG,
+    }
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/download")
+    async def download(request: Request):
+        return await stream_object(request, "key", "application/pdf", "rapport.pdf", "File not found")
+
+    return TestClient(app)
+
+
+class TestStreamObject:
+    """Test streaming stored objects to the client."""
+
+    def setup_method(self):
+        self.bodies = []
+
+        def get_object(*args):
+            response = fake_get_object(*args)
+            if "Body" in response:
+                self.bodies.append(response["Body"])
+            return response
+
+        self.sync_storage = MagicMock(bucket="test-bucket")
+        self.sync_storage.get_object.side_effect = get_object
+        self.async_storage = AsyncObjectStorage(self.sync_storage, max_workers=2)
+        self.patcher = patch("app.api.reports.async_storage", self.async_storage)
+        self.patcher.start()
+
+    def teardown_method(self):
+        self.patcher.stop()
+        self.async_storage.shutdown()
+
+    def test_full_download_is_streamed_in_chunks(self):
+        """The whole file is sent in chunks with its ETag and length."""
+        with patch("app.api.reports.settings.storage_download_chunk_kb", 4):
+            response = make_client().get("/download")
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["etag"] == ETAG
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(CONTENT))
+        assert "rapport.pdf" in response.headers["content-disposition"]
+        self.sync_storage.get_object.assert_called_once_with("key", None, None)
+        # Read in 4 KB chunks and released afterwards
+        assert set(self.bodies[0].reads) == {4096}
+        assert len(self.bodies[0].reads) == len(CONTENT) // 4096 + 2
+        assert self.bodies[0].closed
+
+    def test_range_request(self):
+        """A single range is fetched from storage and answered with 206."""
+        client = make_client()
+
+        response = client.get("/download", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+        response = client.get("/download", headers={"Range": "bytes=-10"})
+        assert response.content == CONTENT[-10:]
+
+    def test_multiple_or_invalid_ranges_send_whole_file(self):
+        """Ranges storage can't serve fall back to the full file."""
+        response = make_client().get("/download", headers={"Range": "bytes=0-9,20-29"})
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        self.sync_storage.get_object.assert_called_once_with("key", None, None)
+
+    def test_unsatisfiable_range(self):
+        """A range beyond the end of the file gives 416 with the file size."""
+        response = make_client().get("/download", headers={"Range": f"bytes={len(CONTENT)}-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    def test_matching_etag_is_not_modified(self):
+        """A repeat download with the current ETag transfers nothing."""
+        response = make_client().get("/download", headers={"If-None-Match": ETAG})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == ETAG
+
+    def test_missing_object(self):
+        """An object storage can't open gives 404."""
+        self.sync_storage.get_object.side_effect = None
+        self.sync_storage.get_object.return_value = None
+
+        response = make_client().get("/download")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "File not found"
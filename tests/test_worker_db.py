@@ -0,0 +1,55 @@
+"""
+Unit tests for the worker database engine registry.
+"""
+import asyncio
+import pytest
+
+from app.redis_queue import db
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    db.dispose_worker_engines()
+    yield
+    db.dispose_worker_engines()
+
+
+class TestWorkerEngineRegistry:
+    """Test worker engine registry functionality."""
+
+    def test_engine_is_created_once(self):
+        """Engine and session factory are reused across jobs."""
+        engine = db.get_worker_engine()
+        assert db.get_worker_engine() is engine
+        assert db.get_worker_session_local() is db.get_worker_session_local()
+
+    def test_engine_uses_configured_pool(self):
+        """Pool size and pre-ping come from settings."""
+        engine = db.get_worker_engine()
+        assert engine.pool.size() == db.settings.worker_db_pool_size
+        assert engine.pool._pre_ping == db.settings.worker_db_pool_pre_ping
+
+    def test_dispose_resets_engine(self):
+        """Disposing the registry creates a fresh engine on next use."""
+        engine = db.get_worker_engine()
+        db.dispose_worker_engines()
+        assert db.get_worker_engine() is not engine
+
+    def test_pool_stats(self):
+        """Pool stats expose checked in/out counts."""
+        assert db.pool_stats()["sync"] is None
+        db.get_worker_engine()
+        stats = db.pool_stats()
+        assert stats["sync"]["checkedout"] == 0
+        assert stats["config"]["pool_size"] == db.settings.worker_db_pool_size
+
+    def test_async_engine_per_loop(self):
+        """Async engines are shared within a loop and disposed per loop."""
+        async def scenario():
+            engine = db.get_worker_async_engine()
+            assert db.get_worker_async_engine() is engine
+            assert len(db.pool_stats()["async"]) == 1
+            await db.dispose_worker_async_engine()
+            assert db.pool_stats()["async"] == []
+
+        asyncio.run(scenario())
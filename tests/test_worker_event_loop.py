@@ -0,0 +1,86 @@
+"""
+Unit tests for the persistent worker event loop.
+"""
+import asyncio
+import concurrent.futures
+import pytest
+
+from app.redis_queue import event_loop
+from app.redis_queue.event_loop import WorkerEventLoop, run_async
+
+
+@pytest.fixture
+def loop_runner():
+    runner = WorkerEventLoop()
+    runner.start()
+    yield runner
+    runner.stop()
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+class TestWorkerEventLoop:
+    """Test worker event loop functionality."""
+
+    def test_jobs_share_one_loop(self, loop_runner):
+        """Consecutive submissions run on the same loop."""
+        first = loop_runner.submit(_current_loop())
+        second = loop_runner.submit(_current_loop())
+        assert first is second is loop_runner.loop
+
+    def test_timeout_cancels_coroutine(self, loop_runner):
+        """A timed out job does not keep running on the loop."""
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            loop_runner.submit(slow(), timeout=0.05)
+        loop_runner.submit(asyncio.sleep(0.05))
+        assert cancelled == [True]
+
+    def test_stop_runs_shutdown_hooks(self, monkeypatch):
+        """Shutdown hooks run on the loop before it stops."""
+        calls = []
+
+        async def hook():
+            calls.append(asyncio.get_running_loop())
+
+        monkeypatch.setattr(event_loop, "_shutdown_hooks", [])
+        event_loop.register_shutdown_hook(hook)
+        event_loop.register_shutdown_hook(hook)
+        runner = WorkerEventLoop()
+        loop = runner.start()
+        runner.stop()
+        assert calls == [loop]
+        assert not runner.is_running
+
+    def test_run_async_without_worker_loop(self):
+        """run_async falls back to a throwaway loop."""
+        assert not event_loop.worker_loop.is_running
+        assert run_async(asyncio.sleep(0, result=42)) == 42
+
+    def test_default_hooks_are_registered(self):
+        """The HTTP client, Redis and engine cleanups go through the hook registry."""
+        assert event_loop._shutdown_hooks[:3] == [
+            event_loop.close_http_client, event_loop.close_async_redis, event_loop.dispose_worker_async_engine
+        ]
+
+    def test_run_async_fallback_runs_shutdown_hooks(self, monkeypatch):
+        """The throwaway loop releases loop-bound resources through the hooks before closing."""
+        calls = []
+
+        async def hook():
+            calls.append(asyncio.get_running_loop())
+
+        monkeypatch.setattr(event_loop, "_shutdown_hooks", [hook])
+        loop = run_async(_current_loop())
+        assert calls == [loop]
+        assert loop.is_closed()
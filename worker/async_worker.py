@@ -0,0 +1,211 @@
+"""
+Asyncio-based worker that processes several reports concurrently.
+
+Jobs are pulled from the RQ queues only when a slot is free, so at most
+``concurrency`` reports are in flight per process. Job functions are the
+regular sync RQ jobs; they run in a thread pool while their coroutines
+(LLM calls, async DB) run on the shared worker event loop.
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+from redis import Redis
+from rq import Queue
+from rq.exceptions import DequeueTimeout
+from rq.job import Job, JobStatus
+from rq.utils import utcnow
+
+from app.redis_queue.fair_share import FairShareScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_TTL = 500  # Same default as rq.Worker
+
+
+class _JobRun:
+    """Tracks one in-flight job so a timeout and a late finish can't both record a result."""
+
+    def __init__(self, job: Job, queue: Queue):
+        self.job = job
+        self.queue = queue
+        self._lock = threading.Lock()
+        self._settled = False
+
+    def settle(self) -> bool:
+        """Return True for the first caller only."""
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+            return True
+
+
+class AsyncReportWorker:
+    """Bounded-concurrency worker for the report queues."""
+
+    def __init__(
+        self,
+        queues: List[Queue],
+        connection: Redis,
+        concurrency: int,
+        job_timeout: int,
+        dequeue_timeout: int = 5,
+        fair_share: Optional[FairShareScheduler] = None,
+    ):
+        self.queues = queues
+        self.connection = connection
+        self.concurrency = max(1, concurrency)
+        self.job_timeout = job_timeout
+        self.dequeue_timeout = dequeue_timeout
+        self.fair_share = fair_share
+        self.name = f"async-{socket.gethostname()}-{os.getpid()}"
+
+        self._job_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="report-job")
+        self._dequeue_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-dequeue")
+        self._tasks: Set[asyncio.Task] = set()
+        self._stop_requested = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def request_stop(self) -> None:
+        """Stop pulling new jobs; in-flight jobs are allowed to finish."""
+        if not self._stop_requested:
+            logger.info(f"Worker {self.name}: stop requested, draining {self.in_flight} job(s)")
+        self._stop_requested = True
+
+    async def run(self) -> None:
+        """Dequeue and process jobs until a stop is requested."""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Worker {self.name} listening on {[q.name for q in self.queues]} (concurrency={self.concurrency})")
+
+        try:
+            while not self._stop_requested:
+                await slots.acquire()
+                try:
+                    result = await loop.run_in_executor(self._dequeue_executor, self._dequeue)
+                except Exception as e:
+                    slots.release()
+                    logger.error(f"Dequeue failed: {e}")
+                    await asyncio.sleep(1)
+                    continue
+
+                if result is None:
+                    slots.release()
+                    continue
+
+                job, queue = result
+                task = asyncio.create_task(self._process(job, queue))
+                self._tasks.add(task)
+
+                def _done(t: asyncio.Task) -> None:
+                    self._tasks.discard(t)
+                    slots.release()
+
+                task.add_done_callback(_done)
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            self._dequeue_executor.shutdown(wait=False)
+            self._job_executor.shutdown(wait=True)
+            logger.info(f"Worker {self.name} stopped")
+
+    def _dequeue(self) -> Optional[Tuple[Job, Queue]]:
+        queues, timeout = self.queues, self.dequeue_timeout
+        if self.fair_share:
+            # Re-ordered (and new tenant queues picked up) before every dequeue
+            queues = self.queues = self.fair_share.ordered_queues()
+            timeout = min(timeout, self.fair_share.refresh_interval)
+        try:
+            result = Queue.dequeue_any(queues, timeout, connection=self.connection)
+        except DequeueTimeout:
+            return None
+        if result is not None and self.fair_share:
+            self.fair_share.charge(result[1])
+        return result
+
+    async def _process(self, job: Job, queue: Queue) -> None:
+        loop = asyncio.get_running_loop()
+        run = _JobRun(job, queue)
+        timeout = job.timeout or self.job_timeout
+        future = loop.run_in_executor(self._job_executor, self._execute, run)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Job {job.id} exceeded timeout of {timeout}s")
+            if not run.settle():
+                await asyncio.gather(future, return_exceptions=True)
+                return
+            exc_string = f"JobTimeoutException: Job exceeded maximum timeout value ({timeout} seconds)"
+            if job.retries_left and job.retries_left > 0:
+                # Re-queued only once the job thread has returned; a free slot
+                # would otherwise run the same report twice at the same time
+                await loop.run_in_executor(None, job.set_status, JobStatus.FAILED)
+                await asyncio.gather(future, return_exceptions=True)
+                await loop.run_in_executor(None, self._handle_failure, run, exc_string)
+                return
+            await loop.run_in_executor(None, self._handle_failure, run, exc_string)
+            # Keep the slot until the job thread has actually returned
+            await asyncio.gather(future, return_exceptions=True)
+
+    def _execute(self, run: _JobRun) -> None:
+        """Run one job in a pool thread, including RQ bookkeeping."""
+        job, queue = run.job, run.queue
+        timeout = job.timeout or self.job_timeout
+        with self.connection.pipeline() as pipeline:
+            job.prepare_for_execution(self.name, pipeline=pipeline)
+            queue.started_job_registry.add(job, timeout + 60, pipeline=pipeline)
+            pipeline.execute()
+
+        logger.info(f"{queue.name}: {job.func_name} ({job.id})")
+        try:
+            rv = job.perform()
+        except Exception:
+            job.ended_at = utcnow()
+            if run.settle():
+                self._handle_failure(run, traceback.format_exc())
+            return
+
+        job.ended_at = utcnow()
+        if run.settle():
+            job._result = rv
+            self._handle_success(run)
+
+    def _handle_success(self, run: _JobRun) -> None:
+        job, queue = run.job, run.queue
+        result_ttl = job.get_result_ttl(DEFAULT_RESULT_TTL)
+        with self.connection.pipeline() as pipeline:
+            if result_ttl != 0:
+                job._handle_success(result_ttl, pipeline=pipeline)
+            else:
+                job.set_status(JobStatus.FINISHED, pipeline=pipeline)
+            job.cleanup(result_ttl, pipeline=pipeline, remove_from_queue=False)
+            queue.started_job_registry.remove(job, pipeline=pipeline)
+            pipeline.execute()
+        logger.info(f"{queue.name}: Job OK ({job.id})")
+
+    def _handle_failure(self, run: _JobRun, exc_string: str) -> None:
+        """Record a failure, re-queueing the job while it has retries left (job_max_retries)."""
+        job, queue = run.job, run.queue
+        retry = bool(job.retries_left and job.retries_left > 0)
+        with self.connection.pipeline() as pipeline:
+            queue.started_job_registry.remove(job, pipeline=pipeline)
+            if retry:
+                job.retry(queue, pipeline)
+            else:
+                job.set_status(JobStatus.FAILED, pipeline=pipeline)
+                job._handle_failure(exc_string, pipeline=pipeline)
+            pipeline.execute()
+        if retry:
+            logger.warning(f"Job {job.id} failed, retrying ({job.retries_left} retries left)")
+        else:
+            logger.error(f"Job {job.id} failed: {exc_string}")
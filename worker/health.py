@@ -4,6 +4,7 @@ Simple health check server for the worker service.
 """
 import os
 import sys
+import json
 import logging
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import threading
@@ -22,6 +23,12 @@ class HealthHandler(BaseHTTPRequestHandler):
             self.end_headers()
             response = '{"status": "healthy", "service": "worker", "message": "Worker service is running"}'
             self.wfile.write(response.encode())
+        elif self.path == '/healthz/db':
+            from app.redis_queue.db import pool_stats
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(pool_stats()).encode())
         else:
             self.send_response(404)
             self.end_headers()
@@ -0,0 +1,50 @@
+"""
+RQ workers that dequeue the report queues by lane priority and tenant fair share.
+"""
+import math
+import time
+from typing import Optional, Tuple
+
+from rq import Queue, SimpleWorker, Worker
+from rq.job import Job
+
+from app.redis_queue.fair_share import FairShareScheduler
+
+
+class FairShareMixin:
+    """Lets an RQ worker listen on the per-tenant lane queues in fair-share order."""
+
+    def __init__(self, fair_share: FairShareScheduler, **kwargs):
+        self.fair_share = fair_share
+        super().__init__(fair_share.ordered_queues(), connection=fair_share.connection, **kwargs)
+
+    def dequeue_job_and_maintain_ttl(
+        self, timeout: Optional[int], max_idle_time: Optional[int] = None
+    ) -> Optional[Tuple[Job, Queue]]:
+        # Block at most refresh_interval per pass so queues of new tenants are picked up
+        idle_since = time.monotonic()
+        while True:
+            self._ordered_queues = self.fair_share.ordered_queues()
+            self.queues = list(self._ordered_queues)
+            wait = self.fair_share.refresh_interval
+            if max_idle_time is not None:
+                idle_left = max_idle_time - (time.monotonic() - idle_since)
+                if idle_left <= 0:
+                    return None
+                wait = min(wait, math.ceil(idle_left))
+            result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time=wait)
+            # timeout None is burst mode: don't wait for jobs
+            if result is not None or timeout is None:
+                return result
+
+    def reorder_queues(self, reference_queue: Queue) -> None:
+        # Called by RQ after each dequeue; the order is rebuilt before the next one
+        self.fair_share.charge(reference_queue)
+
+
+class FairShareWorker(FairShareMixin, Worker):
+    """Forking RQ worker with fair-share dequeueing."""
+
+
+class FairShareSimpleWorker(FairShareMixin, SimpleWorker):
+    """In-process RQ worker with fair-share dequeueing."""
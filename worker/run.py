@@ -9,7 +9,7 @@ import sys
 # Add the parent directory to Python path so we can import from app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rq import Worker, Queue, Connection
+from rq import Connection
 from app.redis_queue.conn import redis_conn
 
 # Configure logging
@@ -42,6 +42,38 @@ def wait_for_redis(max_retries=30, retry_delay=2):
     return False
 
 
+def run_async_worker(settings):
+    """Run the asyncio worker: up to WORKER_CONCURRENCY reports in parallel."""
+    import signal
+    from worker.async_worker import AsyncReportWorker
+    from app.redis_queue.fair_share import FairShareScheduler
+    from app.redis_queue.event_loop import worker_loop
+    from app.redis_queue.db import dispose_worker_engines
+    from app.services.analyzer.text_extraction import shutdown_extraction_pool
+    
+    conn = redis_conn()
+    fair_share = FairShareScheduler(conn)
+    worker = AsyncReportWorker(
+        queues=fair_share.ordered_queues(),
+        connection=conn,
+        concurrency=settings.worker_concurrency,
+        job_timeout=settings.job_timeout_seconds,
+        fair_share=fair_share,
+    )
+    loop = worker_loop.start()
+    
+    def _request_stop(signum, frame):
+        loop.call_soon_threadsafe(worker.request_stop)
+    
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    
+    try:
+        worker_loop.submit(worker.run())
+    finally:
+        worker_loop.stop()
+        dispose_worker_engines()
+        shutdown_extraction_pool()
 
 
 if __name__ == "__main__":
@@ -95,10 +127,25 @@ if __name__ == "__main__":
         
         logger.info("Redis connection established, starting worker...")
 
-        with Connection(redis_conn()):
-            # Create worker for the reports queue
-            worker = Worker([Queue("reports")])
-            logger.info("Worker created, starting work...")
+        if settings.worker_mode == "async":
+            run_async_worker(settings)
+            exit(0)
+
+        conn = redis_conn()
+        with Connection(conn):
+            from app.redis_queue.fair_share import FairShareScheduler
+            from worker.rq_worker import FairShareSimpleWorker, FairShareWorker
+            
+            # Jobs run in this process by default so they share the pooled
+            # database engines; WORKER_FORK_JOBS=true restores the forking worker
+            worker_class = FairShareWorker if settings.worker_fork_jobs else FairShareSimpleWorker
+            worker = worker_class(FairShareScheduler(conn))
+            logger.info(f"Worker created ({worker_class.__name__}), starting work...")
+            
+            # One event loop for all jobs; a forked work horse can't use the loop thread
+            from app.redis_queue.event_loop import worker_loop
+            if settings.worker_persistent_loop and not settings.worker_fork_jobs:
+                worker_loop.start()
             
             # Start worker with health monitoring
             try:
@@ -110,6 +157,12 @@ if __name__ == "__main__":
                 import traceback
                 logger.error(f"Traceback: {traceback.format_exc()}")
                 exit(1)
+            finally:
+                from app.redis_queue.db import dispose_worker_engines
+                from app.services.analyzer.text_extraction import shutdown_extraction_pool
+                worker_loop.stop()
+                dispose_worker_engines()
+                shutdown_extraction_pool()
                 
     except Exception as e:
         logger.error(f"Failed to start worker: {e}")